@@ -0,0 +1,358 @@
+"""In-process fakes of the NeuroMemory and Anthropic clients
+
+Both fakes sleep for a configurable latency per call and count every call,
+so benchmarks measure Echo's own overhead plus a realistic number of
+round-trips without touching the network.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import json
+import threading
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import AsyncIterator, Iterator, Optional
+
+
+@dataclass
+class Latency:
+    """Simulated latencies in seconds"""
+
+    memory_call: float = 0.005
+    llm_first_token: float = 0.05
+    llm_per_chunk: float = 0.0005
+
+    def scaled(self, factor: float) -> Latency:
+        return Latency(
+            self.memory_call * factor,
+            self.llm_first_token * factor,
+            self.llm_per_chunk * factor,
+        )
+
+
+@dataclass
+class DataVolume:
+    """How much a simulated user has stored"""
+
+    facts: int = 1000
+    preferences: int = 20
+    episodes: int = 200
+    documents: int = 50
+
+
+class CallCounter:
+    """Thread-safe call counts by method name"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: dict[str, int] = {}
+
+    def hit(self, name: str):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def total(self) -> int:
+        with self._lock:
+            return sum(self.counts.values())
+
+    def reset(self):
+        with self._lock:
+            self.counts = {}
+
+
+class _Namespace:
+    def __init__(self, client: FakeNeuroMemoryClient, methods: dict):
+        for name, fn in methods.items():
+            setattr(self, name, client._wrap(name, fn))
+
+
+class FakeNeuroMemoryClient:
+    """NeuroMemory client stand-in with synthetic data
+
+    Implements the calls Echo makes (``memory.*``, ``conversations.*``,
+    ``files.add_url``, ``add_memory``). ``get_facts`` honours ``limit`` and
+    ``offset`` so paged counting can be exercised against large volumes.
+    """
+
+    def __init__(self, volume: Optional[DataVolume] = None, latency: Optional[Latency] = None):
+        self.volume = volume or DataVolume()
+        self.latency = latency or Latency()
+        self.calls = CallCounter()
+        self.stored_messages = 0
+
+        self.memory = _Namespace(self, {
+            "search": self._search,
+            "get_preferences": self._get_preferences,
+            "get_facts": self._get_facts,
+            "get_user_profile": self._get_user_profile,
+            "get_episodes": self._get_episodes,
+        })
+        self.conversations = _Namespace(self, {
+            "add_messages": self._add_messages,
+            "enable_auto_extract": lambda **kwargs: None,
+        })
+        self.files = _Namespace(self, {"add_url": self._add_url})
+        self.add_memory = self._wrap("add_memory", lambda **kwargs: {"id": "m1"})
+
+    def close(self):
+        pass
+
+    def _wrap(self, name: str, fn):
+        # wraps() keeps the signature visible to SDK feature detection
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            self.calls.hit(name)
+            if self.latency.memory_call:
+                time.sleep(self.latency.memory_call)
+            return fn(*args, **kwargs)
+
+        return call
+
+    def _search(self, user_id: str, query: str, memory_types=None, limit: int = 5) -> list[dict]:
+        types = memory_types or ["fact"]
+        return [
+            {
+                "id": f"s{i}",
+                "content": f"与「{query[:20]}」相关的记忆 {i}",
+                "memory_type": types[i % len(types)],
+                "score": round(0.95 - i * 0.05, 2),
+                "created_at": "2026-01-01T00:00:00Z",
+            }
+            for i in range(limit)
+        ]
+
+    def _get_preferences(self, user_id: str) -> list[dict]:
+        return [{"key": f"pref_{i}", "value": f"value {i}"} for i in range(self.volume.preferences)]
+
+    def _get_facts(
+        self, user_id: str, limit: int = 100, offset: int = 0, category=None
+    ) -> list[dict]:
+        end = min(self.volume.facts, offset + limit)
+        return [
+            {
+                "id": f"f{i}",
+                "content": f"知识点 {i}",
+                "category": "skill" if i % 5 == 0 else "topic",
+            }
+            for i in range(offset, end)
+        ]
+
+    def _get_user_profile(self, user_id: str) -> dict:
+        return {"user_id": user_id, "documents_count": self.volume.documents}
+
+    def _get_episodes(self, user_id: str, limit: int = 10) -> list[dict]:
+        count = min(limit, self.volume.episodes)
+        return [
+            {"content": f"学习记录 {i}", "created_at": "2026-01-01T00:00:00Z"}
+            for i in range(count)
+        ]
+
+    def _add_messages(self, user_id: str, session_id=None, messages=None) -> None:
+        self.stored_messages += len(messages or [])
+
+    def _add_url(self, user_id: str, url: str, **kwargs) -> dict:
+        return {"file_id": f"file-{abs(hash(url)) % 10000}", "title": url}
+
+
+# A tool-call graph streamed by the fake for knowledge-graph generation
+GRAPH_PAYLOAD = {
+    "concepts": [
+        {
+            "name": f"概念{i}",
+            "level": ("beginner", "intermediate", "advanced")[i % 3],
+            "importance": 1 + i % 5,
+            "description": f"第 {i} 个核心概念",
+            "prerequisites": [f"概念{i - 1}"] if i else [],
+        }
+        for i in range(10)
+    ],
+    "relationships": [
+        {"from": f"概念{i}", "to": f"概念{i + 2}", "type": "related"} for i in range(8)
+    ],
+    "learning_path": [f"概念{i}" for i in range(10)],
+}
+
+
+class _Usage(SimpleNamespace):
+    pass
+
+
+class _SyncStream:
+    def __init__(self, fake: FakeAnthropic, request: dict):
+        self._fake = fake
+        self._request = request
+        self._tool = "tools" in request
+        self._text = fake.answer
+        self._json = json.dumps(GRAPH_PAYLOAD, ensure_ascii=False)
+
+    def __enter__(self) -> _SyncStream:
+        time.sleep(self._fake.latency.llm_first_token)
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+    @property
+    def text_stream(self) -> Iterator[str]:
+        for chunk in _chunks(self._text, 8):
+            time.sleep(self._fake.latency.llm_per_chunk)
+            yield chunk
+
+    def __iter__(self):
+        if not self._tool:
+            for chunk in self.text_stream:
+                yield SimpleNamespace(
+                    type="content_block_delta", delta=SimpleNamespace(type="text_delta", text=chunk)
+                )
+            return
+        for chunk in _chunks(self._json, 16):
+            time.sleep(self._fake.latency.llm_per_chunk)
+            yield SimpleNamespace(
+                type="content_block_delta",
+                delta=SimpleNamespace(type="input_json_delta", partial_json=chunk),
+            )
+
+    def get_final_message(self):
+        if self._tool:
+            content = [SimpleNamespace(type="tool_use", input=GRAPH_PAYLOAD)]
+            output = len(self._json) // 4
+        else:
+            content = [SimpleNamespace(type="text", text=self._text)]
+            output = len(self._text)
+        return SimpleNamespace(content=content, usage=self._fake.usage(self._request, output))
+
+
+class _Messages:
+    def __init__(self, fake: FakeAnthropic):
+        self._fake = fake
+
+    def create(self, **request):
+        self._fake.calls.hit("messages.create")
+        time.sleep(self._fake.latency.llm_first_token)
+        return self._response(request)
+
+    def _response(self, request: dict):
+        if "tools" in request:
+            tool = request["tools"][0]
+            concept = GRAPH_PAYLOAD["concepts"][0]
+            content = [SimpleNamespace(type="tool_use", name=tool["name"], input=concept)]
+        else:
+            content = [SimpleNamespace(type="text", text=self._fake.answer)]
+        return SimpleNamespace(content=content, usage=self._fake.usage(request, 100))
+
+    def stream(self, **request):
+        self._fake.calls.hit("messages.stream")
+        return _SyncStream(self._fake, request)
+
+
+class FakeAnthropic:
+    """Anthropic client stand-in
+
+    Streams a fixed answer for chat, and a tool call carrying GRAPH_PAYLOAD
+    for requests that force a tool. Usage is estimated from request size.
+    Like the API, a prefix marked with cache_control is cached only when it
+    reaches the model's minimum length, and later requests with the same
+    prefix report it as cache_read_input_tokens.
+    """
+
+    def __init__(self, latency: Optional[Latency] = None, answer: Optional[str] = None):
+        self.latency = latency or Latency()
+        self.answer = answer or (
+            "学习 Rust 可以从所有权和借用开始，然后逐步深入生命周期与并发。" * 6
+        )
+        self.calls = CallCounter()
+        self.messages = _Messages(self)
+        self._cached: set[str] = set()
+
+    def usage(self, request: dict, output_tokens: int) -> _Usage:
+        size = len(json.dumps(request.get("messages", []), ensure_ascii=False))
+        size += len(json.dumps(request.get("system", ""), ensure_ascii=False))
+        prefix = self._cache_prefix(request)
+        cached = len(prefix) // 2 if prefix else 0
+        hit = prefix in self._cached
+        if prefix:
+            self._cached.add(prefix)
+        return _Usage(
+            input_tokens=size // 2 - cached,
+            output_tokens=output_tokens,
+            cache_read_input_tokens=cached if hit else 0,
+            cache_creation_input_tokens=0 if hit else cached,
+        )
+
+    def _cache_prefix(self, request: dict) -> str:
+        """Tools and system blocks up to the last cache_control marker, if cacheable"""
+        system = request.get("system", "")
+        if not isinstance(system, list):
+            return ""
+        marked = [i for i, block in enumerate(system) if "cache_control" in block]
+        if not marked:
+            return ""
+        prefix = json.dumps(request.get("tools", []), ensure_ascii=False)
+        prefix += json.dumps(system[: marked[-1] + 1], ensure_ascii=False)
+        minimum = 4096 if "haiku" in request.get("model", "") else 1024
+        return prefix if len(prefix) // 2 >= minimum else ""
+
+    def close(self):
+        pass
+
+
+class _AsyncStream(_SyncStream):
+    async def __aenter__(self) -> _AsyncStream:
+        await asyncio.sleep(self._fake.latency.llm_first_token)
+        return self
+
+    async def __aexit__(self, *exc_info) -> bool:
+        return False
+
+    @property
+    async def text_stream(self) -> AsyncIterator[str]:
+        for chunk in _chunks(self._text, 8):
+            await asyncio.sleep(self._fake.latency.llm_per_chunk)
+            yield chunk
+
+    async def __aiter__(self):
+        if not self._tool:
+            async for chunk in self.text_stream:
+                yield SimpleNamespace(
+                    type="content_block_delta", delta=SimpleNamespace(type="text_delta", text=chunk)
+                )
+            return
+        for chunk in _chunks(self._json, 16):
+            await asyncio.sleep(self._fake.latency.llm_per_chunk)
+            yield SimpleNamespace(
+                type="content_block_delta",
+                delta=SimpleNamespace(type="input_json_delta", partial_json=chunk),
+            )
+
+    async def get_final_message(self):
+        return super().get_final_message()
+
+
+class _AsyncMessages(_Messages):
+    async def create(self, **request):
+        self._fake.calls.hit("messages.create")
+        await asyncio.sleep(self._fake.latency.llm_first_token)
+        return self._response(request)
+
+    def stream(self, **request):
+        self._fake.calls.hit("messages.stream")
+        return _AsyncStream(self._fake, request)
+
+
+class FakeAsyncAnthropic(FakeAnthropic):
+    """AsyncAnthropic client stand-in, with the same answers as FakeAnthropic"""
+
+    def __init__(self, latency: Optional[Latency] = None, answer: Optional[str] = None):
+        super().__init__(latency, answer)
+        self.messages = _AsyncMessages(self)
+
+    async def close(self):
+        pass
+
+
+def _chunks(text: str, size: int) -> Iterator[str]:
+    for i in range(0, len(text), size):
+        yield text[i:i + size]
@@ -0,0 +1,303 @@
+"""Offline benchmarks for Echo
+
+Drives the main agent operations against in-process fakes (see fakes.py)
+and reports, per scenario, median wall time, backend calls per operation
+and peak traced allocations. Results are compared with a stored baseline;
+the run fails if a metric regresses beyond the threshold.
+
+Backend call counts are deterministic and always compared. Wall times and
+allocations depend on the machine, so they are compared only against a
+baseline given with --baseline, recorded on the machine that runs the
+comparison; the committed baseline gates call counts alone.
+
+Usage:
+    python -m benchmarks.run                      # run all, compare call counts
+    python -m benchmarks.run -s chat -s progress  # selected scenarios
+    python -m benchmarks.run --facts 50000        # bigger simulated user
+    python -m benchmarks.run --update-baseline    # record new shared baseline
+
+    # full comparison against a local baseline
+    python -m benchmarks.run --baseline local.json --update-baseline
+    python -m benchmarks.run --baseline local.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable
+
+from benchmarks.fakes import DataVolume, FakeAnthropic, FakeNeuroMemoryClient, Latency
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+# Allowed slowdown / growth before a metric counts as a regression
+DEFAULT_THRESHOLD = 0.25
+
+# Wall-time differences below this are noise regardless of the threshold
+MIN_WALL_DELTA_MS = 2.0
+
+
+@dataclass
+class Result:
+    scenario: str
+    iterations: int
+    wall_ms: float
+    calls: float
+    peak_kib: float
+
+
+@dataclass
+class Scenario:
+    name: str
+    iterations: int
+    run: Callable  # run(agent, i) -> None
+    setup: Callable = lambda agent: None
+
+
+def _chat(agent, i):
+    for _ in agent.chat_stream(f"第 {i} 个问题：Rust 的所有权和借用有什么区别？"):
+        pass
+
+
+def _graph(agent, i):
+    graph = agent.build_knowledge_graph(f"主题{i}", use_cache=False)
+    assert "error" not in graph, graph
+
+
+def _path(agent, i):
+    agent.create_learning_path(f"主题{i % 3}", "beginner")
+
+
+def _graph_setup(agent):
+    for i in range(3):
+        agent.build_knowledge_graph(f"主题{i}", use_cache=False)
+
+
+# Concepts in the synthetic graph of the replan scenario
+LARGE_GRAPH_CONCEPTS = 3000
+
+
+def _large_graph_setup(agent):
+    """A topic with thousands of concepts and random prerequisite edges"""
+    rng = random.Random(0)
+    store = agent.knowledge_graph.store
+    levels = ["beginner", "intermediate", "advanced"]
+    for i in range(LARGE_GRAPH_CONCEPTS):
+        store.add_concept("大主题", f"概念{i}", level=levels[i * 3 // LARGE_GRAPH_CONCEPTS])
+    for i in range(1, LARGE_GRAPH_CONCEPTS):
+        for _ in range(rng.randint(1, 3)):
+            store.add_edge(f"概念{rng.randrange(max(0, i - 100), i)}", f"概念{i}", "prerequisite")
+    agent.learning_path.plan("大主题", "beginner", {"skills": []})
+
+
+def _replan(agent, i):
+    agent.update_learning_progress("大主题", f"概念{i * 97 % LARGE_GRAPH_CONCEPTS}")
+
+
+def _progress(agent, i):
+    agent.get_learning_progress()
+    agent.memory.invalidate(agent.user_id)
+
+
+def _profile(agent, i):
+    agent.profile.invalidate()
+    agent.profile.update(user_name=agent.user_name)
+
+
+SCENARIOS = {
+    "chat": Scenario("chat", 10, _chat),
+    "knowledge_graph": Scenario("knowledge_graph", 3, _graph),
+    "learning_path": Scenario("learning_path", 5, _path, setup=_graph_setup),
+    "replan": Scenario("replan", 5, _replan, setup=_large_graph_setup),
+    "progress": Scenario("progress", 3, _progress),
+    "profile_update": Scenario("profile_update", 3, _profile),
+}
+
+
+def run_scenario(
+    scenario: Scenario, volume: DataVolume, latency: Latency, data_dir: Path
+) -> Result:
+    """Time one scenario on a fresh agent, then repeat it under tracemalloc"""
+    from echo.agent import EchoAgent
+
+    memory = FakeNeuroMemoryClient(volume, latency)
+    claude = FakeAnthropic(latency)
+
+    os.environ["ECHO_DATA_DIR"] = str(data_dir / scenario.name)
+    _reset_settings()
+    agent = EchoAgent(
+        user_id="bench",
+        neuromemory_client=memory,
+        claude_client=claude,
+    )
+    try:
+        _ = agent.memory.client  # connect now: auto-extract registration is a one-off
+        scenario.setup(agent)
+        memory.calls.reset()
+        claude.calls.reset()
+
+        timings = []
+        for i in range(scenario.iterations):
+            start = time.perf_counter()
+            scenario.run(agent, i)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        # Include deferred work (batched writes, background refreshes)
+        agent.conversation_buffer.flush(timeout=10)
+        agent._profile_refresher.flush()
+        calls = (memory.calls.total() + claude.calls.total()) / scenario.iterations
+
+        tracemalloc.start()
+        scenario.run(agent, scenario.iterations)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        agent.close()
+
+    return Result(
+        scenario=scenario.name,
+        iterations=scenario.iterations,
+        wall_ms=round(statistics.median(timings), 2),
+        calls=round(calls, 2),
+        peak_kib=round(peak / 1024, 1),
+    )
+
+
+def measure_import_time(runs: int = 5) -> Result:
+    """Start-up cost of `echo profile --path` over a bare interpreter
+
+    The fastest CLI path: imports the CLI module and resolves a path from
+    settings, without the agent or its clients.
+    """
+    def median_ms(*args: str) -> float:
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, *args], check=True, stdout=subprocess.DEVNULL)
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    startup = median_ms("-m", "echo.cli", "profile", "--path") - median_ms("-c", "pass")
+    return Result("import_cli", runs, round(startup, 2), 0, 0)
+
+
+def compare(
+    results: list[Result], baseline: dict, threshold: float, local: bool = False
+) -> list[str]:
+    """Regressions of results against the baseline, as readable lines
+
+    Args:
+        results: Measured results
+        baseline: Stored results per scenario
+        threshold: Allowed relative growth of wall time and allocations
+        local: The baseline was recorded on this machine, so wall time
+            and allocations are compared too (otherwise only call counts)
+    """
+    problems = []
+    for result in results:
+        base = baseline.get(result.scenario)
+        if base is None:
+            continue
+        if result.calls > base["calls"]:
+            problems.append(f"{result.scenario}: backend calls {base['calls']} -> {result.calls}")
+        if not local:
+            continue
+        if result.wall_ms > base["wall_ms"] * (1 + threshold) \
+                and result.wall_ms - base["wall_ms"] > MIN_WALL_DELTA_MS:
+            problems.append(f"{result.scenario}: wall {base['wall_ms']} -> {result.wall_ms} ms")
+        if base["peak_kib"] and result.peak_kib > base["peak_kib"] * (1 + threshold):
+            problems.append(
+                f"{result.scenario}: peak alloc {base['peak_kib']} -> {result.peak_kib} KiB"
+            )
+    return problems
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Echo offline benchmarks")
+    parser.add_argument("-s", "--scenario", action="append",
+                        choices=[*SCENARIOS, "import_cli"],
+                        help="Scenario to run (repeatable; default all)")
+    parser.add_argument("--facts", type=int, default=50_000,
+                        help="Facts stored for the simulated user")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Multiply all simulated latencies (0 = no latency)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed relative regression (default 0.25)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH,
+                        help="Baseline file; a non-default one is taken as recorded on "
+                             "this machine and also gates wall time and allocations")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Store results as the baseline")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    # Settings need credentials to load; the fakes never use them
+    os.environ.setdefault("ANTHROPIC_API_KEY", "benchmark")
+    os.environ.setdefault("NEUROMEMORY_API_KEY", "benchmark")
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    os.environ["METRICS_ENABLED"] = "false"
+
+    names = args.scenario or [*SCENARIOS, "import_cli"]
+    volume = DataVolume(facts=args.facts)
+    latency = Latency().scaled(args.latency_scale)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="echo-bench-") as tmp:
+        for name in names:
+            if name == "import_cli":
+                results.append(measure_import_time())
+            else:
+                results.append(run_scenario(SCENARIOS[name], volume, latency, Path(tmp)))
+
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=2))
+    else:
+        print(f"{'scenario':<18}{'iters':>6}{'wall ms':>12}{'calls/op':>10}{'peak KiB':>11}")
+        for r in results:
+            print(f"{r.scenario:<18}{r.iterations:>6}{r.wall_ms:>12.2f}{r.calls:>10.2f}{r.peak_kib:>11.1f}")
+
+    if args.update_baseline:
+        baseline = _load_baseline(args.baseline)
+        baseline.update({r.scenario: asdict(r) for r in results})
+        args.baseline.write_text(
+            json.dumps(baseline, indent=2, sort_keys=True) + "\n", encoding="utf-8"
+        )
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    local = args.baseline.resolve() != BASELINE_PATH.resolve()
+    problems = compare(results, _load_baseline(args.baseline), args.threshold, local)
+    if not local:
+        print("Compared backend calls only; pass --baseline with a local baseline "
+              "to gate wall time and allocations")
+    for problem in problems:
+        print(f"REGRESSION {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+def _load_baseline(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _reset_settings():
+    from echo.config import get_settings
+
+    get_settings.cache_clear()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
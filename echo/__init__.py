@@ -1,6 +1,23 @@
 """Echo - AI Personal Learning Assistant"""
 
-from echo.agent import EchoAgent
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from echo.agent import EchoAgent
+    from echo.async_agent import AsyncEchoAgent
 
 __version__ = "0.1.0"
-__all__ = ["EchoAgent"]
+__all__ = ["EchoAgent", "AsyncEchoAgent"]
+
+
+def __getattr__(name: str):
+    # Agents are imported on first access so `import echo` stays cheap
+    if name == "EchoAgent":
+        from echo.agent import EchoAgent
+
+        return EchoAgent
+    if name == "AsyncEchoAgent":
+        from echo.async_agent import AsyncEchoAgent
+
+        return AsyncEchoAgent
+    raise AttributeError(f"module 'echo' has no attribute {name!r}")
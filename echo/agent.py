@@ -3,21 +3,27 @@
 from __future__ import annotations
 
 import logging
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import cached_property
+from typing import TYPE_CHECKING, Callable, Iterator, Optional, Union
 
-from anthropic import Anthropic
-from neuromemory_client import NeuroMemoryClient
+from echo import metrics
+from echo.core import AgentCore, ChatResult
+from echo.knowledge.builder import GraphStreamBuilder
+from echo.session import Turn
+from echo.utils.concurrency import Deadline, HostLimiter, fan_out
+from echo.utils.llm import INTERACTIVE
+from echo.utils.llm_cache import ResponseCache, cache_key
+from echo.utils.prompts import KNOWLEDGE_GRAPH_PROMPT_VERSION
 
-from echo.config import get_settings
-from echo.knowledge.graph import KnowledgeGraph
-from echo.knowledge.path import LearningPath
-from echo.profile import UserProfile
-from echo.utils.prompts import SYSTEM_PROMPT, build_context_prompt
+if TYPE_CHECKING:
+    from anthropic import Anthropic
 
-logger = logging.getLogger(__name__)
+    from neuromemory_client import NeuroMemoryClient
 
+logger = logging.getLogger(__name__)
 
-class EchoAgent:
+class EchoAgent(AgentCore):
     """Echo - AI Personal Learning Assistant
 
     Features:
@@ -26,6 +32,10 @@ class EchoAgent:
     - Resource management
     - Progress tracking
 
+    Blocking clients; context sources and background work run on thread
+    pools. State and request building live in AgentCore, shared with
+    AsyncEchoAgent.
+
     Example:
         >>> agent = EchoAgent(user_id="alice")
         >>> agent.chat("我想学习 Rust 编程语言")
@@ -38,6 +48,9 @@ class EchoAgent:
         neuromemory_api_key: Optional[str] = None,
         claude_api_key: Optional[str] = None,
         user_name: Optional[str] = None,
+        llm_cache: Optional[ResponseCache] = None,
+        neuromemory_client: Optional[NeuroMemoryClient] = None,
+        claude_client: Optional[Anthropic] = None,
     ):
         """Initialize Echo agent
 
@@ -46,48 +59,44 @@ class EchoAgent:
             neuromemory_api_key: NeuroMemory API key (optional, from env)
             claude_api_key: Claude API key (optional, from env)
             user_name: User display name (optional, for profile generation)
+            llm_cache: Cache for LLM generations (optional, default is a
+                local SQLite cache unless disabled in settings; not closed
+                by close() when given)
+            neuromemory_client: Existing NeuroMemory client to use instead
+                of creating one (optional; not closed by close())
+            claude_client: Existing Anthropic client to use instead of
+                creating one (optional)
         """
-        settings = get_settings()
-
-        self.user_id = user_id
-        self.user_name = user_name or user_id
-        self.session_id = None  # Will be set on first interaction
-        self._conversation_count = 0  # Track conversations for profile updates
-
-        # Initialize NeuroMemory client
-        self.memory = NeuroMemoryClient(
-            api_key=neuromemory_api_key or settings.neuromemory_api_key,
-            base_url=settings.neuromemory_base_url,
+        super().__init__(
+            user_id,
+            neuromemory_api_key=neuromemory_api_key,
+            user_name=user_name,
+            llm_cache=llm_cache,
+            neuromemory_client=neuromemory_client,
         )
 
-        # Initialize Claude client
-        self.claude = Anthropic(
-            api_key=claude_api_key or settings.anthropic_api_key
+        # Remote queries (NeuroMemory context and progress) get their own
+        # bounded pool: calls stuck past their deadline hold its threads,
+        # and must not starve local sources or background work
+        self._remote_executor = ThreadPoolExecutor(
+            max_workers=self.settings.context_remote_workers, thread_name_prefix="echo-remote"
         )
+        # Local context sources (graph lookups, replica search)
+        self._local_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="echo-local")
 
-        # Initialize knowledge components
-        self.knowledge_graph = KnowledgeGraph(self.memory, user_id)
-        self.learning_path = LearningPath(self.memory, user_id)
+        self._claude_api_key = claude_api_key or self.settings.anthropic_api_key
+        if claude_client is not None:
+            self.claude = claude_client
 
-        # Initialize user profile manager
-        self.profile = UserProfile(self.memory, user_id)
+        logger.info(f"Echo agent initialized for user: {user_id}")
 
-        # Load existing profile for quick context
-        self.profile_content = self.profile.load()
-        if self.profile_content:
-            logger.info(f"Loaded existing profile for user: {user_id}")
+    @cached_property
+    def claude(self) -> Anthropic:
+        """Claude client, created on first use"""
+        from anthropic import Anthropic
 
-        # Enable auto memory extraction
-        try:
-            self.memory.conversations.enable_auto_extract(
-                user_id=user_id,
-                trigger="message_count",
-                threshold=10
-            )
-        except Exception as e:
-            logger.warning(f"Failed to enable auto-extract: {e}")
-
-        logger.info(f"Echo agent initialized for user: {user_id}")
+        # Retries are left to the dispatcher, which honours retry-after
+        return Anthropic(api_key=self._claude_api_key, max_retries=0)
 
     def chat(self, message: str) -> str:
         """Main chat interface
@@ -102,40 +111,89 @@ class EchoAgent:
             >>> response = agent.chat("我想学习 Python")
             >>> print(response)
         """
-        try:
-            # 1. Retrieve relevant context from memory
-            context = self._get_context(message)
-
-            # 2. Build prompt with context
-            prompt = build_context_prompt(message, context)
-
-            # 3. Call Claude
-            response = self.claude.messages.create(
-                model="claude-sonnet-4",
-                system=SYSTEM_PROMPT,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=2048,
-            )
+        result = None
+        for event in self.chat_stream(message):
+            if isinstance(event, ChatResult):
+                result = event
 
-            answer = response.content[0].text
+        return result.text if result else ""
 
-            # 4. Store conversation in memory
-            self._store_conversation(message, answer)
+    def chat_stream(self, message: str) -> Iterator[Union[str, ChatResult]]:
+        """Streaming chat interface
 
-            # 5. Check if this is a learning-related query
-            self._process_learning_intent(message, answer)
+        Yields text deltas as they arrive from Claude, followed by a single
+        ChatResult once the answer is complete. Conversation storage and
+        intent processing run after the stream has finished.
 
-            return answer
+        Args:
+            message: User message
 
-        except Exception as e:
-            logger.error(f"Chat error: {e}")
-            return f"抱歉，处理您的请求时出现错误：{str(e)}"
+        Yields:
+            Text deltas (str), then the final ChatResult
 
-    def build_knowledge_graph(self, topic: str) -> dict:
+        Example:
+            >>> for event in agent.chat_stream("我想学习 Python"):
+            ...     if isinstance(event, str):
+            ...         print(event, end="")
+        """
+        deadline = Deadline(self.settings.chat_deadline)
+        with metrics.span("chat"):
+            chunks = []
+            try:
+                # 1. Retrieve relevant context from memory, within its share
+                # of the turn's time budget
+                with metrics.span("chat.context") as context_span:
+                    context, degraded = self._get_context(message, deadline)
+                    if degraded:
+                        context_span.attrs["degraded"] = degraded
+
+                # 2. Build prompt with context and stream from Claude
+                with metrics.span("chat.llm") as llm_span:
+                    request = self._chat_request(message, context)
+                    with self.llm.stream(
+                        self.claude,
+                        request,
+                        self.user_id,
+                        INTERACTIVE,
+                        timeout=deadline.remaining(),
+                        task="chat",
+                    ) as stream:
+                        for text in stream.text_stream:
+                            if not chunks:
+                                llm_span.attrs["first_token_ms"] = llm_span.elapsed_ms()
+                            chunks.append(text)
+                            yield text
+                        response = stream.get_final_message()
+
+            except Exception as e:
+                logger.error(f"Chat error: {e}")
+                yield ChatResult(text=f"抱歉，处理您的请求时出现错误：{str(e)}", error=str(e))
+                return
+
+            answer = "".join(chunks)
+
+            # 3. Keep the turn in the session; storage and intent processing
+            # happen in the background
+            with metrics.span("chat.after_response"):
+                self.session.record(message, answer)
+                self._schedule_compaction()
+                self._after_response(message, answer)
+
+        yield ChatResult(text=answer, usage=self._usage_to_dict(response), degraded=degraded)
+
+    @metrics.timed("knowledge_graph.build")
+    def build_knowledge_graph(
+        self,
+        topic: str,
+        use_cache: bool = True,
+        refresh: bool = False,
+    ) -> dict:
         """Build knowledge graph for a topic
 
         Args:
             topic: Learning topic (e.g., "Rust", "Machine Learning")
+            use_cache: Read and write the LLM response cache
+            refresh: Skip cached results but store the new generation
 
         Returns:
             Graph structure
@@ -147,31 +205,29 @@ class EchoAgent:
         logger.info(f"Building knowledge graph for: {topic}")
 
         try:
-            # Use LLM to generate knowledge structure
-            prompt = f"""为主题 "{topic}" 构建知识图谱。
-
-请生成：
-1. 核心概念列表（5-10个）
-2. 概念之间的关系
-3. 学习的先后顺序
-4. 每个概念的难度级别
-
-以 JSON 格式返回。"""
-
-            response = self.claude.messages.create(
-                model="claude-sonnet-4",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=2048,
-            )
-
-            # Parse and store in graph database
-            graph_data = self._parse_knowledge_graph(response.content[0].text)
-            self.knowledge_graph.build_from_data(topic, graph_data)
+            request = self._knowledge_graph_request(topic)
+            key = cache_key(request["model"], KNOWLEDGE_GRAPH_PROMPT_VERSION, topic=topic)
+
+            graph_data = self._cache_get(key, use_cache, refresh)
+            if graph_data is not None and self.knowledge_graph.store.has_topic(topic):
+                logger.info(f"Knowledge graph for {topic} served from cache")
+                return graph_data
+
+            if graph_data is None:
+                # Stream the structure from the LLM, validating each concept
+                # and relationship as it arrives
+                graph_data = self._stream_knowledge_graph(topic, request)
+                if "error" in graph_data:
+                    return graph_data
+                self._cache_put(key, graph_data, use_cache)
+            else:
+                # Store cached structure in graph database
+                self.knowledge_graph.build_from_data(topic, graph_data)
 
             logger.info(f"Knowledge graph built for {topic}")
 
-            # Update profile after significant learning event
-            self.update_profile()
+            # Refresh profile in the background after significant learning event
+            self.request_profile_update("facts", "episodes")
 
             return graph_data
 
@@ -179,6 +235,7 @@ class EchoAgent:
             logger.error(f"Failed to build knowledge graph: {e}")
             return {"error": str(e)}
 
+    @metrics.timed("learning_path.create")
     def create_learning_path(
         self,
         topic: str,
@@ -224,6 +281,34 @@ class EchoAgent:
 
         return path
 
+    @metrics.timed("learning_path.progress")
+    def update_learning_progress(
+        self,
+        topic: str,
+        completed: str,
+        current_level: str = "beginner"
+    ) -> dict:
+        """Record a finished concept and replan the topic
+
+        Args:
+            topic: Topic being learned
+            completed: Concept the user has finished
+            current_level: beginner/intermediate/advanced
+
+        Returns:
+            Updated learning path structure
+
+        Example:
+            >>> path = agent.update_learning_progress("Rust", "所有权")
+        """
+        self.learning_path.update_progress(topic, completed)
+        return self.learning_path.plan(
+            topic=topic,
+            current_level=current_level,
+            background=self._get_user_background(),
+        )
+
+    @metrics.timed("resource.add")
     def add_resource(
         self,
         url: str,
@@ -246,49 +331,91 @@ class EchoAgent:
             ...     tags=["rust", "official"]
             ... )
         """
-        logger.info(f"Adding resource: {url}")
+        result = self._ingest_resource(url, category)
 
-        try:
-            # Download and store using NeuroMemory
-            doc = self.memory.files.add_url(
-                user_id=self.user_id,
-                url=url,
-                category=category,
-                auto_extract=True,
-                format="markdown"
-            )
+        if "error" not in result:
+            # Refresh profile in the background after adding resource
+            self.request_profile_update("user_profile", "facts")
 
-            # Extract and link to knowledge graph
-            self._link_resource_to_knowledge(doc)
+        return result
 
-            # Update profile after adding resource
-            self.update_profile()
+    @metrics.timed("resource.add_many")
+    def add_resources(
+        self,
+        urls: list[str],
+        category: str = "learning",
+        tags: Optional[list[str]] = None,
+        concurrency: Optional[int] = None,
+        on_progress: Optional[Callable[[int, int, str, dict], None]] = None,
+    ) -> list[dict]:
+        """Add many learning resources concurrently
 
-            return doc
+        URLs are ingested on a bounded pool with per-host politeness limits
+        (``bulk_add_per_host`` concurrent requests, ``bulk_add_host_delay``
+        seconds between request starts). The profile is refreshed once at
+        the end instead of once per resource.
 
-        except Exception as e:
-            logger.error(f"Failed to add resource: {e}")
-            return {"error": str(e)}
+        Args:
+            urls: Resource URLs (duplicates are ingested once)
+            category: Resource category
+            tags: Tags for categorization
+            concurrency: Maximum concurrent ingestions (default from settings)
+            on_progress: Called as on_progress(done, total, url, result)
+                after each URL completes
+
+        Returns:
+            One result per unique URL, in input order. Failed entries carry
+            an "error" key.
+
+        Example:
+            >>> results = agent.add_resources(open("reading_list.txt").read().split())
+            >>> failed = [r for r in results if "error" in r]
+        """
+        urls = list(dict.fromkeys(urls))
+        total = len(urls)
+        if not total:
+            return []
 
+        logger.info(f"Adding {total} resources")
+
+        limiter = HostLimiter(
+            per_host=self.settings.bulk_add_per_host,
+            min_interval=self.settings.bulk_add_host_delay,
+        )
+        workers = min(concurrency or self.settings.bulk_add_concurrency, total)
+        results: dict[str, dict] = {}
+        done = 0
+
+        def ingest(url: str) -> dict:
+            with limiter.slot(url):
+                return self._ingest_resource(url, category)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="echo-ingest") as pool:
+            futures = {pool.submit(ingest, url): url for url in urls}
+            for future in as_completed(futures):
+                url = futures[future]
+                results[url] = future.result()
+                done += 1
+                if on_progress is not None:
+                    on_progress(done, total, url, results[url])
+
+        if any("error" not in r for r in results.values()):
+            self.request_profile_update("user_profile", "facts")
+
+        return [results[url] for url in urls]
+
+    @metrics.timed("progress")
     def get_learning_progress(self) -> dict:
         """Get user's learning progress
 
         Returns:
             Progress summary
         """
-        # Query from memory
-        profile = self.memory.memory.get_user_profile(self.user_id)
-
-        # Calculate progress metrics
-        progress = {
-            "topics": self._get_learning_topics(),
-            "resources_added": profile.get("documents_count", 0),
-            "knowledge_points": self._count_knowledge_points(),
-            "recent_activities": self._get_recent_activities(),
-        }
-
-        return progress
+        # Backend queries run concurrently; topics come from the local graph
+        results, missed = fan_out(self._remote_executor, self._progress_sources())
+        return self._build_progress(results, missed)
 
+    @metrics.timed("review")
     def review_knowledge(self, topic: Optional[str] = None) -> list[dict]:
         """Generate review questions
 
@@ -325,74 +452,142 @@ class EchoAgent:
             >>> agent.update_profile()
             '/Users/alice/.echo/profiles/alice_ECHO.md'
         """
-        logger.info(f"Updating profile for user: {self.user_id}")
+        return self._update_profile()
 
-        try:
-            self.profile.update(user_name=self.user_name)
-            self.profile_content = self.profile.load()
-            logger.info("Profile updated successfully")
-            return str(self.profile.profile_path)
+    def enqueue_learning_jobs(self, topic: str, level: str = "beginner") -> list[int]:
+        """Prepare a topic in the background
 
-        except Exception as e:
-            logger.error(f"Failed to update profile: {e}")
-            return ""
+        Queues a knowledge-graph build and, once it is done, learning-path
+        generation. A topic already queued, running or prepared within
+        ``jobs_dedupe_window`` is not queued again.
 
-    def get_profile_path(self) -> str:
-        """Get path to user's ECHO.md profile
+        Args:
+            topic: Topic to prepare
+            level: Level for the learning path
 
         Returns:
-            Absolute path to profile file
+            IDs of the graph and path jobs (new or existing)
+
+        Example:
+            >>> agent.enqueue_learning_jobs("Rust")
+            [12, 13]
         """
-        return str(self.profile.profile_path)
+        return self._enqueue_learning_jobs(topic, level)
 
-    # ========== Private Helper Methods ==========
+    def run_pending_jobs(self) -> int:
+        """Run this user's due background jobs in the calling thread
 
-    def _get_context(self, message: str) -> dict:
-        """Retrieve relevant context from memory"""
-        # Semantic search across all memory types
-        results = self.memory.memory.search(
-            user_id=self.user_id,
-            query=message,
-            memory_types=["preference", "fact", "episodic", "document"],
-            limit=5
-        )
+        Returns:
+            Number of jobs run
+        """
+        return self._job_worker.run_pending()
 
-        return {
-            "relevant_memories": results,
-            "preferences": self.memory.memory.get_preferences(self.user_id),
-        }
+    def close(self):
+        """Cleanup resources"""
+        for executor in (self._remote_executor, self._local_executor):
+            executor.shutdown(wait=False, cancel_futures=True)
+        super().close()
+
+    # ========== Private Helper Methods ==========
+
+    def _schedule_compaction(self):
+        """Fold old turns into the session summary in the background"""
+        turns = self.session.overflow()
+        if turns:
+            self._background.submit(self._compact_session, turns)
 
-    def _store_conversation(self, user_message: str, assistant_response: str):
-        """Store conversation in memory"""
+    @metrics.timed("session.compact")
+    def _compact_session(self, turns: list[Turn]):
+        """Summarize ``turns`` and fold them into the session"""
         try:
-            self.memory.conversations.add_messages(
-                user_id=self.user_id,
-                session_id=self.session_id,
-                messages=[
-                    {"role": "user", "content": user_message},
-                    {"role": "assistant", "content": assistant_response}
-                ]
+            response = self.llm.create(
+                self.claude, self._session_summary_request(turns), self.user_id,
+                task="session_summary",
             )
+            summary = "".join(b.text for b in response.content if b.type == "text")
+        except Exception as e:
+            logger.warning(f"Session summary failed, using local fallback: {e}")
+            summary = ""
 
-            # Update conversation counter
-            self._conversation_count += 1
+        self.session.fold(turns, summary.strip() or self.session.fallback_summary(turns))
 
-            # Update profile every 10 conversations
-            if self._conversation_count % 10 == 0:
-                logger.info("Triggering profile update after 10 conversations")
-                self.update_profile()
+    def _stream_knowledge_graph(self, topic: str, request: dict) -> dict:
+        """Generate a graph over a streamed tool call
 
-        except Exception as e:
-            logger.warning(f"Failed to store conversation: {e}")
+        Concepts and relationships are validated as soon as their JSON
+        closes and stored together once the graph is complete. Fragments
+        that fail are regenerated one by one rather than regenerating the
+        whole graph.
+        """
+        builder = GraphStreamBuilder(self.knowledge_graph, topic)
+
+        stream_call = self.llm.stream(self.claude, request, self.user_id, task="knowledge_graph")
+        with metrics.span("knowledge_graph.llm"), stream_call as stream:
+            for event in stream:
+                if event.type == "content_block_delta" \
+                        and getattr(event.delta, "type", None) == "input_json_delta":
+                    builder.feed(event.delta.partial_json)
+            response = stream.get_final_message()
+        builder.end_stream()
+
+        if builder.empty:
+            # The model answered in prose instead of calling the tool
+            text = "".join(b.text for b in response.content if b.type == "text")
+            builder.add_graph(self._parse_knowledge_graph(text))
+
+        for key, fragment, problems in builder.take_failed():
+            if key == "learning_path":
+                continue
+            try:
+                repaired = self._repair_graph_fragment(topic, key, fragment, problems)
+            except Exception as e:
+                logger.warning(f"Failed to repair graph fragment: {e}")
+                continue
+            if repaired is None or not builder.add(key, repaired):
+                logger.warning(f"Dropping unrepairable {key} fragment: {fragment[:80]}")
+
+        return builder.finish()
+
+    def _repair_graph_fragment(
+        self, topic: str, key: str, fragment: str, problems: list[str]
+    ) -> Optional[dict]:
+        """Ask the model to regenerate a single failing fragment"""
+        response = self.llm.create(
+            self.claude,
+            self._graph_repair_request(topic, key, fragment, problems),
+            self.user_id,
+            task="graph_repair",
+        )
+        return self._tool_input(response)
 
-    def _process_learning_intent(self, message: str, response: str):
-        """Detect and process learning-related intents"""
-        # Keywords that indicate learning intent
-        learning_keywords = ["学习", "想学", "教我", "了解", "掌握", "提升"]
+    def _get_context(
+        self, message: str, deadline: Optional[Deadline] = None
+    ) -> tuple[dict, list[str]]:
+        """Retrieve relevant context from memory
 
-        if any(kw in message for kw in learning_keywords):
-            logger.info("Learning intent detected, will trigger knowledge graph building")
-            # Could trigger background task here
+        All context sources are queried concurrently, each with its own
+        deadline, capped by the turn's budget. A source that misses its
+        deadline, fails, or whose backend circuit is open contributes an
+        empty value instead of delaying the turn.
+
+        Returns:
+            (context, degraded source names)
+        """
+        sources = self._context_sources(message)
+        admitted, breakers, degraded = self._admit_sources(sources, deadline)
+        # Sources without a breaker are local and run off the remote pool
+        local = {name: self._local_executor for name in admitted if name not in breakers}
+        results, missed = fan_out(self._remote_executor, admitted, executors=local)
+
+        return self._settle_sources(sources, results, missed, breakers, degraded)
+
+    def _run_graph_job(self, payload: dict):
+        graph = self.build_knowledge_graph(payload["topic"])
+        if "error" in graph:
+            raise RuntimeError(graph["error"])
+
+    def _run_path_job(self, payload: dict):
+        self.create_learning_path(payload["topic"], payload.get("level", "beginner"))
 
     def _get_user_background(self) -> dict:
         """Get user's background knowledge"""
@@ -406,29 +601,28 @@ class EchoAgent:
             "skills": [f["content"] for f in facts],
         }
 
-    def _parse_knowledge_graph(self, llm_response: str) -> dict:
-        """Parse LLM response into graph structure"""
-        # TODO: Implement JSON parsing and validation
-        import json
+    def _ingest_resource(self, url: str, category: str) -> dict:
+        """Download, store and link a single resource"""
+        logger.info(f"Adding resource: {url}")
+
         try:
-            return json.loads(llm_response)
-        except:
-            return {"raw": llm_response}
+            # Download and store using NeuroMemory
+            doc = self.memory.files.add_url(
+                user_id=self.user_id,
+                url=url,
+                category=category,
+                auto_extract=True,
+                format="markdown"
+            )
 
-    def _link_resource_to_knowledge(self, doc: dict):
-        """Link resource to knowledge graph"""
-        # TODO: Extract topics and link to graph
-        pass
+            # Extract and link to knowledge graph
+            self._link_resource_to_knowledge(doc)
 
-    def _get_learning_topics(self) -> list[str]:
-        """Get all topics user is learning"""
-        # Query from graph or memory
-        return []
+            return {"url": url, **doc} if isinstance(doc, dict) else doc
 
-    def _count_knowledge_points(self) -> int:
-        """Count total knowledge points"""
-        facts = self.memory.memory.get_facts(self.user_id, limit=1000)
-        return len(facts)
+        except Exception as e:
+            logger.error(f"Failed to add resource {url}: {e}")
+            return {"url": url, "error": str(e)}
 
     def _get_recent_activities(self, days: int = 7) -> list[dict]:
         """Get recent learning activities"""
@@ -437,12 +631,3 @@ class EchoAgent:
             limit=10
         )
         return episodes
-
-    def _generate_review_questions(self, knowledge: list[dict]) -> list[dict]:
-        """Generate review questions from knowledge points"""
-        # TODO: Use LLM to generate questions
-        return []
-
-    def close(self):
-        """Cleanup resources"""
-        self.memory.close()
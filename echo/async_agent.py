@@ -0,0 +1,537 @@
+"""Asyncio-native Echo agent"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Coroutine, Optional, Union
+
+from anthropic import AsyncAnthropic
+
+from echo import metrics
+from echo.config import get_settings
+from echo.core import AgentCore, ChatResult
+from echo.knowledge.builder import GraphStreamBuilder
+from echo.session import Turn
+from echo.utils.concurrency import Deadline, afan_out
+from echo.utils.llm import INTERACTIVE
+from echo.utils.llm_cache import ResponseCache, cache_key
+from echo.utils.prompts import KNOWLEDGE_GRAPH_PROMPT_VERSION
+
+logger = logging.getLogger(__name__)
+
+try:
+    from neuromemory_client import AsyncNeuroMemoryClient
+except ImportError:  # SDK without a native async client
+    AsyncNeuroMemoryClient = None
+
+# Bounded pool shared by every AsyncEchoAgent for SDK calls that have no
+# native async variant. Its size caps blocking I/O, not the number of users.
+_offload_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_offload_executor() -> ThreadPoolExecutor:
+    global _offload_executor
+    if _offload_executor is None:
+        _offload_executor = ThreadPoolExecutor(
+            max_workers=get_settings().async_offload_workers,
+            thread_name_prefix="echo-async",
+        )
+    return _offload_executor
+
+
+class AsyncMemory:
+    """Awaitable facade over a NeuroMemory client
+
+    Mirrors the client's namespaces (``memory``, ``conversations``,
+    ``files``). Coroutine methods of a native async client are passed
+    through; blocking methods run on the shared offload pool.
+
+    Example:
+        >>> memory = AsyncMemory(NeuroMemoryClient(api_key="..."))
+        >>> await memory.memory.get_preferences("alice")
+    """
+
+    def __init__(self, target: Any):
+        self._target = target
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+
+        if not callable(attr):
+            return AsyncMemory(attr)
+
+        if inspect.iscoroutinefunction(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                _get_offload_executor(),
+                functools.partial(contextvars.copy_context().run, attr, *args, **kwargs),
+            )
+
+        return call
+
+
+class AsyncEchoAgent(AgentCore):
+    """Asyncio-native Echo agent
+
+    Same surface as EchoAgent, with coroutines. Claude calls go through
+    AsyncAnthropic and NeuroMemory calls through ``async_memory`` (the
+    SDK's native async client when it ships one), so a single event loop
+    can serve many concurrent users. State, prompts and request building
+    are shared with EchoAgent through AgentCore; local components that
+    only have a blocking API (graph store, profile, write-behind buffer,
+    LLM cache) run on the shared offload pool.
+
+    Background jobs queued from chat run their coroutines on the event
+    loop the agent was created on.
+
+    Example:
+        >>> async with AsyncEchoAgent(user_id="alice") as agent:
+        ...     await agent.chat("我想学习 Rust 编程语言")
+    """
+
+    def __init__(
+        self,
+        user_id: str,
+        neuromemory_api_key: Optional[str] = None,
+        claude_api_key: Optional[str] = None,
+        user_name: Optional[str] = None,
+        llm_cache: Optional[ResponseCache] = None,
+        neuromemory_client: Any = None,
+        async_neuromemory_client: Any = None,
+        claude_client: Optional[AsyncAnthropic] = None,
+    ):
+        """Initialize async Echo agent
+
+        Args:
+            user_id: Unique user identifier
+            neuromemory_api_key: NeuroMemory API key (optional, from env)
+            claude_api_key: Claude API key (optional, from env)
+            user_name: User display name (optional, for profile generation)
+            llm_cache: Cache for LLM generations (optional, see EchoAgent)
+            neuromemory_client: Existing sync NeuroMemory client (optional)
+            async_neuromemory_client: Existing native async NeuroMemory
+                client (optional)
+            claude_client: Existing AsyncAnthropic client (optional)
+
+        Injected clients are shared, not owned: close() leaves them open.
+        """
+        super().__init__(
+            user_id,
+            neuromemory_api_key=neuromemory_api_key,
+            user_name=user_name,
+            llm_cache=llm_cache,
+            neuromemory_client=neuromemory_client,
+        )
+
+        # Prefer the SDK's native async client when it ships one
+        self._native_memory = async_neuromemory_client
+        self._owns_native_memory = False
+        if self._native_memory is None and neuromemory_client is None \
+                and AsyncNeuroMemoryClient is not None:
+            self._native_memory = AsyncNeuroMemoryClient(
+                api_key=self._neuromemory_api_key,
+                base_url=self.settings.neuromemory_base_url,
+            )
+            self._owns_native_memory = True
+
+        # Awaitable NeuroMemory calls; self.memory stays the sync client
+        # the local components share
+        self.async_memory = AsyncMemory(
+            self._native_memory if self._native_memory is not None else self.memory
+        )
+
+        self._owns_claude = claude_client is None
+        self.claude = claude_client or AsyncAnthropic(
+            api_key=claude_api_key or self.settings.anthropic_api_key,
+            max_retries=0,
+        )
+
+        # Loop that background job handlers schedule their coroutines on
+        try:
+            self._loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+
+        # Background session summaries, kept referenced until they finish
+        self._compactions: set[asyncio.Task] = set()
+
+        logger.info(f"Async Echo agent initialized for user: {user_id}")
+
+    async def __aenter__(self) -> AsyncEchoAgent:
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def chat(self, message: str) -> str:
+        """Main chat interface
+
+        Args:
+            message: User message
+
+        Returns:
+            Assistant response
+        """
+        result = None
+        async for event in self.chat_stream(message):
+            if isinstance(event, ChatResult):
+                result = event
+
+        return result.text if result else ""
+
+    async def chat_stream(self, message: str) -> AsyncIterator[Union[str, ChatResult]]:
+        """Streaming chat interface
+
+        Yields text deltas, then a single ChatResult once the answer is
+        complete.
+
+        Args:
+            message: User message
+        """
+        self._loop = asyncio.get_running_loop()
+        deadline = Deadline(self.settings.chat_deadline)
+        with metrics.span("chat"):
+            chunks = []
+            try:
+                with metrics.span("chat.context") as context_span:
+                    context, degraded = await self._get_context(message, deadline)
+                    if degraded:
+                        context_span.attrs["degraded"] = degraded
+
+                with metrics.span("chat.llm") as llm_span:
+                    request = self._chat_request(message, context)
+                    async with self.llm.astream(
+                        self.claude,
+                        request,
+                        self.user_id,
+                        INTERACTIVE,
+                        timeout=deadline.remaining(),
+                        task="chat",
+                    ) as stream:
+                        async for text in stream.text_stream:
+                            if not chunks:
+                                llm_span.attrs["first_token_ms"] = llm_span.elapsed_ms()
+                            chunks.append(text)
+                            yield text
+                        response = await stream.get_final_message()
+
+            except Exception as e:
+                logger.error(f"Chat error: {e}")
+                yield ChatResult(text=f"抱歉，处理您的请求时出现错误：{str(e)}", error=str(e))
+                return
+
+            answer = "".join(chunks)
+
+            with metrics.span("chat.after_response"):
+                self.session.record(message, answer)
+                turns = self.session.overflow()
+                if turns:
+                    task = asyncio.create_task(self._compact_session(turns))
+                    self._compactions.add(task)
+                    task.add_done_callback(self._compactions.discard)
+
+                self._after_response(message, answer)
+
+        yield ChatResult(text=answer, usage=self._usage_to_dict(response), degraded=degraded)
+
+    @metrics.timed("knowledge_graph.build")
+    async def build_knowledge_graph(
+        self,
+        topic: str,
+        use_cache: bool = True,
+        refresh: bool = False,
+    ) -> dict:
+        """Build knowledge graph for a topic
+
+        Args:
+            topic: Learning topic (e.g., "Rust", "Machine Learning")
+            use_cache: Read and write the LLM response cache
+            refresh: Skip cached results but store the new generation
+
+        Returns:
+            Graph structure
+        """
+        logger.info(f"Building knowledge graph for: {topic}")
+
+        try:
+            request = self._knowledge_graph_request(topic)
+            key = cache_key(request["model"], KNOWLEDGE_GRAPH_PROMPT_VERSION, topic=topic)
+
+            graph_data = await self._offload(self._cache_get, key, use_cache, refresh)
+            if graph_data is not None and self.knowledge_graph.store.has_topic(topic):
+                return graph_data
+
+            if graph_data is None:
+                graph_data = await self._stream_knowledge_graph(topic, request)
+                if "error" in graph_data:
+                    return graph_data
+                await self._offload(self._cache_put, key, graph_data, use_cache)
+            else:
+                await self._offload(self.knowledge_graph.build_from_data, topic, graph_data)
+
+            logger.info(f"Knowledge graph built for {topic}")
+
+            self.request_profile_update("facts", "episodes")
+
+            return graph_data
+
+        except Exception as e:
+            logger.error(f"Failed to build knowledge graph: {e}")
+            return {"error": str(e)}
+
+    @metrics.timed("learning_path.create")
+    async def create_learning_path(self, topic: str, current_level: str = "beginner") -> dict:
+        """Create personalized learning path
+
+        Args:
+            topic: What to learn
+            current_level: beginner/intermediate/advanced
+
+        Returns:
+            Learning path structure
+        """
+        logger.info(f"Creating learning path for {topic} (level: {current_level})")
+
+        facts = await self.async_memory.memory.get_facts(
+            user_id=self.user_id,
+            category="skill",
+            limit=20
+        )
+        background = {"skills": [f["content"] for f in facts]}
+
+        path = self.learning_path.plan(
+            topic=topic,
+            current_level=current_level,
+            background=background
+        )
+
+        await self.async_memory.add_memory(
+            user_id=self.user_id,
+            content=f"学习路径：{topic}",
+            memory_type="plan",
+            metadata={
+                "topic": topic,
+                "level": current_level,
+                "path": path
+            }
+        )
+
+        return path
+
+    @metrics.timed("resource.add")
+    async def add_resource(
+        self,
+        url: str,
+        category: str = "learning",
+        tags: Optional[list[str]] = None
+    ) -> dict:
+        """Add learning resource (URL or document)
+
+        Args:
+            url: Resource URL
+            category: Resource category
+            tags: Tags for categorization
+
+        Returns:
+            Resource metadata
+        """
+        logger.info(f"Adding resource: {url}")
+
+        try:
+            doc = await self.async_memory.files.add_url(
+                user_id=self.user_id,
+                url=url,
+                category=category,
+                auto_extract=True,
+                format="markdown"
+            )
+
+            self._link_resource_to_knowledge(doc)
+
+            self.request_profile_update()
+
+            return doc
+
+        except Exception as e:
+            logger.error(f"Failed to add resource: {e}")
+            return {"error": str(e)}
+
+    @metrics.timed("progress")
+    async def get_learning_progress(self) -> dict:
+        """Get user's learning progress
+
+        Returns:
+            Progress summary
+        """
+        sources = self._progress_sources(memory=self.async_memory)
+
+        # Counting may page through the sync client
+        count, timeout = sources["knowledge_points"]
+        sources["knowledge_points"] = (lambda: self._offload(count), timeout)
+
+        results, missed = await afan_out(sources)
+        return await self._offload(self._build_progress, results, missed)
+
+    @metrics.timed("review")
+    async def review_knowledge(self, topic: Optional[str] = None) -> list[dict]:
+        """Generate review questions
+
+        Args:
+            topic: Specific topic to review (optional)
+
+        Returns:
+            List of review questions
+        """
+        if topic:
+            knowledge = await self.async_memory.memory.get_facts(
+                user_id=self.user_id,
+                category=topic
+            )
+        else:
+            knowledge = await self.async_memory.memory.get_facts(
+                user_id=self.user_id,
+                limit=10
+            )
+
+        return self._generate_review_questions(knowledge)
+
+    async def update_profile(self) -> str:
+        """Update user's ECHO.md profile
+
+        Returns:
+            Path to the updated profile file
+        """
+        return await self._offload(self._update_profile)
+
+    async def enqueue_learning_jobs(self, topic: str, level: str = "beginner") -> list[int]:
+        """Prepare a topic in the background (see EchoAgent.enqueue_learning_jobs)"""
+        self._loop = asyncio.get_running_loop()
+        return await self._offload(self._enqueue_learning_jobs, topic, level)
+
+    async def run_pending_jobs(self) -> int:
+        """Run this user's due background jobs (see EchoAgent.run_pending_jobs)"""
+        self._loop = asyncio.get_running_loop()
+        return await self._offload(self._job_worker.run_pending)
+
+    async def close(self):
+        """Cleanup resources"""
+        for task in list(self._compactions):
+            task.cancel()
+        if self._owns_claude:
+            await self.claude.close()
+        if self._owns_native_memory:
+            result = self._native_memory.close()
+            if inspect.isawaitable(result):
+                await result
+        await self._offload(super().close)
+
+    # ========== Private Helper Methods ==========
+
+    async def _offload(self, fn, *args, **kwargs) -> Any:
+        """Run a blocking helper on the shared offload pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _get_offload_executor(),
+            functools.partial(contextvars.copy_context().run, fn, *args, **kwargs),
+        )
+
+    def _run_on_loop(self, coro: Coroutine) -> Any:
+        """Run one of this agent's coroutines from a job worker thread"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            coro.close()
+            raise RuntimeError("No event loop to run background jobs on")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def _run_graph_job(self, payload: dict):
+        graph = self._run_on_loop(self.build_knowledge_graph(payload["topic"]))
+        if "error" in graph:
+            raise RuntimeError(graph["error"])
+
+    def _run_path_job(self, payload: dict):
+        self._run_on_loop(
+            self.create_learning_path(payload["topic"], payload.get("level", "beginner"))
+        )
+
+    async def _get_context(
+        self, message: str, deadline: Optional[Deadline] = None
+    ) -> tuple[dict, list[str]]:
+        """Retrieve relevant context from memory concurrently (see EchoAgent)"""
+        sources = self._context_sources(message, memory=self.async_memory)
+
+        # Replica search is local but blocking (query embedding, matrix
+        # product), and falls back to the sync client
+        if self._fresh_replica() is not None:
+            _, timeout = sources["relevant_memories"]
+            sources["relevant_memories"] = (
+                lambda: self._offload(self._search_memories, message), timeout
+            )
+
+        admitted, breakers, skipped = self._admit_sources(sources, deadline)
+        results, missed = await afan_out(admitted)
+
+        return self._settle_sources(sources, results, missed, breakers, skipped)
+
+    async def _stream_knowledge_graph(self, topic: str, request: dict) -> dict:
+        """Generate a graph over a streamed tool call (see EchoAgent)"""
+        builder = GraphStreamBuilder(self.knowledge_graph, topic)
+
+        with metrics.span("knowledge_graph.llm"):
+            async with self.llm.astream(
+                self.claude, request, self.user_id, task="knowledge_graph"
+            ) as stream:
+                async for event in stream:
+                    if event.type == "content_block_delta" \
+                            and getattr(event.delta, "type", None) == "input_json_delta":
+                        builder.feed(event.delta.partial_json)
+                response = await stream.get_final_message()
+        builder.end_stream()
+
+        if builder.empty:
+            text = "".join(b.text for b in response.content if b.type == "text")
+            builder.add_graph(self._parse_knowledge_graph(text))
+
+        for key, fragment, problems in builder.take_failed():
+            if key == "learning_path":
+                continue
+            try:
+                response = await self.llm.acreate(
+                    self.claude,
+                    self._graph_repair_request(topic, key, fragment, problems),
+                    self.user_id,
+                    task="graph_repair",
+                )
+            except Exception as e:
+                logger.warning(f"Failed to repair graph fragment: {e}")
+                continue
+            repaired = self._tool_input(response)
+            if repaired is None or not builder.add(key, repaired):
+                logger.warning(f"Dropping unrepairable {key} fragment: {fragment[:80]}")
+
+        return await self._offload(builder.finish)
+
+    @metrics.timed("session.compact")
+    async def _compact_session(self, turns: list[Turn]):
+        """Summarize ``turns`` and fold them into the session"""
+        try:
+            response = await self.llm.acreate(
+                self.claude, self._session_summary_request(turns), self.user_id,
+                task="session_summary",
+            )
+            summary = "".join(b.text for b in response.content if b.type == "text")
+        except asyncio.CancelledError:
+            self.session.cancel_fold()
+            raise
+        except Exception as e:
+            logger.warning(f"Session summary failed, using local fallback: {e}")
+            summary = ""
+
+        self.session.fold(turns, summary.strip() or self.session.fallback_summary(turns))
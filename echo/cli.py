@@ -1,12 +1,20 @@
 """CLI interface for Echo agent"""
 
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
 import typer
 from rich.console import Console
-from rich.markdown import Markdown
 from rich.panel import Panel
 
-from echo import EchoAgent
-from echo.config import get_settings
+if TYPE_CHECKING:
+    from echo.agent import EchoAgent
+
+# The agent and settings (anthropic, pydantic-settings, the NeuroMemory
+# client) are imported inside the commands that need them, so that
+# `echo --help` and `echo profile --path` start in well under 100 ms.
 
 app = typer.Typer(help="Echo - AI Personal Learning Assistant")
 console = Console()
@@ -15,8 +23,14 @@ console = Console()
 @app.command()
 def chat(
     user_id: str = typer.Option(None, help="User ID"),
+    stream: bool = typer.Option(
+        True, "--stream/--no-stream", help="Render the answer as it arrives"
+    ),
 ):
     """Start interactive chat with Echo"""
+    from echo import EchoAgent
+    from echo.config import get_settings
+
     settings = get_settings()
     user_id = user_id or settings.echo_user_id
 
@@ -25,7 +39,7 @@ def chat(
         f"User: {user_id}",
         border_style="blue"
     ))
-    console.print("Type 'exit' or 'quit' to end the session\n")
+    console.print("Type 'exit' or 'quit' to end the session, '/new' to start over\n")
 
     # Initialize agent
     try:
@@ -47,12 +61,21 @@ def chat(
             if not user_input.strip():
                 continue
 
+            if user_input.strip() == "/new":
+                agent.new_session()
+                console.print("[blue]Started a new session[/blue]\n")
+                continue
+
             # Get response
             console.print("[bold blue]Echo:[/bold blue] ", end="")
-            response = agent.chat(user_input)
 
-            # Display response
-            console.print(Markdown(response))
+            if stream:
+                _render_stream(agent, user_input)
+            else:
+                from rich.markdown import Markdown
+
+                response = agent.chat(user_input)
+                console.print(Markdown(response))
             console.print()
 
         except KeyboardInterrupt:
@@ -65,13 +88,42 @@ def chat(
     agent.close()
 
 
+def _render_stream(agent: EchoAgent, message: str):
+    """Render a streamed answer as live Markdown"""
+    from rich.live import Live
+    from rich.markdown import Markdown
+
+    from echo.agent import ChatResult
+
+    text = ""
+    live = Live(Markdown(""), console=console, refresh_per_second=12, vertical_overflow="visible")
+    with live:
+        for event in agent.chat_stream(message):
+            if isinstance(event, ChatResult):
+                if event.error:
+                    text = f"{text}\n\n{event.text}" if text else event.text
+                    live.update(Markdown(text))
+                elif event.degraded:
+                    console.print(f"[dim](answered without: {', '.join(event.degraded)})[/dim]")
+                break
+            text += event
+            live.update(Markdown(text))
+
+
 @app.command()
 def learn(
     topic: str = typer.Argument(..., help="Topic to learn"),
     level: str = typer.Option("beginner", help="Current level (beginner/intermediate/advanced)"),
     user_id: str = typer.Option(None, help="User ID"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Bypass the LLM response cache"),
+    refresh: bool = typer.Option(
+        False, "--refresh", help="Regenerate and update the cached result"
+    ),
 ):
     """Create a learning path for a topic"""
+    from echo import EchoAgent
+    from echo.config import get_settings
+
     settings = get_settings()
     user_id = user_id or settings.echo_user_id
 
@@ -82,7 +134,7 @@ def learn(
     try:
         # Build knowledge graph
         console.print("📊 Building knowledge graph...")
-        graph = agent.build_knowledge_graph(topic)
+        graph = agent.build_knowledge_graph(topic, use_cache=not no_cache, refresh=refresh)
 
         # Create learning path
         console.print("🗺️  Creating learning path...")
@@ -115,31 +167,47 @@ def learn(
 
 @app.command()
 def add(
-    url: str = typer.Argument(..., help="Resource URL to add"),
+    urls: list[str] = typer.Argument(None, help="Resource URLs to add ('-' reads URLs from stdin)"),
+    file: Path = typer.Option(
+        None, "--file", "-f", help="File to read URLs from (reading list, bookmarks export)"
+    ),
     tags: str = typer.Option("", help="Comma-separated tags"),
+    concurrency: int = typer.Option(None, help="Maximum concurrent ingestions"),
     user_id: str = typer.Option(None, help="User ID"),
 ):
-    """Add a learning resource"""
+    """Add learning resources"""
+    from echo import EchoAgent
+    from echo.config import get_settings
+
     settings = get_settings()
     user_id = user_id or settings.echo_user_id
 
-    console.print(f"[blue]Adding resource: {url}[/blue]")
+    targets = _collect_urls(urls or [], file)
+    if not targets:
+        console.print("[red]No URLs given. Pass URLs, --file, or '-' for stdin.[/red]")
+        raise typer.Exit(1)
 
     agent = EchoAgent(user_id=user_id)
 
     try:
         tag_list = [t.strip() for t in tags.split(",")] if tags else []
-        result = agent.add_resource(url, tags=tag_list)
-
-        if "error" in result:
-            console.print(f"[red]Error: {result['error']}[/red]")
-        else:
-            console.print(Panel.fit(
-                f"[bold green]Resource Added![/bold green]\n"
-                f"Title: {result.get('title', 'N/A')}\n"
-                f"File ID: {result.get('file_id', 'N/A')}",
-                border_style="green"
-            ))
+
+        if len(targets) == 1:
+            console.print(f"[blue]Adding resource: {targets[0]}[/blue]")
+            result = agent.add_resource(targets[0], tags=tag_list)
+
+            if "error" in result:
+                console.print(f"[red]Error: {result['error']}[/red]")
+            else:
+                console.print(Panel.fit(
+                    f"[bold green]Resource Added![/bold green]\n"
+                    f"Title: {result.get('title', 'N/A')}\n"
+                    f"File ID: {result.get('file_id', 'N/A')}",
+                    border_style="green"
+                ))
+            return
+
+        _add_many(agent, targets, tag_list, concurrency)
 
     except Exception as e:
         console.print(f"[red]Error: {e}[/red]")
@@ -148,11 +216,61 @@ def add(
         agent.close()
 
 
+def _collect_urls(args: list[str], file: Optional[Path]) -> list[str]:
+    """Gather URLs from arguments, a file and/or stdin"""
+    import sys
+
+    from echo.utils.urls import extract_urls
+
+    chunks = [arg for arg in args if arg != "-"]
+    if "-" in args:
+        chunks.append(sys.stdin.read())
+    if file is not None:
+        chunks.append(file.read_text(encoding="utf-8", errors="ignore"))
+
+    return extract_urls("\n".join(chunks))
+
+
+def _add_many(agent: EchoAgent, urls: list[str], tags: list[str], concurrency: Optional[int]):
+    """Bulk-ingest URLs with a progress bar"""
+    from rich.progress import BarColumn, MofNCompleteColumn, Progress, TimeElapsedColumn
+
+    console.print(f"[blue]Adding {len(urls)} resources...[/blue]")
+
+    with Progress(
+        "[progress.description]{task.description}",
+        BarColumn(),
+        MofNCompleteColumn(),
+        TimeElapsedColumn(),
+        console=console,
+    ) as progress:
+        task = progress.add_task("Ingesting", total=len(urls))
+        results = agent.add_resources(
+            urls,
+            tags=tags,
+            concurrency=concurrency,
+            on_progress=lambda done, total, url, result: progress.update(task, completed=done),
+        )
+
+    failed = [r for r in results if "error" in r]
+    console.print(Panel.fit(
+        f"[bold green]Resources Added![/bold green]\n"
+        f"Succeeded: {len(results) - len(failed)}\n"
+        f"Failed: {len(failed)}",
+        border_style="green" if not failed else "yellow"
+    ))
+    for r in failed:
+        console.print(f"[red]✗ {r['url']}: {r['error']}[/red]")
+
+
 @app.command()
 def progress(
     user_id: str = typer.Option(None, help="User ID"),
 ):
     """Show learning progress"""
+    from echo import EchoAgent
+    from echo.config import get_settings
+
     settings = get_settings()
     user_id = user_id or settings.echo_user_id
 
@@ -164,10 +282,12 @@ def progress(
         console.print(Panel.fit(
             f"[bold blue]Learning Progress[/bold blue]\n"
             f"Topics: {len(prog.get('topics', []))}\n"
-            f"Resources: {prog.get('resources_added', 0)}\n"
-            f"Knowledge Points: {prog.get('knowledge_points', 0)}",
+            f"Resources: {_count_or_unknown(prog.get('resources_added'))}\n"
+            f"Knowledge Points: {_count_or_unknown(prog.get('knowledge_points'))}",
             border_style="blue"
         ))
+        if prog.get("degraded"):
+            console.print(f"[dim](incomplete, no answer from: {', '.join(prog['degraded'])})[/dim]")
 
     except Exception as e:
         console.print(f"[red]Error: {e}[/red]")
@@ -176,6 +296,11 @@ def progress(
         agent.close()
 
 
+def _count_or_unknown(value: Optional[int]) -> str:
+    """A count for display; None means its source did not answer in time"""
+    return "unknown" if value is None else str(value)
+
+
 @app.command()
 def profile(
     user_id: str = typer.Option(None, help="User ID"),
@@ -185,17 +310,27 @@ def profile(
     path_only: bool = typer.Option(False, "--path", "-p", help="Show only the profile path"),
 ):
     """Manage user profile (ECHO.md)"""
+    if path_only:
+        # Resolved without the agent or full settings (no API keys needed),
+        # at the location EchoAgent gives UserProfile
+        from echo.utils.env import read_setting
+
+        data_dir = Path(read_setting("echo_data_dir", "~/.echo")).expanduser()
+        user_id = user_id or read_setting("echo_user_id", "default_user")
+        console.print(
+            f"[blue]Profile location:[/blue] {data_dir / 'profiles' / f'{user_id}_ECHO.md'}"
+        )
+        return
+
+    from echo import EchoAgent
+    from echo.config import get_settings
+
     settings = get_settings()
     user_id = user_id or settings.echo_user_id
 
     agent = EchoAgent(user_id=user_id, user_name=user_name)
 
     try:
-        if path_only:
-            # Just show the profile path
-            console.print(f"[blue]Profile location:[/blue] {agent.get_profile_path()}")
-            return
-
         if update:
             # Update profile from NeuroMemory
             console.print("[blue]Updating profile from NeuroMemory...[/blue]")
@@ -215,6 +350,8 @@ def profile(
             content = agent.profile_content
 
             if content:
+                from rich.markdown import Markdown
+
                 console.print("\n")
                 console.print(Markdown(content))
                 console.print("\n")
@@ -228,5 +365,195 @@ def profile(
         agent.close()
 
 
+@app.command()
+def jobs(
+    user_id: str = typer.Option(None, help="User ID"),
+    all_users: bool = typer.Option(False, "--all", "-a", help="Show jobs of every user"),
+    status: str = typer.Option(None, help="Only jobs in this status (queued/running/done/failed)"),
+    limit: int = typer.Option(20, help="Jobs to show"),
+    retry: int = typer.Option(None, help="Queue a failed job again"),
+    run: bool = typer.Option(False, "--run", help="Run the user's due jobs now"),
+    purge: bool = typer.Option(False, "--purge", help="Delete finished and failed jobs"),
+):
+    """Inspect background jobs (topic preparation queued from chat)"""
+    import datetime
+
+    from rich.table import Table
+
+    from echo.config import get_settings
+    from echo.jobs import STATUSES, JobQueue, jobs_path
+
+    settings = get_settings()
+    user_id = None if all_users else user_id or settings.echo_user_id
+
+    if status and status not in STATUSES:
+        console.print(f"[red]Unknown status {status!r} (one of {', '.join(STATUSES)})[/red]")
+        raise typer.Exit(1)
+
+    if run:
+        from echo import EchoAgent
+
+        agent = EchoAgent(user_id=user_id or settings.echo_user_id)
+        try:
+            console.print("[blue]Running due jobs...[/blue]")
+            console.print(f"[green]Ran {agent.run_pending_jobs()} jobs[/green]")
+        finally:
+            agent.close()
+
+    queue = JobQueue(jobs_path(settings))
+    try:
+        if retry is not None:
+            if queue.retry(retry):
+                console.print(f"[green]Job #{retry} queued again[/green]")
+            else:
+                console.print(f"[yellow]Job #{retry} is not a failed job[/yellow]")
+
+        if purge:
+            console.print(f"[green]Deleted {queue.purge()} finished jobs[/green]")
+
+        counts = queue.counts(user_id)
+        console.print(" · ".join(f"{name}: {counts[name]}" for name in STATUSES))
+
+        rows = queue.recent(user_id, status, limit)
+        if not rows:
+            console.print("[yellow]No jobs[/yellow]")
+            return
+
+        colors = {"queued": "blue", "running": "cyan", "done": "green", "failed": "red"}
+        table = Table(title="Background jobs")
+        table.add_column("ID", justify="right")
+        if user_id is None:
+            table.add_column("User")
+        table.add_column("Kind")
+        table.add_column("Topic")
+        table.add_column("Status")
+        table.add_column("Attempts", justify="right")
+        table.add_column("Updated")
+        table.add_column("Last error")
+        for job in rows:
+            state = f"[{colors[job.status]}]{job.status}[/{colors[job.status]}]"
+            if job.status == "queued" and job.run_at > job.updated_at:
+                state += datetime.datetime.fromtimestamp(job.run_at).strftime(" (retry %H:%M:%S)")
+            table.add_row(
+                str(job.id),
+                *([job.user_id] if user_id is None else []),
+                job.kind,
+                job.payload.get("topic", job.key),
+                state,
+                f"{job.attempts}/{job.max_attempts}",
+                datetime.datetime.fromtimestamp(job.updated_at).strftime("%m-%d %H:%M:%S"),
+                job.last_error or "",
+            )
+        console.print(table)
+    finally:
+        queue.close()
+
+
+@app.command()
+def stats(
+    since: float = typer.Option(24.0, help="Only spans from the last N hours (0 = all)"),
+    stage: str = typer.Option(None, help="Only stages starting with this prefix"),
+):
+    """Show per-stage latency percentiles"""
+    import time
+
+    from rich.table import Table
+
+    from echo import metrics
+    from echo.config import get_settings
+
+    path = metrics.spans_path(get_settings())
+    spans = metrics.load_spans(path, since=time.time() - since * 3600 if since else None)
+    if stage:
+        spans = [s for s in spans if s["name"].startswith(stage)]
+
+    if not spans:
+        console.print(f"[yellow]No spans recorded in {path}[/yellow]")
+        return
+
+    rows = metrics.stage_stats(spans)
+
+    table = Table(title="Stage latency (ms)")
+    table.add_column("Stage")
+    table.add_column("Count", justify="right")
+    table.add_column("p50", justify="right")
+    table.add_column("p95", justify="right")
+    table.add_column("p99", justify="right")
+    table.add_column("Errors", justify="right")
+    for row in rows:
+        table.add_row(
+            row["stage"], str(row["count"]),
+            f"{row['p50']:.1f}", f"{row['p95']:.1f}", f"{row['p99']:.1f}",
+            str(row["errors"]) if row["errors"] else "",
+        )
+    console.print(table)
+
+    commands = [row for row in rows if row["per_command"]]
+    if commands:
+        table = Table(title="Per command (mean)")
+        table.add_column("Command")
+        table.add_column("Backend calls", justify="right")
+        table.add_column("Cache hits", justify="right")
+        table.add_column("Claude calls", justify="right")
+        table.add_column("Input tokens", justify="right")
+        table.add_column("Output tokens", justify="right")
+        for row in commands:
+            c = row["per_command"]
+            table.add_row(
+                row["stage"],
+                f"{c.get('neuromemory.calls', 0):.1f}",
+                f"{c.get('neuromemory.cache_hits', 0):.1f}",
+                f"{c.get('claude.calls', 0):.1f}",
+                f"{c.get('claude.input_tokens', 0):.0f}",
+                f"{c.get('claude.output_tokens', 0):.0f}",
+            )
+        console.print(table)
+
+    tasks = metrics.task_stats(spans)
+    if tasks:
+        table = Table(title="LLM tasks (per call)")
+        table.add_column("Task")
+        table.add_column("Model")
+        table.add_column("Calls", justify="right")
+        table.add_column("p50 ms", justify="right")
+        table.add_column("p95 ms", justify="right")
+        table.add_column("Input tokens", justify="right")
+        table.add_column("Output tokens", justify="right")
+        for row in tasks:
+            table.add_row(
+                row["task"], row["model"], str(row["count"]),
+                f"{row['p50']:.1f}", f"{row['p95']:.1f}",
+                f"{row['input_tokens']:.0f}", f"{row['output_tokens']:.0f}",
+            )
+        console.print(table)
+
+
+@app.command()
+def serve(
+    host: str = typer.Option(None, help="Bind address (default from settings)"),
+    port: int = typer.Option(None, help="Port (default from settings)"),
+):
+    """Serve the HTTP API with a pool of per-user agents"""
+    from echo.config import get_settings
+
+    settings = get_settings()
+
+    try:
+        import uvicorn
+
+        from echo.server import create_app
+    except ImportError as e:
+        console.print(
+            f"[red]HTTP server needs the web extra (pip install 'echo-agent[web]'): {e}[/red]"
+        )
+        raise typer.Exit(1)
+
+    uvicorn.run(
+        create_app(settings),
+        host=host or settings.server_host,
+        port=port or settings.server_port,
+    )
+
+
 if __name__ == "__main__":
     app()
@@ -2,6 +2,7 @@
 
 from functools import lru_cache
 
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -24,6 +25,125 @@ class Settings(BaseSettings):
     # Echo settings
     echo_user_id: str = "default_user"
     echo_log_level: str = "INFO"
+    echo_data_dir: str = "~/.echo"  # Profiles, caches and local state
+
+    # Context retrieval deadlines (seconds), one per source
+    context_search_timeout: float = 3.0
+    context_preferences_timeout: float = 2.0
+    context_graph_timeout: float = 0.5
+
+    # End-to-end budget (seconds) for a chat turn to start answering (0 =
+    # none). Context retrieval may use at most chat_context_share of what
+    # is left and is cut short rather than delaying the answer.
+    chat_deadline: float = 10.0
+    chat_context_share: float = 0.25
+
+    # Consecutive failures after which a backend is skipped, and seconds
+    # it stays skipped before one trial call
+    circuit_failure_threshold: int = 5
+    circuit_cooldown: float = 30.0
+
+    # Threads per agent for remote context and progress queries. Calls
+    # that outlive their deadline keep a thread until they return, so these
+    # are separate from local sources and background work.
+    context_remote_workers: int = 4
+
+    # Candidate memories fetched per turn and token budget for the context
+    # they are ranked and packed into
+    context_search_limit: int = 10
+    context_budget_tokens: int = 600
+
+    # Local vector replica of memories (needs numpy): seconds a sync stays
+    # fresh enough to serve search, and seconds between full resyncs
+    memory_replica_enabled: bool = False
+    memory_replica_max_staleness: float = 300.0
+    memory_replica_full_sync: float = 86400.0
+
+    # Deadline (seconds) for each query behind `echo progress`
+    progress_timeout: float = 10.0
+
+    # Seconds over which profile refresh triggers are coalesced
+    profile_refresh_window: float = 5.0
+
+    # Seconds before a profile source is refetched even if not invalidated
+    profile_source_ttl: float = 3600.0
+
+    # NeuroMemory read cache: LRU bound (0 disables) and per-method TTL overrides
+    memory_cache_size: int = 1024
+    memory_cache_ttls: dict[str, float] = {}
+
+    # Persistent LLM response cache (TTL in seconds, 0 = no expiry)
+    llm_cache_enabled: bool = True
+    llm_cache_max_mb: int = 64
+    llm_cache_ttl: float = 0
+
+    # Bulk resource import (`echo add` with many URLs)
+    bulk_add_concurrency: int = 8
+    bulk_add_per_host: int = 2
+    bulk_add_host_delay: float = 0.5
+
+    # Chat history: token budget for summary plus verbatim turns, target
+    # summary length, and recent turns that are never summarized
+    session_history_tokens: int = 3000
+    session_summary_tokens: int = 500
+    session_keep_turns: int = 2
+
+    # Conversation write-behind: turns per batched write and max seconds a
+    # turn waits before it is sent
+    write_behind_batch_turns: int = 8
+    write_behind_interval: float = 2.0
+
+    # Learning path planning: study hours per week and weeks per stage; both
+    # divide the plan, so zero is rejected
+    learning_hours_per_week: float = Field(6.0, gt=0)
+    learning_stage_weeks: int = Field(2, gt=0)
+
+    # Background jobs queued when a chat shows learning intent (knowledge
+    # graph and learning path for the topic): worker threads per agent,
+    # attempts per job, delay before the first retry (seconds, doubled per
+    # attempt) and seconds a finished job keeps the same one from being
+    # queued again
+    jobs_enabled: bool = True
+    jobs_workers: int = 2
+    jobs_max_attempts: int = 4
+    jobs_retry_delay: float = 30.0
+    jobs_dedupe_window: float = 86400.0
+
+    # Span metrics: JSONL log under the data dir (rotated at the size limit)
+    # and an optional Prometheus endpoint (port 0 disables it)
+    metrics_enabled: bool = True
+    metrics_max_mb: int = 16
+    metrics_prometheus_port: int = 0
+
+    # Claude call dispatcher shared by all agents in a process: per-minute
+    # limits (0 = unlimited; set them to your Anthropic tier), concurrent
+    # calls, queued calls per priority, share of each limit background work
+    # leaves for chat, retries of 429/5xx, and max admission waits (seconds)
+    llm_requests_per_minute: int = 0
+    llm_input_tokens_per_minute: int = 0
+    llm_output_tokens_per_minute: int = 0
+    llm_max_concurrency: int = 16
+    llm_max_queue: int = 256
+    llm_background_reserve: float = 0.2
+    llm_max_retries: int = 3
+    llm_interactive_timeout: float = 30.0
+    llm_background_timeout: float = 300.0
+
+    # Model routing: model for tasks without a route, and per-task overrides
+    # of echo.utils.llm.DEFAULT_MODELS (which sends structured subtasks such
+    # as graph generation and summaries to a small fast model)
+    llm_default_model: str = "claude-sonnet-4"
+    llm_models: dict[str, str] = {}
+
+    # Thread pool shared by AsyncEchoAgent for blocking SDK calls
+    async_offload_workers: int = 16
+
+    # `echo serve`: bind address, warm per-user agents kept in the pool and
+    # seconds an idle agent stays warm (0 = until evicted by LRU)
+    server_host: str = "127.0.0.1"
+    server_port: int = 8000
+    server_max_agents: int = 256
+    server_idle_timeout: float = 600.0
 
     # Optional: OpenAI
     openai_api_key: str = ""
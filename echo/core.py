@@ -0,0 +1,737 @@
+"""State and request building shared by EchoAgent and AsyncEchoAgent"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import cached_property
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from echo import metrics
+from echo.config import get_settings
+from echo.jobs import JobQueue, JobWorker, job_key, jobs_path
+from echo.knowledge.graph import KnowledgeGraph
+from echo.knowledge.path import LearningPath
+from echo.memory.cache import CachedMemoryClient
+from echo.memory.counts import count_facts
+from echo.memory.writebehind import WriteBehindBuffer
+from echo.profile import ProfileRefresher, UserProfile
+from echo.session import ChatSession, Turn
+from echo.utils.concurrency import CircuitBreaker, Deadline, circuit_breaker
+from echo.utils.intent import extract_learning_topic
+from echo.utils.jsonstream import loads_lenient
+from echo.utils.llm import get_dispatcher, model_for
+from echo.utils.llm_cache import ResponseCache, SQLiteResponseCache
+from echo.utils.prompts import (
+    GRAPH_FRAGMENT_REPAIR_PROMPT,
+    GRAPH_ITEM_TOOLS,
+    KNOWLEDGE_GRAPH_PROMPT,
+    KNOWLEDGE_GRAPH_TOOL,
+    SESSION_SUMMARY_PROMPT,
+    build_context_prompt,
+    build_profile_digest,
+    build_session_summary_block,
+    build_system_prompt,
+)
+
+if TYPE_CHECKING:
+    from echo.memory.replica import MemoryReplica
+    from neuromemory_client import NeuroMemoryClient
+
+logger = logging.getLogger(__name__)
+
+# Memory types searched for chat context
+CONTEXT_MEMORY_TYPES = ["preference", "fact", "episodic", "document"]
+
+# Circuit breaker of each remote chat context source (local sources are
+# absent); per endpoint, so a healthy fast read cannot mask a failing search
+CONTEXT_SOURCE_BACKENDS = {
+    "relevant_memories": "neuromemory.search",
+    "preferences": "neuromemory.get_preferences",
+}
+
+# Auto-extraction settings registered with NeuroMemory for every user
+AUTO_EXTRACT_CONFIG = {"trigger": "message_count", "threshold": 10}
+
+
+@dataclass
+class ChatResult:
+    """Final outcome of a streamed chat turn"""
+
+    text: str
+    usage: dict = field(default_factory=dict)
+    error: Optional[str] = None
+    # Context sources skipped or cut short; the answer used what was left
+    degraded: list[str] = field(default_factory=list)
+
+
+class AgentCore:
+    """Client-independent part of an Echo agent
+
+    Holds the per-user state (session, knowledge graph, profile, job
+    queue, caches) and builds every Claude request and context source.
+    EchoAgent and AsyncEchoAgent differ only in how they reach Claude and
+    NeuroMemory: blocking clients on thread pools, or async clients on an
+    event loop. Local components (graph store, profile, write-behind
+    buffer) share the sync NeuroMemory client in ``self.memory``, created
+    on first use.
+
+    Subclasses provide the job handlers ``_run_graph_job`` and
+    ``_run_path_job``.
+    """
+
+    def __init__(
+        self,
+        user_id: str,
+        neuromemory_api_key: Optional[str] = None,
+        user_name: Optional[str] = None,
+        llm_cache: Optional[ResponseCache] = None,
+        neuromemory_client: Optional[NeuroMemoryClient] = None,
+    ):
+        """Initialize shared agent state
+
+        Args:
+            user_id: Unique user identifier
+            neuromemory_api_key: NeuroMemory API key (optional, from env)
+            user_name: User display name (optional, for profile generation)
+            llm_cache: Cache for LLM generations (optional, default is a
+                local SQLite cache unless disabled in settings; not closed
+                by close() when given)
+            neuromemory_client: Existing NeuroMemory client to use instead
+                of creating one (optional; not closed by close())
+        """
+        settings = get_settings()
+        metrics.get_recorder().configure(settings)
+
+        self.settings = settings
+        self.user_id = user_id
+        self.user_name = user_name or user_id
+        self._conversation_count = 0  # Track conversations for profile updates
+
+        # Process-wide admission control for Claude calls
+        self.llm = get_dispatcher()
+
+        # Post-response work: compaction, intent processing, replica sync
+        self._background = ThreadPoolExecutor(max_workers=2, thread_name_prefix="echo-background")
+
+        # Clients are created on first use, so commands that never reach a
+        # backend don't pay for SDK imports or connection setup
+        self._neuromemory_api_key = neuromemory_api_key or settings.neuromemory_api_key
+        self.data_dir = Path(os.path.expanduser(settings.echo_data_dir))
+
+        # NeuroMemory client behind a read-through cache
+        self._shared_memory_client = neuromemory_client
+        self.memory = CachedMemoryClient(
+            factory=self._connect_memory,
+            ttls=settings.memory_cache_ttls,
+            max_entries=settings.memory_cache_size,
+        )
+
+        # Conversation turns are stored in batches off the response path
+        self.conversation_buffer = WriteBehindBuffer(
+            write=self._write_conversation,
+            spool_dir=self.data_dir / "spool" / user_id,
+            batch_turns=settings.write_behind_batch_turns,
+            interval=settings.write_behind_interval,
+            on_flushed=self._on_conversation_stored,
+        )
+
+        # Initialize knowledge components
+        self.knowledge_graph = KnowledgeGraph(
+            self.memory, user_id, store_dir=str(self.data_dir / "graphs")
+        )
+        self.learning_path = LearningPath(
+            self.memory,
+            user_id,
+            store=self.knowledge_graph.store,
+            hours_per_week=settings.learning_hours_per_week,
+            stage_weeks=settings.learning_stage_weeks,
+        )
+
+        # Initialize user profile manager
+        self.profile = UserProfile(
+            self.memory,
+            user_id,
+            profile_dir=str(self.data_dir / "profiles"),
+            source_ttl=settings.profile_source_ttl,
+        )
+        self._profile_refresher = ProfileRefresher(window=settings.profile_refresh_window)
+
+        # Follow-up work queued from chat (graph and path for a topic the
+        # user wants to learn), run on background threads
+        self.jobs = JobQueue(
+            jobs_path(settings),
+            max_attempts=settings.jobs_max_attempts,
+            retry_delay=settings.jobs_retry_delay,
+            dedupe_window=settings.jobs_dedupe_window,
+        )
+        self._job_worker = JobWorker(
+            self.jobs,
+            {"knowledge_graph": self._run_graph_job, "learning_path": self._run_path_job},
+            user_id=user_id,
+            workers=settings.jobs_workers,
+        )
+        self._jobs_resumed = False
+
+        # Multi-turn chat history, compacted to a token budget
+        self.session = ChatSession(
+            history_tokens=settings.session_history_tokens,
+            summary_tokens=settings.session_summary_tokens,
+            keep_turns=settings.session_keep_turns,
+        )
+
+        self._owns_llm_cache = llm_cache is None
+        if llm_cache is not None:
+            self.llm_cache = llm_cache
+
+    @property
+    def session_id(self) -> str:
+        return self.session.session_id
+
+    @cached_property
+    def llm_cache(self) -> Optional[ResponseCache]:
+        """Persistent cache for LLM generations (None when disabled)"""
+        if not self.settings.llm_cache_enabled:
+            return None
+        return SQLiteResponseCache(
+            self.data_dir / "cache" / "llm.sqlite3",
+            max_bytes=self.settings.llm_cache_max_mb * 1024 * 1024,
+            ttl=self.settings.llm_cache_ttl or None,
+        )
+
+    @cached_property
+    def memory_replica(self) -> Optional[MemoryReplica]:
+        """Local vector replica of the user's memories, if enabled and supported"""
+        if not self.settings.memory_replica_enabled:
+            return None
+
+        try:
+            from echo.memory.replica import MemoryReplica, replica_backend
+
+            backend = replica_backend(self.memory.client)
+            if backend is None:
+                logger.warning("NeuroMemory SDK cannot list embeddings; memory replica disabled")
+                return None
+
+            fetch, embed = backend
+            return MemoryReplica(
+                self.data_dir / "replica" / self.user_id,
+                self.user_id,
+                fetch,
+                embed,
+                max_staleness=self.settings.memory_replica_max_staleness,
+                full_sync_interval=self.settings.memory_replica_full_sync,
+            )
+        except ImportError as e:
+            logger.warning(f"Memory replica disabled: {e}")
+            return None
+
+    @cached_property
+    def profile_content(self) -> str:
+        """Cached ECHO.md content for quick context"""
+        content = self.profile.load()
+        if content:
+            logger.info(f"Loaded existing profile for user: {self.user_id}")
+        return content
+
+    @cached_property
+    def profile_digest(self) -> str:
+        """Compact digest of ECHO.md, sent as part of the cached system prefix"""
+        return build_profile_digest(self.profile_content)
+
+    def new_session(self) -> str:
+        """Start a new chat session, discarding the conversation history
+
+        Returns:
+            New session ID
+        """
+        self.session.reset()
+        return self.session_id
+
+    def request_profile_update(self, *sources: str):
+        """Schedule a background ECHO.md refresh
+
+        Bursts of requests within ``profile_refresh_window`` seconds are
+        coalesced into one regeneration. Use update_profile() to regenerate
+        synchronously.
+
+        Args:
+            sources: Profile sources this agent has just changed (see
+                echo.profile.PROFILE_SOURCES); only these, plus any that
+                have expired, are refetched
+        """
+        if sources:
+            self.profile.invalidate(*sources)
+        self._profile_refresher.schedule(
+            self.profile,
+            user_name=self.user_name,
+            on_done=self._reload_profile,
+        )
+
+    def get_profile_path(self) -> str:
+        """Get path to user's ECHO.md profile
+
+        Returns:
+            Absolute path to profile file
+        """
+        return str(self.profile.profile_path)
+
+    def close(self):
+        """Cleanup resources"""
+        self._background.shutdown(wait=False, cancel_futures=True)
+        self._job_worker.close()
+        self.jobs.close()
+        self.conversation_buffer.close()
+        self._profile_refresher.close()
+        if self._shared_memory_client is None:
+            self.memory.close()
+        if self._owns_llm_cache and self.__dict__.get("llm_cache") is not None:
+            self.llm_cache.close()
+
+    # ========== Private Helper Methods ==========
+
+    def _connect_memory(self) -> NeuroMemoryClient:
+        """Create (or attach the shared) NeuroMemory client on first use"""
+        client = self._shared_memory_client
+        if client is None:
+            from neuromemory_client import NeuroMemoryClient
+
+            client = NeuroMemoryClient(
+                api_key=self._neuromemory_api_key,
+                base_url=self.settings.neuromemory_base_url,
+            )
+        self._ensure_auto_extract(client)
+        return client
+
+    def _ensure_auto_extract(self, client: NeuroMemoryClient):
+        """Enable auto memory extraction, skipping the round-trip when the
+        same settings were already registered for this user"""
+        fingerprint = hashlib.sha1(json.dumps(
+            [self.settings.neuromemory_base_url, self._neuromemory_api_key, AUTO_EXTRACT_CONFIG],
+            sort_keys=True,
+        ).encode("utf-8")).hexdigest()
+
+        state_path = self.data_dir / "state" / "auto_extract.json"
+        try:
+            state = json.loads(state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            state = {}
+
+        if state.get(self.user_id) == fingerprint:
+            return
+
+        try:
+            client.conversations.enable_auto_extract(user_id=self.user_id, **AUTO_EXTRACT_CONFIG)
+        except Exception as e:
+            logger.warning(f"Failed to enable auto-extract: {e}")
+            return
+
+        state[self.user_id] = fingerprint
+        try:
+            state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = state_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(state), encoding="utf-8")
+            tmp_path.replace(state_path)
+        except OSError as e:
+            logger.warning(f"Failed to cache auto-extract registration: {e}")
+
+    @metrics.timed("profile.update")
+    def _update_profile(self) -> str:
+        """Regenerate ECHO.md now, bypassing cached reads (see update_profile)"""
+        logger.info(f"Updating profile for user: {self.user_id}")
+
+        try:
+            # Explicit refresh: bypass cached reads as well
+            self.memory.invalidate(self.user_id)
+            self.profile.invalidate()
+            self.profile.update(user_name=self.user_name)
+            self._reload_profile()
+            logger.info("Profile updated successfully")
+            return str(self.profile.profile_path)
+
+        except Exception as e:
+            logger.error(f"Failed to update profile: {e}")
+            return ""
+
+    def _enqueue_learning_jobs(self, topic: str, level: str = "beginner") -> list[int]:
+        """Queue graph and path jobs for a topic (see enqueue_learning_jobs)"""
+        key = job_key(topic)
+        payload = {"topic": topic, "level": level}
+        graph_job = self.jobs.enqueue("knowledge_graph", self.user_id, key, payload)
+        path_job = self.jobs.enqueue(
+            "learning_path", self.user_id, key, payload, depends_on=graph_job
+        )
+        self._job_worker.wake()
+        return [graph_job, path_job]
+
+    def _usage_to_dict(self, response) -> dict:
+        """Extract token usage from a Claude response"""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return {}
+        return {
+            "input_tokens": getattr(usage, "input_tokens", 0),
+            "output_tokens": getattr(usage, "output_tokens", 0),
+            "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0,
+            "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+        }
+
+    def _chat_request(self, message: str, context: dict) -> dict:
+        """Build Claude request parameters for a chat turn
+
+        The session summary and recent turns are bounded by the session's
+        token budget, so the request stays the same size as history grows.
+        """
+        model = model_for(self.settings, "chat")
+        system = build_system_prompt(self.profile_digest, model)
+        if self.session.summary:
+            system.append(build_session_summary_block(self.session.summary))
+
+        return {
+            "model": model,
+            "system": system,
+            "messages": [
+                *self.session.messages(),
+                {
+                    "role": "user",
+                    "content": build_context_prompt(
+                        message, context, budget=self.settings.context_budget_tokens
+                    ),
+                },
+            ],
+            "max_tokens": 2048,
+        }
+
+    def _session_summary_request(self, turns: list[Turn]) -> dict:
+        """Build Claude request parameters to fold turns into the session summary"""
+        transcript = "\n".join(
+            f"用户：{turn.user}\n助理：{turn.assistant}" for turn in turns
+        )
+        prompt = SESSION_SUMMARY_PROMPT.format(
+            summary=self.session.summary or "（无）",
+            turns=transcript,
+            max_chars=self.session.summary_tokens,
+        )
+        return {
+            "model": model_for(self.settings, "session_summary"),
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": self.session.summary_tokens * 2,
+        }
+
+    def _knowledge_graph_request(self, topic: str) -> dict:
+        """Build Claude request parameters for knowledge graph generation"""
+        # The graph depends only on the topic, so the system prefix carries no
+        # profile digest and the result can be cached per topic
+        model = model_for(self.settings, "knowledge_graph")
+        tools = [KNOWLEDGE_GRAPH_TOOL]
+        return {
+            "model": model,
+            "system": build_system_prompt(model=model, tools=tools),
+            "messages": [{"role": "user", "content": KNOWLEDGE_GRAPH_PROMPT.format(topic=topic)}],
+            "tools": tools,
+            "tool_choice": {"type": "tool", "name": KNOWLEDGE_GRAPH_TOOL["name"]},
+            "max_tokens": 2048,
+        }
+
+    def _graph_repair_request(
+        self, topic: str, key: str, fragment: str, problems: list[str]
+    ) -> dict:
+        """Build Claude request parameters to regenerate one graph fragment"""
+        tool = GRAPH_ITEM_TOOLS[key]
+        prompt = GRAPH_FRAGMENT_REPAIR_PROMPT.format(
+            topic=topic,
+            fragment=fragment,
+            errors="；".join(problems),
+            tool_name=tool["name"],
+        )
+        return {
+            "model": model_for(self.settings, "graph_repair"),
+            "messages": [{"role": "user", "content": prompt}],
+            "tools": [tool],
+            "tool_choice": {"type": "tool", "name": tool["name"]},
+            "max_tokens": 512,
+        }
+
+    def _tool_input(self, response) -> Optional[dict]:
+        """Input of the first tool call in a Claude response"""
+        for block in response.content:
+            if block.type == "tool_use":
+                return block.input
+        return None
+
+    def _cache_get(self, key: str, use_cache: bool = True, refresh: bool = False) -> Optional[dict]:
+        """Look up a generation in the LLM response cache"""
+        if not use_cache or refresh or self.llm_cache is None:
+            return None
+        try:
+            return self.llm_cache.get(key)
+        except Exception as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            return None
+
+    def _cache_put(self, key: str, value: dict, use_cache: bool = True):
+        """Store a generation; unparsed or failed results are not cached"""
+        if not use_cache or self.llm_cache is None or "raw" in value or "error" in value:
+            return
+        try:
+            self.llm_cache.put(key, value)
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    def _context_sources(self, message: str, memory=None) -> dict:
+        """Context sources for a chat turn
+
+        Args:
+            message: User message
+            memory: Client to query (defaults to self.memory; the async
+                agent passes its awaitable facade)
+
+        Returns:
+            Mapping of context key -> (callable, timeout in seconds)
+        """
+        memory = memory or self.memory
+
+        sources = {
+            # Semantic search across all memory types
+            "relevant_memories": (
+                lambda: self._search_memories(message, memory),
+                self.settings.context_search_timeout,
+            ),
+            "preferences": (
+                lambda: memory.memory.get_preferences(self.user_id),
+                self.settings.context_preferences_timeout,
+            ),
+            # Local graph lookup, no backend round-trip
+            "related_concepts": (
+                lambda: self.knowledge_graph.related_to_text(message),
+                self.settings.context_graph_timeout,
+            ),
+        }
+
+        # Preferences already travel in the cached profile digest
+        if self.profile_digest:
+            del sources["preferences"]
+
+        return sources
+
+    def _search_memories(self, message: str, memory=None):
+        """Semantic memory search, served by the local replica when fresh"""
+        replica = self._fresh_replica()
+        if replica is not None:
+            try:
+                return replica.search(
+                    message,
+                    memory_types=CONTEXT_MEMORY_TYPES,
+                    limit=self.settings.context_search_limit,
+                )
+            except Exception as e:
+                logger.warning(f"Replica search failed, querying NeuroMemory: {e}")
+
+        memory = memory or self.memory
+        return memory.memory.search(
+            user_id=self.user_id,
+            query=message,
+            memory_types=CONTEXT_MEMORY_TYPES,
+            limit=self.settings.context_search_limit,
+        )
+
+    def _fresh_replica(self) -> Optional[MemoryReplica]:
+        """The memory replica if it may serve reads; otherwise start a sync"""
+        replica = self.memory_replica
+        if replica is None:
+            return None
+        if replica.is_fresh():
+            return replica
+
+        # Serve this turn from the server while the replica catches up
+        self._background.submit(self._sync_replica, replica)
+        return None
+
+    def _sync_replica(self, replica: MemoryReplica):
+        try:
+            replica.sync()
+        except Exception as e:
+            logger.warning(f"Memory replica sync failed: {e}")
+
+    def _admit_sources(
+        self, sources: dict, deadline: Optional[Deadline] = None
+    ) -> tuple[dict, dict[str, CircuitBreaker], list[str]]:
+        """Apply the time budget and circuit breakers to context sources
+
+        Returns:
+            (sources to query with budgeted timeouts, breakers of the remote
+            ones, names skipped because their backend's circuit is open)
+        """
+        replica = self.memory_replica
+        local_search = replica is not None and replica.is_fresh()
+
+        admitted, breakers, skipped = {}, {}, []
+        for name, (fn, timeout) in sources.items():
+            backend = CONTEXT_SOURCE_BACKENDS.get(name)
+            if name == "relevant_memories" and local_search:
+                backend = None
+            if backend is not None:
+                breaker = circuit_breaker(
+                    backend,
+                    failure_threshold=self.settings.circuit_failure_threshold,
+                    cooldown=self.settings.circuit_cooldown,
+                )
+                if not breaker.allow():
+                    skipped.append(name)
+                    continue
+                breakers[name] = breaker
+            if deadline is not None:
+                timeout = deadline.budget(timeout, self.settings.chat_context_share)
+            admitted[name] = (fn, timeout)
+
+        return admitted, breakers, skipped
+
+    def _settle_sources(
+        self,
+        sources: dict,
+        results: dict,
+        missed: list[str],
+        breakers: dict[str, CircuitBreaker],
+        skipped: list[str],
+    ) -> tuple[dict, list[str]]:
+        """Report outcomes to the breakers and assemble the context"""
+        for name, breaker in breakers.items():
+            breaker.record(name not in missed)
+
+        degraded = [name for name in sources if name in skipped or name in missed]
+        for name in degraded:
+            metrics.count(f"context.degraded.{name}")
+
+        return {name: results.get(name) or [] for name in sources}, degraded
+
+    def _after_response(self, message: str, answer: str):
+        """Post-response work that must not delay the answer"""
+        # 1. Buffer the conversation for a batched write
+        self._store_conversation(message, answer)
+
+        # 2. Check if this is a learning-related query
+        self._background.submit(self._process_learning_intent, message, answer)
+
+    def _store_conversation(self, user_message: str, assistant_response: str):
+        """Store conversation in memory (via the write-behind buffer)"""
+        try:
+            self.conversation_buffer.append(
+                self.user_id,
+                self.session_id,
+                [
+                    {"role": "user", "content": user_message},
+                    {"role": "assistant", "content": assistant_response}
+                ],
+            )
+        except Exception as e:
+            logger.warning(f"Failed to store conversation: {e}")
+
+    def _write_conversation(self, user_id: str, session_id: Optional[str], messages: list[dict]):
+        """Send a batch of buffered conversation messages to NeuroMemory"""
+        self.memory.conversations.add_messages(
+            user_id=user_id,
+            session_id=session_id,
+            messages=messages,
+        )
+
+    def _on_conversation_stored(self, turns: int = 1):
+        """Bookkeeping after conversation turns have been stored"""
+        # Update conversation counter
+        before = self._conversation_count
+        self._conversation_count += turns
+
+        # Update profile every 10 conversations
+        if self._conversation_count // 10 > before // 10:
+            logger.info("Triggering profile update after 10 conversations")
+            # Auto-extraction derives preferences, facts and episodes from chats
+            self.request_profile_update("preferences", "facts", "episodes")
+
+    def _reload_profile(self):
+        """Reload cached ECHO.md content after a background refresh"""
+        self.profile_content = self.profile.load()
+        self.profile_digest = build_profile_digest(self.profile_content)
+
+    def _process_learning_intent(self, message: str, response: str):
+        """Detect learning intent and prepare the topic in the background"""
+        if not self.settings.jobs_enabled:
+            return
+
+        topic = extract_learning_topic(message)
+        if topic:
+            logger.info(f"Learning intent detected for {topic}, queueing graph and path")
+            self._enqueue_learning_jobs(topic)
+        elif not self._jobs_resumed:
+            # Jobs an earlier run left queued or unfinished
+            self._job_worker.wake()
+        self._jobs_resumed = True
+
+    def _parse_knowledge_graph(self, llm_response: str) -> dict:
+        """Parse a prose LLM response into graph structure"""
+        # Tolerate prose around the JSON object
+        start, end = llm_response.find("{"), llm_response.rfind("}")
+        if start != -1 and end > start:
+            graph_data = loads_lenient(llm_response[start:end + 1])
+            if isinstance(graph_data, dict):
+                return graph_data
+        return {"raw": llm_response}
+
+    def _link_resource_to_knowledge(self, doc: dict):
+        """Link resource to knowledge graph"""
+        # TODO: Extract topics and link to graph
+        pass
+
+    def _progress_sources(self, memory=None) -> dict:
+        """Backend queries behind get_learning_progress
+
+        Returns:
+            Mapping of name -> (callable, timeout in seconds)
+        """
+        memory = memory or self.memory
+        timeout = self.settings.progress_timeout
+        return {
+            "profile": (lambda: memory.memory.get_user_profile(self.user_id), timeout),
+            "knowledge_points": (self._count_knowledge_points, timeout),
+            "recent_activities": (
+                lambda: memory.memory.get_episodes(user_id=self.user_id, limit=10),
+                timeout,
+            ),
+        }
+
+    def _build_progress(self, results: dict, missed: list[str]) -> dict:
+        """Assemble the progress summary
+
+        Counts whose source timed out or failed are None (unknown), never
+        0, and the sources are listed under "degraded", as chat reports
+        context it answered without.
+        """
+        profile = results.get("profile") or {}
+        for name in missed:
+            metrics.count(f"progress.degraded.{name}")
+        return {
+            "topics": self._get_learning_topics(),
+            "resources_added": (
+                None if "profile" in missed else profile.get("documents_count", 0)
+            ),
+            "knowledge_points": results.get("knowledge_points"),
+            "recent_activities": results.get("recent_activities") or [],
+            "degraded": list(missed),
+        }
+
+    def _get_learning_topics(self) -> list[str]:
+        """Get all topics user is learning"""
+        return self.knowledge_graph.store.topics()
+
+    def _count_knowledge_points(self) -> int:
+        """Count total knowledge points"""
+        # Raw client, so paged counting doesn't fill the read cache
+        return count_facts(self.memory.client.memory, self.user_id)
+
+    def _generate_review_questions(self, knowledge: list[dict]) -> list[dict]:
+        """Generate review questions from knowledge points"""
+        # TODO: Use LLM to generate questions
+        return []
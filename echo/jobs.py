@@ -0,0 +1,520 @@
+"""Persistent background job queue"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from echo import metrics
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+STATUSES = (QUEUED, RUNNING, DONE, FAILED)
+
+# Longest wait between retries of a failing job
+MAX_RETRY_DELAY = 3600.0
+
+# Longest a worker sleeps before looking at the queue again (other
+# processes may enqueue or finish dependencies meanwhile)
+POLL_INTERVAL = 5.0
+
+_COLUMNS = (
+    "id", "kind", "user_id", "key", "payload", "status", "attempts", "max_attempts",
+    "run_at", "depends_on", "last_error", "created_at", "updated_at",
+)
+
+# A job is claimable once the job it depends on is done
+_DEPENDENCY_DONE = (
+    "(j.depends_on IS NULL OR EXISTS "
+    "(SELECT 1 FROM jobs d WHERE d.id = j.depends_on AND d.status = 'done'))"
+)
+
+
+@dataclass
+class Job:
+    id: int
+    kind: str
+    user_id: str
+    key: str
+    payload: dict
+    status: str
+    attempts: int
+    max_attempts: int
+    run_at: float
+    depends_on: Optional[int]
+    last_error: Optional[str]
+    created_at: float
+    updated_at: float
+
+    @classmethod
+    def from_row(cls, row: tuple) -> Job:
+        return cls(*row[:4], json.loads(row[4]), *row[5:])
+
+
+def jobs_path(settings: Any) -> Path:
+    """Location of the job queue database"""
+    return Path(settings.echo_data_dir).expanduser() / "jobs.sqlite3"
+
+
+def job_key(value: str) -> str:
+    """Deduplication key for free text such as topics
+
+    Unicode NFKC, whitespace collapsed and case-folded, so "Rust" and
+    " rust " share a job.
+    """
+    return " ".join(unicodedata.normalize("NFKC", value).split()).casefold()
+
+
+class JobQueue:
+    """Job queue in a local SQLite file
+
+    Jobs are identified by (kind, user_id, key). Enqueueing a job that is
+    already queued or running, or that finished within ``dedupe_window``
+    seconds, returns the existing job instead of adding one. Claimed jobs
+    hold a lease of ``lease`` seconds; a job whose worker died (process
+    crash) is claimed again once its lease expires. Failed attempts are
+    retried with exponential backoff up to ``max_attempts``.
+
+    A job may depend on another: it is not claimed before that job is done
+    and fails with it. The file may be shared by several processes.
+
+    Example:
+        >>> queue = JobQueue(Path("~/.echo/jobs.sqlite3").expanduser())
+        >>> graph = queue.enqueue("knowledge_graph", "alice", "rust", {"topic": "Rust"})
+        >>> queue.enqueue("learning_path", "alice", "rust", {"topic": "Rust"}, depends_on=graph)
+        >>> job = queue.claim("alice")
+        >>> queue.complete(job)
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_attempts: int = 4,
+        retry_delay: float = 30.0,
+        lease: float = 900.0,
+        dedupe_window: float = 86400.0,
+    ):
+        """Initialize queue
+
+        Args:
+            path: SQLite file
+            max_attempts: Attempts before a job is marked failed
+            retry_delay: Delay (seconds) before the first retry, doubled
+                for each further attempt
+            lease: Seconds a claimed job may run before another worker
+                may claim it again
+            dedupe_window: Seconds a finished job suppresses new jobs with
+                the same identity (0 = only while queued or running)
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease = lease
+        self.dedupe_window = dedupe_window
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def enqueue(
+        self,
+        kind: str,
+        user_id: str,
+        key: str,
+        payload: dict,
+        depends_on: Optional[int] = None,
+    ) -> int:
+        """Add a job unless an equivalent one is pending or recently done
+
+        Returns:
+            ID of the new or the existing job
+        """
+        now = time.time()
+        since = now - self.dedupe_window if self.dedupe_window else now
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT id, status FROM jobs WHERE kind = ? AND user_id = ? AND key = ? "
+                "AND (status IN (?, ?) OR (status = ? AND updated_at > ?)) "
+                "ORDER BY id DESC LIMIT 1",
+                (kind, user_id, key, QUEUED, RUNNING, DONE, since),
+            ).fetchone()
+            if row is not None:
+                logger.debug(f"Job {kind}:{key} for {user_id} already {row[1]} (#{row[0]})")
+                return row[0]
+
+            cursor = conn.execute(
+                "INSERT INTO jobs (kind, user_id, key, payload, status, attempts, max_attempts, "
+                "run_at, depends_on, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?, ?, ?)",
+                (kind, user_id, key, json.dumps(payload, ensure_ascii=False), QUEUED,
+                 self.max_attempts, now, depends_on, now, now),
+            )
+            logger.info(f"Queued job #{cursor.lastrowid} {kind}:{key} for {user_id}")
+            return cursor.lastrowid
+
+    def claim(self, user_id: Optional[str] = None) -> Optional[Job]:
+        """Take the next due job (of one user, if given) and lease it"""
+        now = time.time()
+        user_filter, params = ("AND j.user_id = ?", (user_id,)) if user_id else ("", ())
+        with self._transaction() as conn:
+            # Leases that ran out on the last attempt end the job
+            expired = conn.execute(
+                "SELECT id FROM jobs "
+                "WHERE status = ? AND lease_until < ? AND attempts >= max_attempts",
+                (RUNNING, now),
+            ).fetchall()
+            for (job_id,) in expired:
+                self._fail_terminal(conn, job_id, "lease expired", now)
+
+            row = conn.execute(
+                f"SELECT {', '.join(f'j.{c}' for c in _COLUMNS)} FROM jobs j "
+                "WHERE ((j.status = ? AND j.run_at <= ?) OR (j.status = ? AND j.lease_until < ?)) "
+                f"{user_filter} AND {_DEPENDENCY_DONE} ORDER BY j.run_at, j.id LIMIT 1",
+                (QUEUED, now, RUNNING, now, *params),
+            ).fetchone()
+            if row is None:
+                return None
+
+            job = Job.from_row(row)
+            job.status = RUNNING
+            job.attempts += 1
+            job.updated_at = now
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = ?, lease_until = ?, updated_at = ? "
+                "WHERE id = ?",
+                (RUNNING, job.attempts, now + self.lease, now, job.id),
+            )
+            return job
+
+    def complete(self, job: Job):
+        """Mark a claimed job done"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, lease_until = NULL, last_error = NULL, updated_at = ? "
+                "WHERE id = ? AND status = ? AND attempts = ?",
+                (DONE, time.time(), job.id, RUNNING, job.attempts),
+            )
+
+    def fail(self, job: Job, error: str, retry: bool = True):
+        """Record a failed attempt of a claimed job
+
+        The job is retried after a backoff delay while attempts remain
+        (and ``retry`` is set); otherwise it and the jobs depending on it
+        are marked failed.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            if retry and job.attempts < job.max_attempts:
+                delay = min(MAX_RETRY_DELAY, self.retry_delay * 2 ** (job.attempts - 1))
+                conn.execute(
+                    "UPDATE jobs SET status = ?, run_at = ?, lease_until = NULL, last_error = ?, "
+                    "updated_at = ? WHERE id = ? AND status = ? AND attempts = ?",
+                    (QUEUED, now + delay, error, now, job.id, RUNNING, job.attempts),
+                )
+                logger.warning(
+                    f"Job #{job.id} {job.kind} failed ({error}), retrying in {delay:.0f}s"
+                )
+            else:
+                self._fail_terminal(conn, job.id, error, now)
+                logger.error(
+                    f"Job #{job.id} {job.kind} failed after {job.attempts} attempts: {error}"
+                )
+
+    def retry(self, job_id: int) -> bool:
+        """Queue a failed job (and the jobs that failed with it) again
+
+        Returns:
+            Whether the job was failed and has been requeued
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, run_at = ?, updated_at = ? "
+                "WHERE id = ? AND status = ?",
+                (QUEUED, now, now, job_id, FAILED),
+            )
+            if not cursor.rowcount:
+                return False
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, run_at = ?, updated_at = ? "
+                "WHERE depends_on = ? AND status = ?",
+                (QUEUED, now, now, job_id, FAILED),
+            )
+            return True
+
+    def next_run_at(self, user_id: Optional[str] = None) -> Optional[float]:
+        """When a queued or leased job (of one user) next becomes claimable
+
+        Jobs waiting for a dependency are left out; the dependency itself
+        is queued or running.
+        """
+        user_filter, params = ("AND j.user_id = ?", (user_id,)) if user_id else ("", ())
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT MIN(CASE j.status WHEN ? THEN j.run_at ELSE j.lease_until END) FROM jobs j "
+                f"WHERE j.status IN (?, ?) {user_filter} AND {_DEPENDENCY_DONE}",
+                (QUEUED, QUEUED, RUNNING, *params),
+            ).fetchone()
+        return row[0]
+
+    def recent(
+        self,
+        user_id: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 50,
+    ) -> list[Job]:
+        """Most recent jobs, newest first"""
+        clauses, params = [], []
+        if user_id:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs {where} ORDER BY id DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        return [Job.from_row(row) for row in rows]
+
+    def counts(self, user_id: Optional[str] = None) -> dict[str, int]:
+        """Number of jobs per status"""
+        user_filter, params = ("WHERE user_id = ?", (user_id,)) if user_id else ("", ())
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT status, COUNT(*) FROM jobs {user_filter} GROUP BY status", params
+            ).fetchall()
+        return {status: 0 for status in STATUSES} | dict(rows)
+
+    def purge(self, older_than: float = 0.0) -> int:
+        """Delete done and failed jobs last updated ``older_than`` seconds ago
+
+        Returns:
+            Number of jobs deleted
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at <= ? "
+                "AND id NOT IN (SELECT depends_on FROM jobs WHERE depends_on IS NOT NULL "
+                "AND status IN (?, ?))",
+                (DONE, FAILED, time.time() - older_than, QUEUED, RUNNING),
+            )
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # ========== Internals ==========
+
+    def _fail_terminal(self, conn: sqlite3.Connection, job_id: int, error: str, now: float):
+        conn.execute(
+            "UPDATE jobs SET status = ?, lease_until = NULL, last_error = ?, updated_at = ? "
+            "WHERE id = ?",
+            (FAILED, error, now, job_id),
+        )
+        conn.execute(
+            "UPDATE jobs SET status = ?, last_error = ?, updated_at = ? "
+            "WHERE depends_on = ? AND status = ?",
+            (FAILED, f"dependency #{job_id} failed", now, job_id, QUEUED),
+        )
+
+    def _transaction(self):
+        return _Transaction(self)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Autocommit mode; writes take the database lock up front with
+            # BEGIN IMMEDIATE so concurrent claims cannot take the same job
+            self._conn = sqlite3.connect(
+                str(self.path), timeout=30.0, isolation_level=None, check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, user_id TEXT NOT NULL, "
+                "key TEXT NOT NULL, payload TEXT NOT NULL, status TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL, max_attempts INTEGER NOT NULL, run_at REAL NOT NULL, "
+                "lease_until REAL, depends_on INTEGER, last_error TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, user_id, run_at)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_identity ON jobs (kind, user_id, key)"
+            )
+        return self._conn
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT under the queue's thread lock"""
+
+    def __init__(self, queue: JobQueue):
+        self._queue = queue
+
+    def __enter__(self) -> sqlite3.Connection:
+        self._queue._lock.acquire()
+        try:
+            self._conn = self._queue._connect()
+            self._conn.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self._queue._lock.release()
+            raise
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self._queue._lock.release()
+
+
+class JobWorker:
+    """Pool of threads running the jobs of a queue
+
+    Threads start on wake() and exit once nothing is queued, so an idle
+    worker costs nothing. Each job kind is run by its handler,
+    ``handler(payload)``; an exception is a failed attempt, retried with
+    backoff by the queue.
+
+    Example:
+        >>> worker = JobWorker(queue, {"knowledge_graph": build}, user_id="alice")
+        >>> queue.enqueue("knowledge_graph", "alice", "rust", {"topic": "Rust"})
+        >>> worker.wake()
+        >>> worker.close()
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: dict[str, Callable[[dict], Any]],
+        user_id: Optional[str] = None,
+        workers: int = 2,
+    ):
+        """Initialize worker
+
+        Args:
+            queue: Queue to take jobs from
+            handlers: Job kind -> handler
+            user_id: Only run this user's jobs (default all)
+            workers: Threads running jobs concurrently
+        """
+        self.queue = queue
+        self.handlers = handlers
+        self.user_id = user_id
+        self.workers = workers
+
+        self._cond = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._running = 0
+        self._wakeups = 0
+        self._closed = False
+
+    def wake(self):
+        """Look for due jobs now, starting threads as needed"""
+        with self._cond:
+            if self._closed:
+                return
+            self._wakeups += 1
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name="echo-jobs", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify_all()
+
+    def run_pending(self) -> int:
+        """Run every due job in the calling thread
+
+        Returns:
+            Number of jobs run
+        """
+        ran = 0
+        while (job := self.queue.claim(self.user_id)) is not None:
+            self._execute(job)
+            ran += 1
+        return ran
+
+    def close(self, timeout: float = 5.0):
+        """Stop the threads, waiting up to ``timeout`` for running jobs
+
+        A job still running afterwards is abandoned and claimed again once
+        its lease expires.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            threads = list(self._threads)
+        deadline = time.monotonic() + timeout
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        if any(thread.is_alive() for thread in threads):
+            logger.warning(
+                f"Abandoning {self._running} running jobs; they resume after their lease"
+            )
+
+    # ========== Internals ==========
+
+    def _run(self):
+        try:
+            while True:
+                with self._cond:
+                    if self._closed:
+                        return
+                    wakeups = self._wakeups
+
+                job = self.queue.claim(self.user_id)
+                if job is not None:
+                    with self._cond:
+                        self._running += 1
+                    try:
+                        self._execute(job)
+                    finally:
+                        with self._cond:
+                            self._running -= 1
+                            # Finished jobs may unblock dependent ones
+                            self._wakeups += 1
+                            self._cond.notify_all()
+                    continue
+
+                next_at = self.queue.next_run_at(self.user_id)
+                with self._cond:
+                    if self._closed:
+                        return
+                    if self._wakeups != wakeups:
+                        continue
+                    if next_at is None and not self._running:
+                        return
+                    delay = POLL_INTERVAL if next_at is None else next_at - time.time()
+                    self._cond.wait(min(POLL_INTERVAL, max(0.05, delay)))
+        except Exception as e:
+            logger.error(f"Job worker stopped: {e}")
+        finally:
+            with self._cond:
+                self._threads.remove(threading.current_thread())
+
+    def _execute(self, job: Job):
+        handler = self.handlers.get(job.kind)
+        if handler is None:
+            self.queue.fail(job, f"no handler for job kind {job.kind!r}", retry=False)
+            return
+
+        logger.info(f"Running job #{job.id} {job.kind}:{job.key} (attempt {job.attempts})")
+        try:
+            with metrics.span(f"job.{job.kind}", attempt=job.attempts):
+                handler(job.payload)
+        except Exception as e:
+            self.queue.fail(job, str(e) or type(e).__name__)
+        else:
+            self.queue.complete(job)
@@ -0,0 +1,204 @@
+"""Incremental knowledge-graph assembly from streamed model output"""
+
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Any, Optional
+
+from echo.utils.jsonstream import ArrayItemStreamer, loads_lenient
+
+if TYPE_CHECKING:
+    from echo.knowledge.graph import KnowledgeGraph
+
+logger = logging.getLogger(__name__)
+
+LEVELS = ("beginner", "intermediate", "advanced")
+RELATION_TYPES = ("prerequisite", "related", "part_of")
+
+_LEVEL_ALIASES = {
+    "初级": "beginner", "入门": "beginner", "基础": "beginner",
+    "中级": "intermediate", "进阶": "intermediate",
+    "高级": "advanced",
+}
+
+# Upper bound on fragments sent back to the model for repair per graph
+MAX_FRAGMENT_REPAIRS = 5
+
+
+def validate_concept(item: Any) -> tuple[Optional[dict], list[str]]:
+    """Validate a concept, coercing recoverable fields
+
+    Returns:
+        (concept, problems); concept is None when the item is unusable
+        and has to be regenerated
+    """
+    if not isinstance(item, dict):
+        return None, ["不是 JSON 对象"]
+
+    name = item.get("name")
+    if not isinstance(name, str) or not name.strip():
+        return None, ["缺少概念名称 name"]
+    name = name.strip()
+
+    problems = []
+
+    level = item.get("level")
+    level = _LEVEL_ALIASES.get(level, level)
+    if level not in LEVELS:
+        problems.append(f"未知难度 {item.get('level')!r}")
+        level = "intermediate"
+
+    try:
+        importance = min(5, max(1, int(item.get("importance", 3))))
+    except (TypeError, ValueError):
+        problems.append(f"无效重要性 {item.get('importance')!r}")
+        importance = 3
+
+    prerequisites = item.get("prerequisites") or []
+    if isinstance(prerequisites, str):
+        prerequisites = [prerequisites]
+    prerequisites = [
+        p.strip() for p in prerequisites
+        if isinstance(p, str) and p.strip() and p.strip() != name
+    ]
+
+    description = item.get("description")
+
+    return {
+        "name": name,
+        "level": level,
+        "importance": importance,
+        "description": description if isinstance(description, str) else "",
+        "prerequisites": prerequisites,
+    }, problems
+
+
+def validate_relationship(item: Any) -> tuple[Optional[dict], list[str]]:
+    """Validate a relationship, coercing recoverable fields"""
+    if not isinstance(item, dict):
+        return None, ["不是 JSON 对象"]
+
+    source, target = item.get("from"), item.get("to")
+    if not isinstance(source, str) or not source.strip() \
+            or not isinstance(target, str) or not target.strip():
+        return None, ["缺少 from/to"]
+
+    problems = []
+    relation = item.get("type")
+    if relation not in RELATION_TYPES:
+        problems.append(f"未知关系类型 {relation!r}")
+        relation = "related"
+
+    return {"from": source.strip(), "to": target.strip(), "type": relation}, problems
+
+
+_VALIDATORS = {
+    "concepts": validate_concept,
+    "relationships": validate_relationship,
+}
+
+
+class GraphStreamBuilder:
+    """Validate graph items as the model streams them
+
+    Feed it the partial JSON of a ``record_knowledge_graph`` tool call.
+    Each concept or relationship is validated as soon as its JSON closes
+    and staged in the builder. Items that cannot be parsed or validated
+    are collected in ``failed`` so the caller can regenerate just those
+    fragments. Nothing reaches the KnowledgeGraph before finish(), which
+    replaces the topic in one step; a stream that fails partway leaves
+    the stored graph untouched.
+
+    Example:
+        >>> builder = GraphStreamBuilder(agent.knowledge_graph, "Rust")
+        >>> for partial_json in deltas:
+        ...     builder.feed(partial_json)
+        >>> builder.end_stream()
+        >>> graph = builder.finish()
+    """
+
+    def __init__(self, knowledge_graph: KnowledgeGraph, topic: str):
+        self.knowledge_graph = knowledge_graph
+        self.topic = topic
+        self.concepts: dict[str, dict] = {}
+        self.relationships: list[dict] = []
+        self.learning_path: list[str] = []
+        # (key, raw fragment, problems)
+        self.failed: list[tuple[str, str, list[str]]] = []
+        self._streamer = ArrayItemStreamer(("concepts", "relationships", "learning_path"))
+
+    @property
+    def empty(self) -> bool:
+        return not self.concepts and not self.relationships and not self.failed
+
+    def feed(self, partial_json: str):
+        """Consume a chunk of streamed tool input"""
+        for key, value, raw in self._streamer.feed(partial_json):
+            if value is None:
+                self.failed.append((key, raw, ["JSON 格式错误"]))
+            else:
+                self.add(key, value, raw)
+
+    def end_stream(self):
+        """Handle an element cut off at the end of the stream"""
+        pending = self._streamer.pending()
+        if pending is None:
+            return
+        key, raw = pending
+        value = loads_lenient(raw)
+        if value is None:
+            self.failed.append((key, raw, ["片段被截断"]))
+        else:
+            self.add(key, value, raw)
+
+    def add(self, key: str, value: Any, raw: str = "") -> bool:
+        """Validate one item and stage it
+
+        Returns:
+            True if the item was accepted
+        """
+        if key == "learning_path":
+            if isinstance(value, str) and value.strip():
+                self.learning_path.append(value.strip())
+                return True
+            return False
+
+        item, problems = _VALIDATORS[key](value)
+        if item is None:
+            self.failed.append((key, raw or str(value), problems))
+            return False
+        if problems:
+            logger.debug(f"Coerced {key} item {raw or value}: {problems}")
+
+        if key == "concepts":
+            self.concepts[item["name"]] = item
+        else:
+            self.relationships.append(item)
+        return True
+
+    def add_graph(self, graph_data: dict):
+        """Add every item of an already complete graph"""
+        for key in ("concepts", "relationships", "learning_path"):
+            for value in graph_data.get(key) or []:
+                self.add(key, value)
+
+    def take_failed(self, limit: int = MAX_FRAGMENT_REPAIRS) -> list[tuple[str, str, list[str]]]:
+        """Failed fragments to repair, up to ``limit``; the rest are dropped"""
+        failed, self.failed = self.failed, []
+        if len(failed) > limit:
+            logger.warning(f"Dropping {len(failed) - limit} unrepairable graph fragments")
+        return failed[:limit]
+
+    def finish(self) -> dict:
+        """Replace the topic's graph with the staged one and return its structure"""
+        graph_data = {
+            "topic": self.topic,
+            "concepts": list(self.concepts.values()),
+            "relationships": self.relationships,
+            "learning_path": self.learning_path,
+        }
+        if not self.concepts:
+            return {**graph_data, "error": "No valid concepts generated"}
+
+        self.knowledge_graph.build_from_data(self.topic, graph_data)
+        return graph_data
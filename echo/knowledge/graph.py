@@ -1,54 +1,158 @@
 """Knowledge graph management"""
 
 from __future__ import annotations
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
+from pathlib import Path
+import os
+
+from echo import metrics
+from echo.knowledge.store import GraphStore
 
 if TYPE_CHECKING:
     from neuromemory_client import NeuroMemoryClient
 
 
 class KnowledgeGraph:
-    """Knowledge graph builder and manager"""
+    """Knowledge graph builder and manager
+
+    Concepts and relations are kept in a local GraphStore so graph queries
+    answer without a backend round-trip. A compact summary of each topic is
+    also stored in NeuroMemory for semantic recall.
+    """
 
-    def __init__(self, memory: NeuroMemoryClient, user_id: str):
+    def __init__(self, memory: NeuroMemoryClient, user_id: str, store_dir: str = None):
+        """Initialize knowledge graph
+
+        Args:
+            memory: NeuroMemory client
+            user_id: User identifier
+            store_dir: Directory for graph stores (default: ~/.echo/graphs/)
+        """
         self.memory = memory
         self.user_id = user_id
 
+        if store_dir is None:
+            store_dir = os.path.expanduser("~/.echo/graphs")
+
+        self.store = GraphStore(Path(store_dir) / f"{user_id}.json")
+
+    @metrics.timed("knowledge_graph.load")
     def build_from_data(self, topic: str, graph_data: dict):
-        """Build graph from structured data
+        """Build graph from structured data, replacing any earlier graph of the topic
 
         Args:
             topic: Main topic
             graph_data: Graph structure (concepts, relationships)
         """
-        # TODO: Store in graph database using NeuroMemory graph API
-        # For now, store as structured memory
+        self.store.replace_topic(topic, graph_data)
+        self.commit(topic)
+
+    @metrics.timed("knowledge_graph.commit")
+    def commit(self, topic: str):
+        """Persist the store and record a topic summary in NeuroMemory"""
+        self.store.save()
+
+        # Compact summary for semantic recall; the graph itself stays local
         self.memory.add_memory(
             user_id=self.user_id,
             content=f"知识图谱：{topic}",
             memory_type="knowledge_graph",
-            metadata=graph_data
+            metadata={
+                "topic": topic,
+                "concepts": self.store.concepts(topic),
+            }
         )
 
+    @metrics.timed("knowledge_graph.get")
     def get_graph(self, topic: str) -> dict:
         """Retrieve knowledge graph for topic"""
-        # TODO: Query from graph database
-        results = self.memory.search(
-            user_id=self.user_id,
-            query=f"知识图谱 {topic}",
-            memory_type="knowledge_graph",
-            limit=1
-        )
-        if results:
-            return results[0].get("metadata", {})
-        return {}
+        if not self.store.has_topic(topic):
+            # Graphs built before the local store existed live in NeuroMemory
+            results = self.memory.search(
+                user_id=self.user_id,
+                query=f"知识图谱 {topic}",
+                memory_type="knowledge_graph",
+                limit=1
+            )
+            if not results:
+                return {}
+            metadata = results[0].get("metadata", {})
+            if not metadata.get("relationships") and not any(
+                isinstance(c, dict) for c in metadata.get("concepts", [])
+            ):
+                return metadata
+            self.store.load_graph(topic, metadata)
+            self.store.save()
+
+        return {
+            "topic": topic,
+            "concepts": [self.store.concept(name) for name in self.store.concepts(topic)],
+            "relationships": [
+                {"from": src, "to": dst, "type": edge_type}
+                for src, dst, edge_type in self.store.edges(topic)
+            ],
+            "learning_path": self.store.topological_order(topic),
+        }
 
     def add_concept(self, topic: str, concept: str, related_to: list[str]):
         """Add a concept node to the graph"""
-        # TODO: Use graph API
-        pass
+        self.store.add_concept(topic, concept)
+        for other in related_to:
+            self.store.add_concept(topic, other)
+            self.store.add_edge(concept, other, "related")
+        self.store.save()
+
+    def neighbors(self, concept: str, edge_type: Optional[str] = None) -> list[str]:
+        """Concepts directly connected to a concept"""
+        return self.store.neighbors(concept, edge_type=edge_type)
+
+    def prerequisites(self, concept: str) -> set[str]:
+        """Everything that should be learned before a concept"""
+        return self.store.prerequisites(concept)
+
+    def learning_order(self, topic: str) -> list[str]:
+        """Topic concepts in prerequisite order"""
+        return self.store.topological_order(topic)
+
+    def learning_chain(self, source: str, target: str) -> list[str]:
+        """Shortest prerequisite chain from one concept to another"""
+        return self.store.learning_chain(source, target)
+
+    def related_to_text(self, text: str, limit: int = 5) -> list[dict]:
+        """Concepts mentioned in text with their neighbours"""
+        return [
+            {"concept": name, "neighbors": self.store.neighbors(name)[:limit]}
+            for name in self.store.match(text, limit=limit)
+        ]
+
+    def visualize(self, topic: str, output_path: str = None) -> str:
+        """Generate visualization of knowledge graph
+
+        Args:
+            topic: Topic to draw
+            output_path: PNG path (default: next to the graph store)
+
+        Returns:
+            Path to the rendered image
+        """
+        import matplotlib
+
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        import networkx as nx
+
+        graph = nx.DiGraph()
+        graph.add_nodes_from(self.store.concepts(topic))
+        for src, dst, edge_type in self.store.edges(topic):
+            graph.add_edge(src, dst, type=edge_type)
+
+        if output_path is None:
+            output_path = str(self.store.path.with_name(f"{self.user_id}_{topic}.png"))
+
+        fig, ax = plt.subplots(figsize=(10, 8))
+        nx.draw_networkx(graph, pos=nx.spring_layout(graph, seed=0), ax=ax, node_color="#cde")
+        ax.set_axis_off()
+        fig.savefig(output_path, bbox_inches="tight")
+        plt.close(fig)
 
-    def visualize(self, topic: str):
-        """Generate visualization of knowledge graph"""
-        # TODO: Use networkx or similar
-        pass
+        return output_path
@@ -1,19 +1,61 @@
 """Learning path planning"""
 
 from __future__ import annotations
-from typing import TYPE_CHECKING
+
+import math
+from collections import Counter
+from typing import TYPE_CHECKING, Optional
+
+from echo import metrics
 
 if TYPE_CHECKING:
+    from echo.knowledge.store import GraphStore
     from neuromemory_client import NeuroMemoryClient
 
+# Estimated study hours per concept by level
+LEVEL_HOURS = {"beginner": 2.0, "intermediate": 4.0, "advanced": 6.0}
+
+STAGE_NAMES = {"beginner": "Foundation", "intermediate": "Core", "advanced": "Advanced"}
+
+# Skill facts matched against concept names per fact
+MAX_SKILL_MATCHES = 10
+
 
 class LearningPath:
-    """Learning path planner"""
+    """Learning path planner
+
+    Plans from the topic's concept graph: concepts the user already masters
+    (skill facts, recorded progress) are dropped together with their
+    prerequisites, the rest is ordered by prerequisites and difficulty and
+    cut into time-boxed stages. Closures and orders are memoized by the
+    GraphStore, so replanning after update_progress stays cheap on large
+    graphs.
+    """
 
-    def __init__(self, memory: NeuroMemoryClient, user_id: str):
+    def __init__(
+        self,
+        memory: NeuroMemoryClient,
+        user_id: str,
+        store: Optional[GraphStore] = None,
+        hours_per_week: float = 6.0,
+        stage_weeks: int = 2,
+    ):
+        """Initialize planner
+
+        Args:
+            memory: NeuroMemory client
+            user_id: User identifier
+            store: The user's concept graph (without one, plans are generic)
+            hours_per_week: Study time the user has per week
+            stage_weeks: Weeks per stage
+        """
         self.memory = memory
         self.user_id = user_id
+        self.store = store
+        self.hours_per_week = hours_per_week
+        self.stage_weeks = stage_weeks
 
+    @metrics.timed("learning_path.plan")
     def plan(
         self,
         topic: str,
@@ -24,14 +66,122 @@ class LearningPath:
 
         Args:
             topic: What to learn
-            current_level: beginner/intermediate/advanced
+            current_level: beginner/intermediate/advanced; recorded on the
+                plan, while only mastered or known concepts are skipped
             background: User's background knowledge
 
         Returns:
             Learning path structure
         """
-        # TODO: Use LLM to generate path based on background
-        # For now, return a simple structure
+        if self.store is None or not self.store.has_topic(topic):
+            return self._generic_plan(topic, current_level)
+
+        known = self._known_concepts(background.get("skills") or [])
+        sequence = self.store.learning_sequence(topic, known=known)
+        stages = self._stages([self.store.concept(name) for name in sequence])
+
+        weeks = sum(stage["weeks"] for stage in stages)
+        return {
+            "topic": topic,
+            "level": current_level,
+            "total_duration": f"{weeks} weeks",
+            "total_hours": sum(stage["hours"] for stage in stages),
+            "skipped": len(self.store.concepts(topic)) - len(sequence),
+            "stages": stages,
+        }
+
+    def get_next_step(self, topic: str) -> dict:
+        """Get next recommended learning step
+
+        Args:
+            topic: Topic being learned
+
+        Returns:
+            The first concept of the topic's learning sequence (name, level,
+            description, direct prerequisites, remaining count), or an empty dict
+            when the topic has no graph or everything is mastered
+        """
+        if self.store is None or not self.store.has_topic(topic):
+            return {}
+
+        sequence = self.store.learning_sequence(topic)
+        if not sequence:
+            return {}
+
+        concept = self.store.concept(sequence[0])
+        return {
+            "topic": topic,
+            "concept": concept["name"],
+            "level": _level(concept),
+            "description": concept.get("description") or "",
+            "prerequisites": self.store.neighbors(concept["name"], "prerequisite", "in"),
+            "remaining": len(sequence),
+        }
+
+    def update_progress(self, topic: str, completed: str):
+        """Update learning progress
+
+        Args:
+            topic: Topic being learned
+            completed: Concept (or text naming concepts) the user finished;
+                known concepts count as mastered in later plans
+        """
+        if self.store is not None:
+            names = [completed] if self.store.concept(completed) else self.store.match(completed)
+            self.store.mark_mastered(names)
+
+        # Store progress in memory
+        self.memory.add_memory(
+            user_id=self.user_id,
+            content=f"完成学习：{topic} - {completed}",
+            memory_type="progress"
+        )
+
+    def _known_concepts(self, skills: list[str]) -> set[str]:
+        """Concepts named in the user's skill facts"""
+        known = set()
+        for skill in skills:
+            known.update(self.store.match(skill, limit=MAX_SKILL_MATCHES))
+        return known
+
+    def _stages(self, concepts: list[dict]) -> list[dict]:
+        """Cut an ordered concept list into stages of stage_weeks each"""
+        capacity = self.hours_per_week * self.stage_weeks
+        groups: list[list[tuple[dict, str]]] = []
+        hours = capacity
+        for concept in concepts:
+            level = _level(concept)
+            if hours + LEVEL_HOURS[level] > capacity:
+                groups.append([])
+                hours = 0.0
+            groups[-1].append((concept, level))
+            hours += LEVEL_HOURS[level]
+
+        stages = []
+        names: Counter[str] = Counter()
+        for group in groups:
+            levels = Counter(level for _, level in group)
+            # Named after the most common level (the earlier one on a tie)
+            level = levels.most_common(1)[0][0]
+            names[level] += 1
+            stage_hours = sum(LEVEL_HOURS[lvl] * n for lvl, n in levels.items())
+            weeks = max(1, math.ceil(stage_hours / self.hours_per_week))
+            stages.append({
+                "name": STAGE_NAMES[level] + (f" {names[level]}" if names[level] > 1 else ""),
+                "duration": f"{weeks} weeks",
+                "weeks": weeks,
+                "hours": stage_hours,
+                "level": level,
+                "objectives": [
+                    f"{c['name']}：{c['description']}" if c.get("description") else c["name"]
+                    for c, _ in group
+                ],
+                "topics": [c["name"] for c, _ in group],
+            })
+        return stages
+
+    def _generic_plan(self, topic: str, current_level: str) -> dict:
+        """Placeholder plan for topics without a knowledge graph"""
         return {
             "topic": topic,
             "level": current_level,
@@ -52,16 +202,7 @@ class LearningPath:
             ]
         }
 
-    def get_next_step(self) -> dict:
-        """Get next recommended learning step"""
-        # TODO: Based on progress, recommend next action
-        return {}
 
-    def update_progress(self, topic: str, completed: str):
-        """Update learning progress"""
-        # Store progress in memory
-        self.memory.add_memory(
-            user_id=self.user_id,
-            content=f"完成学习：{topic} - {completed}",
-            memory_type="progress"
-        )
+def _level(concept: dict) -> str:
+    level = concept.get("level")
+    return level if level in LEVEL_HOURS else "intermediate"
@@ -0,0 +1,530 @@
+"""Local indexed knowledge-graph store"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import logging
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+EDGE_TYPES = ("prerequisite", "related", "part_of")
+
+# Used to order concepts that have no prerequisite relation between them
+LEVEL_RANK = {"beginner": 0, "intermediate": 1, "advanced": 2}
+
+
+class GraphStore:
+    """Per-user concept graph with adjacency indexes
+
+    Nodes live in a compact table (name list + attribute list) addressed by
+    integer id; edges are (source, target, type) triples indexed by type in
+    both directions. A ``prerequisite`` edge A -> B means A should be
+    learned before B. The store is persisted as one JSON file and loaded
+    lazily, so all queries answer from memory. Mastery is appended to a
+    small side log as it is recorded and folded into the JSON on save().
+
+    Prerequisite closures are memoized as bitmasks over node ids (bit n set
+    = node n is a prerequisite) and topological orders per topic; edits
+    invalidate only the entries they affect.
+
+    Example:
+        >>> store = GraphStore(Path("~/.echo/graphs/alice.json").expanduser())
+        >>> store.add_concept("Rust", "所有权", level="beginner")
+        >>> store.add_concept("Rust", "生命周期", level="intermediate")
+        >>> store.add_edge("所有权", "生命周期", "prerequisite")
+        >>> store.prerequisites("生命周期")
+        {'所有权'}
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.mastery_path = path.with_suffix(".mastered")
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._reset()
+
+    # ========== Mutation ==========
+
+    def add_concept(self, topic: str, name: str, **attrs) -> int:
+        """Insert or update a concept node
+
+        Args:
+            topic: Topic the concept belongs to
+            name: Concept name (unique per user)
+            attrs: level, importance, description, ...
+
+        Returns:
+            Node id
+        """
+        with self._lock:
+            self._ensure_loaded()
+            node = self._node(name)
+            node_attrs = self._attrs[node]
+            node_attrs.update({k: v for k, v in attrs.items() if v is not None})
+            topics = node_attrs.setdefault("topics", [])
+            if topic not in topics:
+                topics.append(topic)
+            self._topics.setdefault(topic, set()).add(node)
+            self._orders.clear()
+            return node
+
+    def add_edge(self, source: str, target: str, edge_type: str = "related"):
+        """Insert an edge, creating missing endpoint nodes"""
+        if edge_type not in EDGE_TYPES:
+            edge_type = "related"
+        with self._lock:
+            self._ensure_loaded()
+            src, dst = self._node(source), self._node(target)
+            if src == dst or dst in self._out[edge_type].get(src, ()):
+                return
+            self._edges.append((src, dst, edge_type))
+            self._out[edge_type].setdefault(src, set()).add(dst)
+            self._in[edge_type].setdefault(dst, set()).add(src)
+            if edge_type == "prerequisite":
+                self._invalidate_closures(dst)
+                self._orders.clear()
+
+    def mark_mastered(self, names: Iterable[str]) -> list[str]:
+        """Record concepts the user has mastered
+
+        Newly mastered names are appended to the mastery log, so progress
+        is durable without rewriting the whole graph.
+
+        Returns:
+            The given names that are known concepts
+        """
+        with self._lock:
+            self._ensure_loaded()
+            marked, new = [], []
+            for name in names:
+                node = self._ids.get(name)
+                if node is not None:
+                    if not self._mastered >> node & 1:
+                        new.append(name)
+                    self._attrs[node]["mastered"] = True
+                    self._mastered |= 1 << node
+                    marked.append(name)
+            if new:
+                self.mastery_path.parent.mkdir(parents=True, exist_ok=True)
+                with self.mastery_path.open("a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(name, ensure_ascii=False) + "\n" for name in new)
+            return marked
+
+    def add_concept_data(self, topic: str, concept: dict):
+        """Insert a concept record with its prerequisite edges"""
+        with self._lock:
+            name = concept["name"]
+            self.add_concept(
+                topic,
+                name,
+                level=concept.get("level"),
+                importance=concept.get("importance"),
+                description=concept.get("description"),
+            )
+            for prereq in concept.get("prerequisites") or []:
+                self.add_concept(topic, prereq)
+                self.add_edge(prereq, name, "prerequisite")
+
+    def load_graph(self, topic: str, graph_data: dict):
+        """Import an LLM-generated graph (concepts + relationships)"""
+        with self._lock:
+            for concept in graph_data.get("concepts", []):
+                if isinstance(concept, dict) and concept.get("name"):
+                    self.add_concept_data(topic, concept)
+
+            for rel in graph_data.get("relationships", []):
+                if isinstance(rel, dict) and rel.get("from") and rel.get("to"):
+                    self.add_concept(topic, rel["from"])
+                    self.add_concept(topic, rel["to"])
+                    self.add_edge(rel["from"], rel["to"], rel.get("type", "related"))
+
+    def replace_topic(self, topic: str, graph_data: dict):
+        """Replace a topic's concepts and edges with a newly generated graph
+
+        Edges between the topic's old concepts are dropped, and concepts no
+        other topic uses are removed unless the new graph has them again
+        (their mastery is kept then). Concepts shared with other topics stay.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            old = self._topics.pop(topic, set())
+            if not old:
+                self.load_graph(topic, graph_data)
+                return
+
+            for node in old:
+                attrs = self._attrs[node]
+                topics = [t for t in attrs.get("topics", []) if t != topic]
+                if not topics:
+                    attrs = {"mastered": True} if attrs.get("mastered") else {}
+                self._attrs[node] = {**attrs, "topics": topics}
+
+            edges = [e for e in self._edges if not (e[0] in old and e[1] in old)]
+            self._rebuild(
+                [[name, attrs] for name, attrs in zip(self._names, self._attrs)], edges
+            )
+            self.load_graph(topic, graph_data)
+
+            # Renumber without the concepts the new graph dropped
+            keep = [
+                n for n in range(len(self._names))
+                if n not in old or self._attrs[n].get("topics")
+            ]
+            if len(keep) < len(self._names):
+                ids = {node: i for i, node in enumerate(keep)}
+                self._rebuild(
+                    [[self._names[n], self._attrs[n]] for n in keep],
+                    [(ids[s], ids[d], t) for s, d, t in self._edges if s in ids and d in ids],
+                )
+
+    def save(self):
+        """Persist the store atomically, folding in the mastery log"""
+        with self._lock:
+            self._ensure_loaded()
+            data = {
+                "nodes": [[name, attrs] for name, attrs in zip(self._names, self._attrs)],
+                "edges": self._edges,
+            }
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            tmp_path.replace(self.path)
+            self.mastery_path.unlink(missing_ok=True)
+
+    # ========== Queries ==========
+
+    def has_topic(self, topic: str) -> bool:
+        with self._lock:
+            self._ensure_loaded()
+            return bool(self._topics.get(topic))
+
+    def topics(self) -> list[str]:
+        """Topics that have at least one concept"""
+        with self._lock:
+            self._ensure_loaded()
+            return sorted(topic for topic, nodes in self._topics.items() if nodes)
+
+    def concept(self, name: str) -> Optional[dict]:
+        """Attributes of a concept, or None if unknown"""
+        with self._lock:
+            self._ensure_loaded()
+            node = self._ids.get(name)
+            return None if node is None else {"name": name, **self._attrs[node]}
+
+    def concepts(self, topic: Optional[str] = None) -> list[str]:
+        """Concept names, optionally restricted to a topic"""
+        with self._lock:
+            self._ensure_loaded()
+            if topic is None:
+                return list(self._names)
+            return [self._names[n] for n in sorted(self._topics.get(topic, ()))]
+
+    def edges(self, topic: Optional[str] = None) -> list[tuple[str, str, str]]:
+        """(source, target, type) edges, optionally within a topic"""
+        with self._lock:
+            self._ensure_loaded()
+            nodes = self._topics.get(topic, set()) if topic is not None else None
+            return [
+                (self._names[s], self._names[d], t) for s, d, t in self._edges
+                if nodes is None or (s in nodes and d in nodes)
+            ]
+
+    def neighbors(
+        self,
+        name: str,
+        edge_type: Optional[str] = None,
+        direction: str = "both",
+    ) -> list[str]:
+        """Adjacent concepts
+
+        Args:
+            name: Concept name
+            edge_type: Restrict to one edge type (all types if None)
+            direction: "out", "in" or "both"
+        """
+        with self._lock:
+            self._ensure_loaded()
+            node = self._ids.get(name)
+            if node is None:
+                return []
+            types = [edge_type] if edge_type else EDGE_TYPES
+            found: set[int] = set()
+            for t in types:
+                if direction in ("out", "both"):
+                    found |= self._out[t].get(node, set())
+                if direction in ("in", "both"):
+                    found |= self._in[t].get(node, set())
+            return sorted(self._names[n] for n in found)
+
+    def prerequisites(self, name: str) -> set[str]:
+        """Transitive closure of a concept's prerequisites"""
+        with self._lock:
+            self._ensure_loaded()
+            node = self._ids.get(name)
+            if node is None:
+                return set()
+            return {self._names[n] for n in _mask_nodes(self._closure_mask(node))}
+
+    def topological_order(self, topic: Optional[str] = None) -> list[str]:
+        """Concepts ordered so prerequisites come first
+
+        Ties are broken by level, then importance (higher first), then name.
+        Concepts caught in a prerequisite cycle are appended at the end.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return [self._names[n] for n in self._topic_order(topic)]
+
+    def learning_sequence(
+        self,
+        topic: str,
+        known: Iterable[str] = (),
+    ) -> list[str]:
+        """Topic concepts still to learn, prerequisites first
+
+        Concepts marked mastered or listed in ``known`` are left out
+        together with everything they require. Level only orders the
+        rest: an easy concept the user has not covered stays in, since
+        later concepts build on it. Uses the memoized closures and topic
+        order, so replanning after progress is one pass over the topic.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            skip = 0
+            for node in _mask_nodes(self._mastered):
+                skip |= (1 << node) | self._closure_mask(node)
+            for name in known:
+                node = self._ids.get(name)
+                if node is not None:
+                    skip |= (1 << node) | self._closure_mask(node)
+
+            return [self._names[n] for n in self._topic_order(topic) if not skip >> n & 1]
+
+    def learning_chain(self, source: str, target: str) -> list[str]:
+        """Shortest chain of prerequisite steps from source to target
+
+        Returns:
+            Concept names from source to target inclusive, or [] if target
+            is not reachable from source
+        """
+        with self._lock:
+            self._ensure_loaded()
+            src, dst = self._ids.get(source), self._ids.get(target)
+            if src is None or dst is None:
+                return []
+
+            parents = {src: src}
+            queue = deque([src])
+            while queue:
+                node = queue.popleft()
+                if node == dst:
+                    chain = [node]
+                    while node != src:
+                        node = parents[node]
+                        chain.append(node)
+                    return [self._names[n] for n in reversed(chain)]
+                for nxt in self._out["prerequisite"].get(node, ()):
+                    if nxt not in parents:
+                        parents[nxt] = node
+                        queue.append(nxt)
+            return []
+
+    def match(self, text: str, limit: int = 5) -> list[str]:
+        """Concept names mentioned in a piece of text, longest first"""
+        with self._lock:
+            self._ensure_loaded()
+            found = [name for name in self._names if len(name) > 1 and name in text]
+            return sorted(found, key=len, reverse=True)[:limit]
+
+    # ========== Internals ==========
+
+    def _reset(self):
+        """Empty tables and indexes"""
+        # Node table
+        self._ids: dict[str, int] = {}
+        self._names: list[str] = []
+        self._attrs: list[dict] = []
+
+        # Edge table and adjacency indexes: type -> node id -> neighbour ids
+        self._edges: list[tuple[int, int, str]] = []
+        self._out: dict[str, dict[int, set[int]]] = {t: {} for t in EDGE_TYPES}
+        self._in: dict[str, dict[int, set[int]]] = {t: {} for t in EDGE_TYPES}
+
+        # topic -> node ids
+        self._topics: dict[str, set[int]] = {}
+
+        # Memoized queries: node id -> prerequisite closure mask, topic ->
+        # topological order (None = all topics); mask of mastered concepts
+        self._closures: dict[int, int] = {}
+        self._orders: dict[Optional[str], list[int]] = {}
+        self._mastered = 0
+
+    def _node(self, name: str) -> int:
+        node = self._ids.get(name)
+        if node is None:
+            node = len(self._names)
+            self._ids[name] = node
+            self._names.append(name)
+            self._attrs.append({})
+        return node
+
+    def _closure_mask(self, node: int) -> int:
+        """Prerequisite closure of a node as a bitmask (memoized)
+
+        Post-order walk over prerequisite edges that memoizes every node it
+        finishes, so closures are built from their parents' closures.
+        """
+        cached = self._closures.get(node)
+        if cached is not None:
+            return cached
+
+        prereqs = self._in["prerequisite"]
+        active: set[int] = set()
+        stack = [(node, False)]
+        while stack:
+            n, expanded = stack.pop()
+            if n in self._closures:
+                continue
+            if expanded:
+                active.discard(n)
+                mask = 0
+                for p in prereqs.get(n, ()):
+                    mask |= (1 << p) | self._closures[p]
+                self._closures[n] = mask
+                continue
+
+            active.add(n)
+            stack.append((n, True))
+            for p in prereqs.get(n, ()):
+                if p in active:
+                    # Prerequisite cycle: plain traversal for this node
+                    mask = 0
+                    for m in self._closure(node):
+                        mask |= 1 << m
+                    self._closures[node] = mask
+                    return mask
+                if p not in self._closures:
+                    stack.append((p, False))
+
+        return self._closures[node]
+
+    def _invalidate_closures(self, node: int):
+        """Forget closures that a new prerequisite of ``node`` changes"""
+        bit = 1 << node
+        for n in [n for n, mask in self._closures.items() if n == node or mask & bit]:
+            del self._closures[n]
+
+    def _topic_order(self, topic: Optional[str]) -> list[int]:
+        order = self._orders.get(topic)
+        if order is None:
+            nodes = self._topics.get(topic, ()) if topic is not None else range(len(self._names))
+            order = self._orders[topic] = self._toposort(nodes)
+        return order
+
+    def _closure(self, node: int) -> set[int]:
+        seen: set[int] = set()
+        stack = list(self._in["prerequisite"].get(node, ()))
+        while stack:
+            n = stack.pop()
+            if n not in seen:
+                seen.add(n)
+                stack.extend(self._in["prerequisite"].get(n, ()))
+        return seen
+
+    def _sort_key(self, node: int) -> tuple:
+        attrs = self._attrs[node]
+        importance = attrs.get("importance")
+        return (
+            LEVEL_RANK.get(attrs.get("level"), 1),
+            -(importance if isinstance(importance, (int, float)) else 0),
+            self._names[node],
+        )
+
+    def _toposort(self, nodes: Iterable[int]) -> list[int]:
+        nodes = set(nodes)
+        indegree = {
+            n: len(self._in["prerequisite"].get(n, set()) & nodes) for n in nodes
+        }
+        heap = [(self._sort_key(n), n) for n, d in indegree.items() if d == 0]
+        heapq.heapify(heap)
+
+        order = []
+        while heap:
+            _, node = heapq.heappop(heap)
+            order.append(node)
+            for nxt in self._out["prerequisite"].get(node, ()):
+                if nxt in indegree:
+                    indegree[nxt] -= 1
+                    if indegree[nxt] == 0:
+                        heapq.heappush(heap, (self._sort_key(nxt), nxt))
+
+        if len(order) < len(nodes):
+            placed = set(order)
+            order.extend(sorted(nodes - placed, key=self._sort_key))
+
+        return order
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.path.exists():
+            self._load_graph()
+        if self.mastery_path.exists():
+            self._load_mastery()
+
+    def _load_graph(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to load graph store {self.path}: {e}")
+            return
+
+        self._rebuild(data.get("nodes", []), data.get("edges", []))
+
+    def _rebuild(self, nodes: list, edges: list):
+        """Reset the tables and indexes to the given nodes and edges"""
+        self._reset()
+        for name, attrs in nodes:
+            node = self._node(name)
+            self._attrs[node] = attrs
+            if attrs.get("mastered"):
+                self._mastered |= 1 << node
+            for topic in attrs.get("topics", []):
+                self._topics.setdefault(topic, set()).add(node)
+
+        for src, dst, edge_type in edges:
+            self._edges.append((src, dst, edge_type))
+            self._out[edge_type].setdefault(src, set()).add(dst)
+            self._in[edge_type].setdefault(dst, set()).add(src)
+
+    def _load_mastery(self):
+        try:
+            lines = self.mastery_path.read_text(encoding="utf-8").splitlines()
+        except OSError as e:
+            logger.warning(f"Failed to load mastery log {self.mastery_path}: {e}")
+            return
+
+        for line in lines:
+            try:
+                node = self._ids.get(json.loads(line))
+            except (TypeError, ValueError):
+                continue  # torn last line from an interrupted append
+            if node is not None:
+                self._attrs[node]["mastered"] = True
+                self._mastered |= 1 << node
+
+
+def _mask_nodes(mask: int) -> list[int]:
+    """Node ids of the bits set in a mask"""
+    nodes = []
+    while mask:
+        low = mask & -mask
+        nodes.append(low.bit_length() - 1)
+        mask ^= low
+    return nodes
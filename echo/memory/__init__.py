@@ -0,0 +1 @@
+"""NeuroMemory integration helpers"""
@@ -0,0 +1,239 @@
+"""Read-through cache in front of the NeuroMemory client"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+from echo import metrics
+
+if TYPE_CHECKING:
+    from neuromemory_client import NeuroMemoryClient
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached read stays valid, per client.memory method
+DEFAULT_TTLS = {
+    "search": 30.0,
+    "get_preferences": 300.0,
+    "get_facts": 120.0,
+    "get_user_profile": 120.0,
+    "get_episodes": 60.0,
+}
+
+# Reads made stale by each write the agent performs. Conversation messages
+# become searchable episodes right away; preferences and facts extracted
+# from them server-side later are covered by their TTL.
+WRITE_INVALIDATES = {
+    "add_memory": tuple(DEFAULT_TTLS),
+    "add_messages": ("search", "get_episodes"),
+    "add_url": ("search", "get_facts", "get_user_profile"),
+}
+
+
+class CachedMemoryClient:
+    """NeuroMemory client wrapper with a TTL/LRU read cache
+
+    Reads on ``client.memory`` listed in DEFAULT_TTLS are served from an
+    in-process cache. Writes made through this wrapper (``add_memory``,
+    ``conversations.add_messages``, ``files.add_url``) invalidate the
+    affected reads for that user. Everything else passes through.
+
+    Cached values are shared between callers and must be treated as
+    read-only.
+
+    Example:
+        >>> memory = CachedMemoryClient(NeuroMemoryClient(api_key="..."))
+        >>> memory.memory.get_preferences("alice")  # miss
+        >>> memory.memory.get_preferences("alice")  # hit
+        >>> memory.stats()["hits"]
+        1
+    """
+
+    def __init__(
+        self,
+        client: Optional[NeuroMemoryClient] = None,
+        ttls: Optional[dict[str, float]] = None,
+        max_entries: int = 1024,
+        factory: Optional[Callable[[], NeuroMemoryClient]] = None,
+    ):
+        """Initialize cache
+
+        Args:
+            client: Underlying NeuroMemory client
+            ttls: Per-method TTL overrides in seconds (0 disables a method)
+            max_entries: LRU bound on cached reads (0 disables caching)
+            factory: Creates the client on first use, when ``client`` is
+                not given
+        """
+        self._client = client
+        self._factory = factory
+        self._connect_lock = threading.Lock()
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.max_entries = max_entries
+
+        # key -> (expires_at, value); key is (user_id, method, args)
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits: dict[str, int] = {}
+        self._misses: dict[str, int] = {}
+
+        self.memory = _ReadNamespace(self, "memory")
+        self.conversations = _WriteNamespace(self, "conversations")
+        self.files = _WriteNamespace(self, "files")
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    @property
+    def client(self) -> NeuroMemoryClient:
+        """Underlying client, created on first use"""
+        if self._client is None:
+            with self._connect_lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None
+
+    def close(self):
+        """Close the underlying client if it was ever created"""
+        if self._client is not None:
+            self._client.close()
+
+    def add_memory(self, *args, **kwargs) -> Any:
+        return self._write("add_memory", self.client.add_memory, args, kwargs)
+
+    def invalidate(self, user_id: Optional[str] = None, methods: Optional[tuple] = None):
+        """Drop cached reads
+
+        Args:
+            user_id: Only drop this user's entries (all users if None)
+            methods: Only drop these read methods (all if None)
+        """
+        with self._lock:
+            stale = [
+                key for key in self._entries
+                if (user_id is None or key[0] == user_id)
+                and (methods is None or key[1] in methods)
+            ]
+            for key in stale:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        """Hit/miss counters, overall and per method"""
+        with self._lock:
+            hits = sum(self._hits.values())
+            misses = sum(self._misses.values())
+            return {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "entries": len(self._entries),
+                "methods": {
+                    method: {
+                        "hits": self._hits.get(method, 0),
+                        "misses": self._misses.get(method, 0),
+                    }
+                    for method in sorted(set(self._hits) | set(self._misses))
+                },
+            }
+
+    def _read(self, method: str, fetch: Callable, args: tuple, kwargs: dict) -> Any:
+        ttl = self.ttls.get(method, 0)
+        key = (_user_id(args, kwargs), method, _freeze(args, kwargs))
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._hits[method] = self._hits.get(method, 0) + 1
+                metrics.count("neuromemory.cache_hits")
+                return entry[1]
+            self._misses[method] = self._misses.get(method, 0) + 1
+
+        value = _counted(method, fetch)(*args, **kwargs)
+
+        if ttl > 0 and self.max_entries > 0:
+            with self._lock:
+                self._entries[key] = (now + ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return value
+
+    def _write(self, method: str, write: Callable, args: tuple, kwargs: dict) -> Any:
+        try:
+            return _counted(method, write)(*args, **kwargs)
+        finally:
+            # Invalidate even on failure: the write may have partially landed
+            self.invalidate(_user_id(args, kwargs), WRITE_INVALIDATES[method])
+
+
+class _ReadNamespace:
+    """Caches the read methods of ``client.memory``"""
+
+    def __init__(self, cache: CachedMemoryClient, namespace: str):
+        self._cache = cache
+        self._namespace = namespace
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(getattr(self._cache.client, self._namespace), name)
+        if name not in DEFAULT_TTLS:
+            return _counted(name, attr)
+
+        def read(*args, **kwargs):
+            return self._cache._read(name, attr, args, kwargs)
+
+        return read
+
+
+class _WriteNamespace:
+    """Invalidates cached reads after writes on a client namespace"""
+
+    def __init__(self, cache: CachedMemoryClient, namespace: str):
+        self._cache = cache
+        self._namespace = namespace
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(getattr(self._cache.client, self._namespace), name)
+        if name not in WRITE_INVALIDATES:
+            return _counted(name, attr)
+
+        def write(*args, **kwargs):
+            return self._cache._write(name, attr, args, kwargs)
+
+        return write
+
+
+def _counted(method: str, fn: Callable) -> Callable:
+    """Wrap a backend call so it is counted on the current metrics span"""
+    if not callable(fn):
+        return fn
+
+    def call(*args, **kwargs):
+        metrics.count("neuromemory.calls")
+        metrics.count(f"neuromemory.{method}")
+        return fn(*args, **kwargs)
+
+    return call
+
+
+def _user_id(args: tuple, kwargs: dict) -> Optional[str]:
+    """User ID of a NeuroMemory call (keyword or first positional)"""
+    if "user_id" in kwargs:
+        return kwargs["user_id"]
+    return args[0] if args else None
+
+
+def _freeze(args: tuple, kwargs: dict) -> str:
+    """Hashable form of call arguments"""
+    return json.dumps([args, kwargs], sort_keys=True, ensure_ascii=False, default=str)
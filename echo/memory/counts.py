@@ -0,0 +1,107 @@
+"""Cheap counting over NeuroMemory collections"""
+
+from __future__ import annotations
+
+import contextvars
+import inspect
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from echo import metrics
+
+logger = logging.getLogger(__name__)
+
+# Records requested per page when a count has to be paged, and pages
+# requested at once
+COUNT_PAGE_SIZE = 500
+COUNT_PAGE_WORKERS = 4
+
+
+def count_facts(
+    namespace: Any,
+    user_id: str,
+    page_size: int = COUNT_PAGE_SIZE,
+    page_workers: int = COUNT_PAGE_WORKERS,
+) -> int:
+    """Count a user's facts without downloading them where possible
+
+    Uses the first strategy the SDK supports:
+
+    1. a count endpoint (``count_facts(user_id)`` or
+       ``count(user_id=..., memory_type="fact")``)
+    2. ``get_facts(..., count_only=True)``
+    3. paging through ``get_facts`` with ``offset``, page_workers pages at
+       a time, keeping only the running total, so memory use is a few
+       pages regardless of size
+
+    Args:
+        namespace: ``client.memory`` of a NeuroMemory client (pass the raw
+            client's namespace so pages don't fill the read cache)
+        user_id: User ID
+        page_size: Page size for strategy 3
+        page_workers: Pages fetched concurrently in strategy 3
+
+    Returns:
+        Number of facts
+    """
+    metrics.count("neuromemory.calls")
+    if hasattr(namespace, "count_facts"):
+        return int(namespace.count_facts(user_id))
+    if hasattr(namespace, "count"):
+        return int(namespace.count(user_id=user_id, memory_type="fact"))
+
+    get_facts = namespace.get_facts
+    params = _parameters(get_facts)
+
+    if "count_only" in params:
+        result = get_facts(user_id, count_only=True)
+        return int(result["count"] if isinstance(result, dict) else result)
+
+    if "offset" in params:
+        return _count_pages(
+            lambda offset: get_facts(user_id, limit=page_size, offset=offset),
+            page_size,
+            page_workers,
+        )
+
+    # Neither counting nor paging: one bounded fetch is the best available
+    facts = get_facts(user_id, limit=page_size)
+    if len(facts) >= page_size:
+        logger.warning(f"NeuroMemory SDK cannot count facts; reporting at least {len(facts)}")
+    return len(facts)
+
+
+def _count_pages(fetch_page: Callable[[int], list], page_size: int, workers: int) -> int:
+    """Sum page sizes, fetching pages in waves of workers until one is short
+
+    A wave may overrun the end by up to workers - 1 empty pages; that costs
+    calls but not wall time, which is what the count is bounded by.
+    """
+    def fetch(offset: int) -> int:
+        if offset:  # the first page was counted by count_facts
+            metrics.count("neuromemory.calls")
+        return len(fetch_page(offset))
+
+    workers = max(1, workers)
+    total = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="echo-count") as pool:
+        while True:
+            # Pages run in the caller's context, so their calls count
+            # toward the calling command's span
+            futures = [
+                pool.submit(contextvars.copy_context().run, fetch, total + i * page_size)
+                for i in range(workers)
+            ]
+            for future in futures:
+                size = future.result()
+                total += size
+                if size < page_size:
+                    return total
+
+
+def _parameters(fn: Callable) -> set[str]:
+    try:
+        return set(inspect.signature(fn).parameters)
+    except (TypeError, ValueError):
+        return set()
@@ -0,0 +1,360 @@
+"""Local vector replica of a user's memories"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+try:
+    import numpy as np
+except ImportError:  # installed with the "replica" extra
+    np = None
+
+if TYPE_CHECKING:
+    from neuromemory_client import NeuroMemoryClient
+
+logger = logging.getLogger(__name__)
+
+# Memories fetched per page while syncing
+SYNC_PAGE_SIZE = 500
+
+# Query embeddings kept for repeated questions
+QUERY_CACHE_SIZE = 256
+
+# Fields of a memory record kept next to its vector
+_META_FIELDS = ("id", "content", "memory_type", "created_at", "updated_at")
+
+# SDK method names probed for incremental listing and for query embedding
+_LIST_METHODS = ("list_memories", "export", "list")
+_EMBED_METHODS = ("embed", "embed_texts", "get_embeddings")
+
+FetchFn = Callable[[str, Optional[str], int, int], list[dict]]
+EmbedFn = Callable[[list[str]], list[list[float]]]
+
+
+def replica_backend(client: NeuroMemoryClient) -> Optional[tuple[FetchFn, EmbedFn]]:
+    """Adapt a NeuroMemory client for MemoryReplica
+
+    The replica needs two endpoints: listing memories changed since a
+    timestamp, with their embeddings, and embedding a query. SDK versions
+    without them cannot back a replica.
+
+    Returns:
+        (fetch, embed), or None if the client lacks either endpoint
+    """
+    namespace = getattr(client, "memory", client)
+    list_fn = next((getattr(namespace, m) for m in _LIST_METHODS if hasattr(namespace, m)), None)
+    embed_fn = next(
+        (getattr(target, m) for target in (namespace, client) for m in _EMBED_METHODS
+         if hasattr(target, m)),
+        None,
+    )
+    if list_fn is None or embed_fn is None:
+        return None
+
+    def fetch(user_id: str, since: Optional[str], offset: int, limit: int) -> list[dict]:
+        return list_fn(
+            user_id=user_id,
+            updated_since=since,
+            include_embeddings=True,
+            offset=offset,
+            limit=limit,
+        )
+
+    return fetch, embed_fn
+
+
+class MemoryReplica:
+    """Memory-mapped vector index mirroring one user's memories
+
+    Vectors are L2-normalized and stored in a float32 matrix memory-mapped
+    from ``vectors.f32``; record metadata and the sync watermark live in
+    ``meta.json``. Search is a single batched dot product plus an
+    argpartition, which takes well under a millisecond for typical memory
+    counts. The query itself still has to be embedded: a query seen
+    recently is served from an in-memory cache, any other costs one remote
+    embed call.
+
+    NeuroMemory stays the source of truth: sync() pulls records updated
+    since the last watermark and overwrites them in place, and a periodic
+    full sync drops records deleted on the server. Callers should only
+    search while is_fresh() holds and fall back to the server otherwise.
+
+    Example:
+        >>> replica = MemoryReplica(Path("~/.echo/replica/alice").expanduser(),
+        ...                         "alice", fetch, embed)
+        >>> replica.sync()
+        >>> replica.search("Rust 所有权", memory_types=["fact"], limit=5)
+        [{'content': '...', 'memory_type': 'fact', 'score': 0.83, ...}]
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        user_id: str,
+        fetch: FetchFn,
+        embed: EmbedFn,
+        max_staleness: float = 300.0,
+        full_sync_interval: float = 86400.0,
+    ):
+        """Initialize replica
+
+        Args:
+            path: Directory holding the replica files
+            user_id: User whose memories are mirrored
+            fetch: fetch(user_id, updated_since, offset, limit) -> records
+                with an ``embedding`` field
+            embed: Embeds a batch of query texts
+            max_staleness: Seconds after a sync that the replica is
+                considered fresh
+            full_sync_interval: Seconds between full resyncs, which pick
+                up server-side deletions
+        """
+        if np is None:
+            raise ImportError("MemoryReplica requires numpy (pip install 'echo-agent[replica]')")
+
+        self.path = path
+        self.user_id = user_id
+        self._fetch = fetch
+        self._embed = embed
+        self.max_staleness = max_staleness
+        self.full_sync_interval = full_sync_interval
+
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._query_cache: OrderedDict[str, Any] = OrderedDict()
+        self._type_masks: dict[tuple, Any] = {}  # memory_types -> row mask
+
+        self._records: list[dict] = []
+        self._rows: dict[str, int] = {}  # memory id -> row
+        self._dim = 0
+        self._vectors = None  # np.memmap, capacity rows
+        self._watermark: Optional[str] = None  # max updated_at seen
+        self._synced_at = 0.0
+        self._full_synced_at = 0.0
+        self._load()
+
+    # ========== Queries ==========
+
+    def is_fresh(self) -> bool:
+        """True if the last successful sync is recent enough to serve reads"""
+        return bool(self._records) and time.time() - self._synced_at <= self.max_staleness
+
+    def search(
+        self,
+        query: str,
+        memory_types: Optional[list[str]] = None,
+        limit: int = 5,
+    ) -> list[dict]:
+        """Cosine top-k over the replica
+
+        Args:
+            query: Query text
+            memory_types: Restrict to these memory types
+            limit: Maximum number of results
+
+        Returns:
+            Memory records with a ``score`` field, best first
+        """
+        q = self._query_vector(query)
+
+        with self._lock:
+            count = len(self._records)
+            if count == 0 or q.shape[0] != self._dim:
+                return []
+
+            scores = np.asarray(self._vectors[:count]) @ q
+            if memory_types:
+                scores = np.where(self._type_mask(memory_types), scores, -np.inf)
+
+            k = min(limit, count)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            return [
+                {**self._records[i], "score": float(scores[i])}
+                for i in top if np.isfinite(scores[i])
+            ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "records": len(self._records),
+                "dim": self._dim,
+                "synced_at": self._synced_at,
+                "fresh": self.is_fresh(),
+            }
+
+    # ========== Sync ==========
+
+    def sync(self, full: bool = False) -> int:
+        """Pull changes from NeuroMemory
+
+        Args:
+            full: Rebuild from scratch (also done every full_sync_interval)
+
+        Returns:
+            Number of records fetched
+        """
+        # A sync already running will bring the replica up to date
+        if not self._sync_lock.acquire(blocking=False):
+            return 0
+
+        try:
+            full = full or time.time() - self._full_synced_at > self.full_sync_interval
+            since = None if full else self._watermark
+
+            fetched: list[dict] = []
+            offset = 0
+            while True:
+                page = self._fetch(self.user_id, since, offset, SYNC_PAGE_SIZE) or []
+                fetched.extend(page)
+                if len(page) < SYNC_PAGE_SIZE:
+                    break
+                offset += len(page)
+
+            with self._lock:
+                if full:
+                    self._records, self._rows, self._watermark = [], {}, None
+                self._upsert(fetched)
+                self._synced_at = time.time()
+                if full:
+                    self._full_synced_at = self._synced_at
+                self._save_meta()
+
+            logger.info(f"Memory replica for {self.user_id}: {len(fetched)} records synced"
+                        f"{' (full)' if full else ''}, {len(self._records)} total")
+            return len(fetched)
+        finally:
+            self._sync_lock.release()
+
+    # ========== Internals ==========
+
+    def _type_mask(self, memory_types: list[str]):
+        key = tuple(sorted(memory_types))
+        mask = self._type_masks.get(key)
+        if mask is None:
+            allowed = set(memory_types)
+            mask = np.fromiter(
+                (r.get("memory_type") in allowed for r in self._records), bool, len(self._records)
+            )
+            self._type_masks[key] = mask
+        return mask
+
+    def _upsert(self, records: list[dict]):
+        self._type_masks.clear()
+        for record in records:
+            embedding = record.get("embedding")
+            memory_id = record.get("id")
+            if not embedding or memory_id is None or not record.get("content"):
+                continue
+
+            vector = np.asarray(embedding, dtype=np.float32)
+            if not self._dim:
+                self._dim = vector.shape[0]
+            if vector.shape[0] != self._dim:
+                logger.warning(f"Skipping memory {memory_id}: embedding dimension changed")
+                continue
+            norm = np.linalg.norm(vector)
+            if norm == 0:
+                continue
+
+            row = self._rows.get(str(memory_id))
+            if row is None:
+                row = len(self._records)
+                self._rows[str(memory_id)] = row
+                self._records.append({})
+                self._ensure_capacity(row + 1)
+
+            self._records[row] = {k: record.get(k) for k in _META_FIELDS}
+            self._vectors[row] = vector / norm
+
+            updated = record.get("updated_at") or record.get("created_at")
+            if isinstance(updated, str) and (self._watermark is None or updated > self._watermark):
+                self._watermark = updated
+
+        if self._vectors is not None:
+            self._vectors.flush()
+
+    def _ensure_capacity(self, rows: int):
+        capacity = 0 if self._vectors is None else self._vectors.shape[0]
+        if rows <= capacity:
+            return
+
+        new_capacity = max(rows, capacity * 2, 64)
+        self.path.mkdir(parents=True, exist_ok=True)
+        vectors_path = self.path / "vectors.f32"
+        old = None if self._vectors is None else np.array(self._vectors[:capacity])
+
+        # Growing a memmap means re-mapping a larger file
+        self._vectors = None
+        with open(vectors_path, "ab") as f:
+            f.truncate(new_capacity * self._dim * 4)
+        self._vectors = np.memmap(
+            vectors_path, dtype=np.float32, mode="r+", shape=(new_capacity, self._dim)
+        )
+        if old is not None:
+            self._vectors[:capacity] = old
+
+    def _query_vector(self, query: str):
+        with self._lock:
+            cached = self._query_cache.get(query)
+            if cached is not None:
+                self._query_cache.move_to_end(query)
+                return cached
+
+        # Embedding is a remote call, so it runs outside the lock
+        vector = np.asarray(self._embed([query])[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+
+        with self._lock:
+            self._query_cache[query] = vector
+            if len(self._query_cache) > QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        return vector
+
+    def _save_meta(self):
+        meta = {
+            "dim": self._dim,
+            "capacity": 0 if self._vectors is None else self._vectors.shape[0],
+            "watermark": self._watermark,
+            "synced_at": self._synced_at,
+            "full_synced_at": self._full_synced_at,
+            "records": self._records,
+        }
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path / "meta.json.tmp"
+        tmp_path.write_text(json.dumps(meta, ensure_ascii=False, default=str), encoding="utf-8")
+        tmp_path.replace(self.path / "meta.json")
+
+    def _load(self):
+        meta_path = self.path / "meta.json"
+        vectors_path = self.path / "vectors.f32"
+        if not meta_path.exists() or not vectors_path.exists():
+            return
+
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            capacity = meta["capacity"]
+            dim = meta["dim"]
+            if capacity and dim:
+                self._vectors = np.memmap(
+                    vectors_path, dtype=np.float32, mode="r+", shape=(capacity, dim)
+                )
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Discarding unreadable memory replica {self.path}: {e}")
+            return
+
+        self._dim = dim
+        self._records = meta.get("records", [])
+        self._rows = {str(r.get("id")): i for i, r in enumerate(self._records)}
+        self._watermark = meta.get("watermark")
+        self._synced_at = meta.get("synced_at", 0.0)
+        self._full_synced_at = meta.get("full_synced_at", 0.0)
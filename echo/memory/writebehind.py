@@ -0,0 +1,321 @@
+"""Write-behind buffer for conversation storage"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import IO, Any, Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: spools left by other processes are not claimed
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Longest wait between retries of a failing backend write
+MAX_RETRY_DELAY = 60.0
+
+
+class WriteBehindBuffer:
+    """Batch conversation turns into bulk add_messages calls off the hot path
+
+    append() records a turn in a local spool file and returns immediately;
+    a background thread sends buffered turns once ``batch_turns`` have
+    accumulated or the oldest has waited ``interval`` seconds, grouping
+    consecutive turns of a session into one call. Failed writes stay
+    buffered and are retried with backoff.
+
+    Each buffer has its own spool file (one JSON line per turn) in
+    ``spool_dir``, flushed to the OS on every append and rewritten after
+    each successful write, and holds an exclusive lock on a companion
+    ``.lock`` file while it is open. Several processes can therefore buffer
+    turns for the same user side by side. A new buffer claims only the
+    spools whose lock it can take (their buffer closed or crashed) and
+    replays them, so a crash loses nothing. Delivery is at-least-once; a
+    crash between a write and the spool rewrite resends that batch.
+
+    Example:
+        >>> buffer = WriteBehindBuffer(write, Path("~/.echo/spool/alice").expanduser())
+        >>> buffer.append("alice", session_id, [{"role": "user", "content": "..."}, ...])
+        >>> buffer.close()  # drains
+    """
+
+    def __init__(
+        self,
+        write: Callable[[str, Optional[str], list[dict]], Any],
+        spool_dir: Path,
+        batch_turns: int = 8,
+        interval: float = 2.0,
+        on_flushed: Optional[Callable[[int], None]] = None,
+    ):
+        """Initialize buffer
+
+        Args:
+            write: write(user_id, session_id, messages) sends one batch
+            spool_dir: Directory of the spool files (one per buffer)
+            batch_turns: Buffered turns that trigger an immediate flush
+            interval: Seconds a turn may wait before it is flushed
+            on_flushed: Called with the number of turns after each
+                successful write
+        """
+        self._write = write
+        self.spool_dir = spool_dir
+        token = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.spool_path = spool_dir / f"{token}.jsonl"
+        self.batch_turns = batch_turns
+        self.interval = interval
+        self._on_flushed = on_flushed
+
+        self._cond = threading.Condition()
+        self._pending: list[dict] = []
+        self._in_flight = 0
+        self._closed = False
+        self._failures = 0
+        self._retry_at = 0.0
+        self._flush_requested = False
+        self._thread: Optional[threading.Thread] = None
+        self._spool = None
+
+        spool_dir.mkdir(parents=True, exist_ok=True)
+        self._owner = _lock(self.spool_path.with_suffix(".lock"))
+        self._claim_orphans()
+
+    @property
+    def pending(self) -> int:
+        """Turns not yet written to the backend"""
+        with self._cond:
+            return len(self._pending) + self._in_flight
+
+    def append(self, user_id: str, session_id: Optional[str], messages: list[dict]):
+        """Buffer one conversation turn"""
+        entry = {
+            "user_id": user_id,
+            "session_id": session_id,
+            "messages": messages,
+            "at": time.time(),
+        }
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("WriteBehindBuffer is closed")
+            self._spool_file().write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._spool.flush()
+            self._pending.append(entry)
+            self._ensure_worker()
+            self._cond.notify()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write everything buffered now and wait for it
+
+        Returns:
+            True if the buffer drained within the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._retry_at = 0.0
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._pending or self._in_flight:
+                if self._thread is None or not self._thread.is_alive():
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 10.0):
+        """Drain the buffer and stop the worker
+
+        Turns that could not be written within ``timeout`` stay in the
+        spool and are replayed by the next buffer.
+        """
+        drained = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        with self._cond:
+            if self._spool is not None:
+                self._spool.close()
+                self._spool = None
+            if self._owner is not None:
+                # Unlocked, an undrained spool is claimed by the next buffer
+                self.spool_path.with_suffix(".lock").unlink(missing_ok=True)
+                self._owner.close()
+                self._owner = None
+        if not drained:
+            logger.warning(f"{self.pending} conversation turns left in {self.spool_path}")
+
+    # ========== Internals ==========
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="echo-write-behind", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._ready():
+                    if self._closed:
+                        return
+                    self._cond.wait(self._wait_time())
+                batch, self._pending = self._pending, []
+                self._in_flight = len(batch)
+
+            failed = self._send(batch)
+
+            with self._cond:
+                self._pending[:0] = failed
+                self._in_flight = 0
+                if failed:
+                    self._failures += 1
+                    delay = min(MAX_RETRY_DELAY, 2 ** self._failures)
+                    self._retry_at = time.monotonic() + delay
+                    logger.warning(
+                        f"Conversation write failed, retrying {len(failed)} turns in {delay}s"
+                    )
+                else:
+                    self._failures = 0
+                    self._retry_at = 0.0
+                if not self._pending:
+                    self._flush_requested = False
+                self._rewrite_spool()
+                self._cond.notify_all()
+
+    def _ready(self) -> bool:
+        if not self._pending or time.monotonic() < self._retry_at:
+            return False
+        if self._closed or self._flush_requested or len(self._pending) >= self.batch_turns:
+            return True
+        return time.time() - self._pending[0]["at"] >= self.interval
+
+    def _wait_time(self) -> Optional[float]:
+        if not self._pending:
+            return None
+        if self._retry_at:
+            return max(0.01, self._retry_at - time.monotonic())
+        return max(0.01, self._pending[0]["at"] + self.interval - time.time())
+
+    def _send(self, batch: list[dict]) -> list[dict]:
+        """Write a batch grouped by session; returns the entries that failed"""
+        groups: list[list[dict]] = []
+        for entry in batch:
+            if groups and (groups[-1][0]["user_id"], groups[-1][0]["session_id"]) \
+                    == (entry["user_id"], entry["session_id"]):
+                groups[-1].append(entry)
+            else:
+                groups.append([entry])
+
+        for i, group in enumerate(groups):
+            messages = [m for entry in group for m in entry["messages"]]
+            try:
+                self._write(group[0]["user_id"], group[0]["session_id"], messages)
+            except Exception as e:
+                logger.warning(f"Failed to store conversation batch: {e}")
+                return [entry for rest in groups[i:] for entry in rest]
+
+            if self._on_flushed is not None:
+                try:
+                    self._on_flushed(len(group))
+                except Exception as e:
+                    logger.warning(f"Write-behind callback failed: {e}")
+
+        return []
+
+    def _spool_file(self):
+        if self._spool is None:
+            self._spool = open(self.spool_path, "a", encoding="utf-8")
+        return self._spool
+
+    def _rewrite_spool(self):
+        """Persist exactly the turns still pending (called under the lock)"""
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+        if not self._pending:
+            self.spool_path.unlink(missing_ok=True)
+            return
+
+        tmp_path = self.spool_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in self._pending:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        tmp_path.replace(self.spool_path)
+
+    def _claim_orphans(self):
+        """Take over the spools of buffers that closed undrained or crashed"""
+        if fcntl is None:
+            return
+
+        stems = {p.stem for pattern in ("*.jsonl", "*.lock") for p in self.spool_dir.glob(pattern)}
+        stems.discard(self.spool_path.stem)
+        claimed = []
+        for stem in sorted(stems):
+            lock = _lock(self.spool_dir / f"{stem}.lock")
+            if lock is None:
+                continue  # its buffer is still open
+            claimed.append((stem, lock))
+            self._pending.extend(_read_spool(self.spool_dir / f"{stem}.jsonl"))
+
+        if self._pending:
+            logger.info(f"Replaying {len(self._pending)} buffered conversation turns")
+            self._pending.sort(key=lambda entry: entry.get("at", 0))
+            with self._cond:
+                self._rewrite_spool()
+
+        # Removed only once the turns are in our own spool
+        for stem, lock in claimed:
+            (self.spool_dir / f"{stem}.jsonl").unlink(missing_ok=True)
+            (self.spool_dir / f"{stem}.lock").unlink(missing_ok=True)
+            lock.close()
+
+        if self._pending:
+            with self._cond:
+                self._ensure_worker()
+
+
+def _lock(path: Path) -> Optional[IO]:
+    """Open ``path`` holding an exclusive lock, or None if a live buffer holds it"""
+    f = open(path, "a")
+    if fcntl is None:
+        return f
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        # The previous holder unlinks the file before unlocking it
+        if os.fstat(f.fileno()).st_ino == os.stat(path).st_ino:
+            return f
+    except OSError:
+        pass
+    f.close()
+    return None
+
+
+def _read_spool(path: Path) -> list[dict]:
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        return []
+    except OSError as e:
+        logger.warning(f"Failed to read conversation spool {path}: {e}")
+        return []
+
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            # A torn last line from a crash mid-append
+            logger.warning(f"Skipping corrupt spool entry in {path}")
+    return entries
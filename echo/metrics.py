@@ -0,0 +1,424 @@
+"""Span timing, backend call counting and metric sinks"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Histogram buckets (seconds) for the Prometheus exposition
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("echo_span", default=None)
+
+
+class Span:
+    """A timed stage, with counters that roll up into its ancestors
+
+    Counters are things like backend calls and LLM tokens; count() adds to
+    this span and every enclosing one, so a command's root span ends up
+    with the totals for the whole command.
+    """
+
+    def __init__(self, name: str, parent: Optional[Span] = None, **attrs: Any):
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs
+        self.counters: dict[str, float] = {}
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def root(self) -> Span:
+        span = self
+        while span.parent is not None:
+            span = span.parent
+        return span
+
+    def elapsed_ms(self) -> float:
+        """Milliseconds since the span started"""
+        return round((time.perf_counter() - self._t0) * 1000, 1)
+
+    def count(self, name: str, value: float = 1):
+        span = self
+        while span is not None:
+            with span._lock:
+                span.counters[name] = span.counters.get(name, 0) + value
+            span = span.parent
+
+    def end(self):
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._t0
+            _recorder.emit(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "root": self.root.name,
+            "parent": self.parent.name if self.parent else None,
+            "start": self.start,
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "attrs": self.attrs,
+            "counters": self.counters,
+            "error": self.error,
+        }
+
+
+class Sink(ABC):
+    """Receives finished spans"""
+
+    @abstractmethod
+    def emit(self, span: Span):
+        """Record a finished span"""
+
+    def close(self):
+        """Release resources"""
+
+
+class JSONLSink(Sink):
+    """Append one JSON line per finished span, rotating at ``max_bytes``"""
+
+    def __init__(self, path: Path, max_bytes: int = 16 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._file = None
+
+    def emit(self, span: Span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            if self._file.tell() > self.max_bytes:
+                self._file.close()
+                self._file = None
+                self.path.replace(self.path.with_suffix(self.path.suffix + ".1"))
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class PrometheusSink(Sink):
+    """Aggregate spans into Prometheus metrics, optionally served over HTTP
+
+    Exposes ``echo_stage_duration_seconds`` (histogram per stage) and
+    ``echo_counter_total`` (backend calls, LLM tokens, ... per counter).
+
+    Example:
+        >>> sink = PrometheusSink()
+        >>> sink.serve(9464)  # GET http://localhost:9464/metrics
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: dict[str, list[int]] = {}
+        self._sums: dict[str, float] = {}
+        self._counts: dict[str, int] = {}
+        self._counters: dict[str, float] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def emit(self, span: Span):
+        with self._lock:
+            buckets = self._buckets.setdefault(span.name, [0] * len(DURATION_BUCKETS))
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if span.duration <= bound:
+                    buckets[i] += 1
+            self._sums[span.name] = self._sums.get(span.name, 0.0) + span.duration
+            self._counts[span.name] = self._counts.get(span.name, 0) + 1
+
+            # Counters roll up, so only root spans carry each event exactly once
+            if span.parent is None:
+                for name, value in span.counters.items():
+                    self._counters[name] = self._counters.get(name, 0) + value
+
+    def render(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP echo_stage_duration_seconds Duration of Echo stages",
+            "# TYPE echo_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            for stage in sorted(self._buckets):
+                label = f'stage="{stage}"'
+                count = self._counts[stage]
+                for bound, in_bucket in zip(DURATION_BUCKETS, self._buckets[stage]):
+                    lines.append(
+                        f'echo_stage_duration_seconds_bucket{{{label},le="{bound}"}} {in_bucket}'
+                    )
+                lines.append(f'echo_stage_duration_seconds_bucket{{{label},le="+Inf"}} {count}')
+                lines.append(f"echo_stage_duration_seconds_sum{{{label}}} {self._sums[stage]}")
+                lines.append(f"echo_stage_duration_seconds_count{{{label}}} {count}")
+
+            lines += [
+                "# HELP echo_counter_total Backend calls and LLM tokens",
+                "# TYPE echo_counter_total counter",
+            ]
+            for name in sorted(self._counters):
+                lines.append(f'echo_counter_total{{name="{name}"}} {self._counters[name]}')
+
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """Serve /metrics from a daemon thread"""
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = sink.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(
+            target=self._server.serve_forever, name="echo-metrics", daemon=True
+        ).start()
+        logger.info(f"Serving Prometheus metrics on http://{host}:{port}/metrics")
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
+
+class Recorder:
+    """Fans finished spans out to the configured sinks"""
+
+    def __init__(self):
+        self.sinks: list[Sink] = []
+        self._configured = False
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink: Sink):
+        self.sinks.append(sink)
+
+    def emit(self, span: Span):
+        for sink in self.sinks:
+            try:
+                sink.emit(span)
+            except Exception as e:
+                logger.debug(f"Metrics sink {type(sink).__name__} failed: {e}")
+
+    def configure(self, settings: Any):
+        """Set up sinks from settings (once per process)"""
+        with self._lock:
+            if self._configured:
+                return
+            self._configured = True
+
+            if not settings.metrics_enabled:
+                return
+            data_dir = Path(settings.echo_data_dir).expanduser()
+            self.add_sink(JSONLSink(
+                data_dir / "metrics" / "spans.jsonl",
+                max_bytes=settings.metrics_max_mb * 1024 * 1024,
+            ))
+            if settings.metrics_prometheus_port:
+                sink = PrometheusSink()
+                try:
+                    sink.serve(settings.metrics_prometheus_port)
+                    self.add_sink(sink)
+                except OSError as e:
+                    logger.warning(f"Prometheus endpoint disabled: {e}")
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+_recorder = Recorder()
+
+
+def get_recorder() -> Recorder:
+    return _recorder
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Span]:
+    """Time a stage as a child of the current span
+
+    Example:
+        >>> with span("chat.context") as s:
+        ...     context = agent._get_context(message)
+        ...     s.attrs["sources"] = len(context)
+    """
+    current = Span(name, _current.get(), **attrs)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            # Generator closed from another context; nothing to restore
+            pass
+        current.end()
+
+
+def timed(name: str) -> Callable:
+    """Decorator form of span(); works on plain and coroutine functions"""
+
+    def decorator(fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name: str, value: float = 1):
+    """Add to a counter on the current span (no-op outside any span)"""
+    current = _current.get()
+    if current is not None:
+        current.count(name, value)
+
+
+def record_usage(response: Any, task: str = ""):
+    """Count a Claude call and its token usage on the current span"""
+    count("claude.calls")
+    if task:
+        count(f"claude.calls.{task}")
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    for field in ("input_tokens", "output_tokens", "cache_read_input_tokens",
+                  "cache_creation_input_tokens"):
+        value = getattr(usage, field, 0) or 0
+        if value:
+            count(f"claude.{field}", value)
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def spans_path(settings: Any) -> Path:
+    """Location of the JSONL span log"""
+    return Path(settings.echo_data_dir).expanduser() / "metrics" / "spans.jsonl"
+
+
+def load_spans(path: Path, since: Optional[float] = None) -> list[dict]:
+    """Read logged spans (including the rotated file), optionally since a time"""
+    spans = []
+    for file in (path.with_suffix(path.suffix + ".1"), path):
+        if not file.exists():
+            continue
+        with open(file, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if since is None or record.get("start", 0) >= since:
+                    spans.append(record)
+    return spans
+
+
+def stage_stats(spans: list[dict]) -> list[dict]:
+    """Latency percentiles per stage, plus per-command counter averages
+
+    Returns:
+        One row per stage name with count, p50/p95/p99 (ms), error count
+        and, for root spans, the mean of each counter per command
+    """
+    by_stage: dict[str, list[dict]] = {}
+    for record in spans:
+        by_stage.setdefault(record["name"], []).append(record)
+
+    rows = []
+    for name in sorted(by_stage):
+        records = by_stage[name]
+        durations = [r["duration_ms"] for r in records]
+        roots = [r for r in records if r.get("parent") is None]
+        counters: dict[str, float] = {}
+        for r in roots:
+            for key, value in (r.get("counters") or {}).items():
+                counters[key] = counters.get(key, 0) + value
+        rows.append({
+            "stage": name,
+            "count": len(records),
+            "p50": percentile(durations, 50),
+            "p95": percentile(durations, 95),
+            "p99": percentile(durations, 99),
+            "errors": sum(1 for r in records if r.get("error")),
+            "per_command": {k: v / len(roots) for k, v in counters.items()} if roots else {},
+        })
+    return rows
+
+
+def task_stats(spans: list[dict]) -> list[dict]:
+    """Latency and token usage per LLM task and model
+
+    Built from the ``llm.<task>`` spans the LLM dispatcher records around
+    every call, so routing a task to another model can be compared.
+
+    Returns:
+        One row per (task, model) with count, p50/p95 (ms), error count and
+        mean input/output tokens per call
+    """
+    groups: dict[tuple[str, str], list[dict]] = {}
+    for record in spans:
+        if record["name"].startswith("llm."):
+            model = (record.get("attrs") or {}).get("model") or ""
+            groups.setdefault((record["name"][4:], model), []).append(record)
+
+    rows = []
+    for (task, model), records in sorted(groups.items()):
+        durations = [r["duration_ms"] for r in records]
+        counters = [r.get("counters") or {} for r in records]
+        rows.append({
+            "task": task,
+            "model": model,
+            "count": len(records),
+            "p50": percentile(durations, 50),
+            "p95": percentile(durations, 95),
+            "errors": sum(1 for r in records if r.get("error")),
+            "input_tokens": sum(c.get("claude.input_tokens", 0) for c in counters) / len(records),
+            "output_tokens": sum(c.get("claude.output_tokens", 0) for c in counters) / len(records),
+        })
+    return rows
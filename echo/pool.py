@@ -0,0 +1,177 @@
+"""Bounded pool of warm per-user agents"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, Optional
+
+if TYPE_CHECKING:
+    from echo.async_agent import AsyncEchoAgent
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Entry:
+    agent: AsyncEchoAgent
+    last_used: float = field(default_factory=time.monotonic)
+    leases: int = 0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class AgentPool:
+    """LRU pool of AsyncEchoAgents keyed by user ID
+
+    Agents are created on first request through ``factory`` and kept warm
+    (session history, read cache, profile digest) for later requests. When
+    the pool is full the least recently used idle agent is closed, and a
+    background sweep closes agents idle for ``idle_timeout`` seconds.
+    Closing an agent drains its conversation buffer and profile refresher,
+    so eviction loses no pending work. Agents in use are never evicted.
+
+    Example:
+        >>> pool = AgentPool(create_agent, max_agents=256)
+        >>> async with pool.lease("alice", exclusive=True) as agent:
+        ...     await agent.chat("你好")
+        >>> await pool.close()
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], Awaitable[AsyncEchoAgent]],
+        max_agents: int = 256,
+        idle_timeout: float = 600.0,
+    ):
+        """Initialize pool
+
+        Args:
+            factory: Coroutine function creating the agent for a user ID
+            max_agents: Warm agents kept at most (while idle)
+            idle_timeout: Seconds after which an idle agent is closed
+                (0 disables the sweep)
+        """
+        self._factory = factory
+        self.max_agents = max_agents
+        self.idle_timeout = idle_timeout
+
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._creating: dict[str, asyncio.Task] = {}
+        self._closing: dict[str, asyncio.Task] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        self._created = 0
+        self._evicted = 0
+
+    @asynccontextmanager
+    async def lease(self, user_id: str, exclusive: bool = False) -> AsyncIterator[AsyncEchoAgent]:
+        """Borrow the user's agent, creating it if needed
+
+        Args:
+            user_id: User ID
+            exclusive: Serialize with other exclusive leases of the same
+                user (chat turns must not interleave in one session)
+        """
+        entry = await self._acquire(user_id)
+        try:
+            if exclusive:
+                async with entry.lock:
+                    yield entry.agent
+            else:
+                yield entry.agent
+        finally:
+            entry.leases -= 1
+            entry.last_used = time.monotonic()
+            self._evict_overflow()
+
+    def stats(self) -> dict:
+        return {
+            "agents": len(self._entries),
+            "in_use": sum(1 for e in self._entries.values() if e.leases),
+            "max_agents": self.max_agents,
+            "created": self._created,
+            "evicted": self._evicted,
+        }
+
+    def start(self):
+        """Start the idle sweep (needs a running event loop)"""
+        if self.idle_timeout and self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def close(self):
+        """Close every agent, waiting for pending work to drain"""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        for task in list(self._creating.values()):
+            await asyncio.gather(task, return_exceptions=True)
+        for user_id in list(self._entries):
+            self._evict(user_id)
+        await asyncio.gather(*self._closing.values(), return_exceptions=True)
+
+    # ========== Internals ==========
+
+    async def _acquire(self, user_id: str) -> _Entry:
+        while True:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+                entry.leases += 1
+                return entry
+
+            # Concurrent first requests for a user share one creation
+            task = self._creating.get(user_id)
+            if task is None:
+                task = asyncio.create_task(self._create(user_id))
+                self._creating[user_id] = task
+            await asyncio.shield(task)
+
+    async def _create(self, user_id: str):
+        try:
+            # A previous agent of this user may still be draining its spool
+            closing = self._closing.get(user_id)
+            if closing is not None:
+                await asyncio.gather(closing, return_exceptions=True)
+
+            agent = await self._factory(user_id)
+            # Overflow is evicted when a lease ends: evicting here could
+            # close this agent before its lease is taken
+            self._entries[user_id] = _Entry(agent)
+            self._created += 1
+        finally:
+            self._creating.pop(user_id, None)
+
+    def _evict_overflow(self):
+        if len(self._entries) <= self.max_agents:
+            return
+        idle = [user_id for user_id, e in self._entries.items() if not e.leases]
+        for user_id in idle[:len(self._entries) - self.max_agents]:
+            self._evict(user_id)
+
+    def _evict(self, user_id: str):
+        entry = self._entries.pop(user_id)
+        self._evicted += 1
+        task = asyncio.create_task(self._close_agent(user_id, entry.agent))
+        self._closing[user_id] = task
+
+    async def _close_agent(self, user_id: str, agent: AsyncEchoAgent):
+        try:
+            await agent.close()
+        except Exception as e:
+            logger.warning(f"Failed to close agent for {user_id}: {e}")
+        finally:
+            if self._closing.get(user_id) is asyncio.current_task():
+                del self._closing[user_id]
+
+    async def _sweep(self):
+        interval = max(1.0, self.idle_timeout / 4)
+        while True:
+            await asyncio.sleep(interval)
+            cutoff = time.monotonic() - self.idle_timeout
+            for user_id, entry in list(self._entries.items()):
+                if not entry.leases and entry.last_used < cutoff:
+                    logger.info(f"Closing idle agent for {user_id}")
+                    self._evict(user_id)
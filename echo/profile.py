@@ -1,13 +1,43 @@
 """User profile management - ECHO.md generation and updates"""
 
 from __future__ import annotations
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable, Optional
 from pathlib import Path
+import hashlib
+import json
+import logging
 import os
+import re
+import threading
+import time
+
+from echo import metrics
 
 if TYPE_CHECKING:
     from neuromemory_client import NeuroMemoryClient
 
+logger = logging.getLogger(__name__)
+
+# Backend data sources used to build ECHO.md, with their empty defaults
+PROFILE_SOURCES = {
+    "user_profile": dict,
+    "preferences": list,
+    "facts": list,
+    "episodes": list,
+}
+
+# Which sources each rendered section depends on
+SECTION_SOURCES = {
+    "preferences": ("preferences",),
+    "skill_tree": ("facts",),
+    "interests": ("facts",),
+    "stats": ("user_profile", "facts"),
+    "current_focus": ("episodes",),
+}
+
+# Matches the timestamp line, which is excluded from the content hash
+_LAST_UPDATED_RE = re.compile(r"^- \*\*最后更新\*\*: .*$", re.MULTILINE)
+
 
 ECHO_MD_TEMPLATE = """# ECHO.md - {user_name} 的学习档案
 
@@ -122,18 +152,33 @@ _详细内容存储在 NeuroMemory: https://github.com/zhuqingxun/NeuroMemory_
 
 
 class UserProfile:
-    """User profile manager for ECHO.md"""
-
-    def __init__(self, memory: NeuroMemoryClient, user_id: str, profile_dir: str = None):
+    """User profile manager for ECHO.md
+
+    Regeneration is incremental: each backend source is refetched only when
+    it has been invalidated or is older than ``source_ttl``, each section is
+    re-rendered only when the fingerprints of its sources changed, and the
+    file is rewritten only when the resulting content differs.
+    """
+
+    def __init__(
+        self,
+        memory: NeuroMemoryClient,
+        user_id: str,
+        profile_dir: str = None,
+        source_ttl: float = 3600.0,
+    ):
         """Initialize profile manager
 
         Args:
             memory: NeuroMemory client
             user_id: User identifier
             profile_dir: Directory to store ECHO.md (default: ~/.echo/profiles/)
+            source_ttl: Seconds after which a source is refetched even if
+                it was not invalidated (server-side extraction is async)
         """
         self.memory = memory
         self.user_id = user_id
+        self.source_ttl = source_ttl
 
         # Default profile directory
         if profile_dir is None:
@@ -144,6 +189,26 @@ class UserProfile:
 
         self.profile_path = self.profile_dir / f"{user_id}_ECHO.md"
 
+        # Incremental build state
+        self._lock = threading.Lock()  # serializes regenerations
+        self._dirty_lock = threading.Lock()
+        self._sources: dict[str, object] = {}
+        self._fetched_at: dict[str, float] = {}
+        self._fingerprints: dict[str, str] = {}
+        self._dirty: set[str] = set(PROFILE_SOURCES)
+        self._sections: dict[str, tuple[tuple, dict]] = {}
+        self._content_hash: Optional[str] = None
+
+    def invalidate(self, *sources: str):
+        """Mark backend sources as changed
+
+        Args:
+            sources: Names from PROFILE_SOURCES (all sources if omitted)
+        """
+        with self._dirty_lock:
+            self._dirty.update(sources or PROFILE_SOURCES)
+
+    @metrics.timed("profile.generate")
     def generate(self, user_name: str = None) -> str:
         """Generate ECHO.md from NeuroMemory data
 
@@ -155,42 +220,57 @@ class UserProfile:
         """
         from datetime import datetime
 
-        # Gather data from NeuroMemory
-        profile_data = self._gather_profile_data()
+        # Refetch only stale sources, re-render only affected sections
+        self._refresh_sources()
+        sections = self._render_sections()
+
+        created_date = self._get_creation_date()
+        if created_date == "N/A":
+            created_date = datetime.now().strftime("%Y-%m-%d")
 
         # Format template
         content = ECHO_MD_TEMPLATE.format(
             user_name=user_name or self.user_id,
             user_id=self.user_id,
-            created_date=profile_data.get("created_date", datetime.now().strftime("%Y-%m-%d")),
+            created_date=created_date,
             last_updated=datetime.now().strftime("%Y-%m-%d %H:%M"),
-            preferences=self._format_preferences(profile_data.get("preferences", [])),
-            skills_mastered=self._format_skills(profile_data.get("skills_mastered", [])),
-            skills_learning=self._format_skills(profile_data.get("skills_learning", [])),
-            skills_planned=self._format_skills(profile_data.get("skills_planned", [])),
-            interest_areas=self._format_interests(profile_data.get("interests", [])),
-            resources_count=profile_data.get("resources_count", 0),
-            knowledge_points=profile_data.get("knowledge_points", 0),
-            learning_days=profile_data.get("learning_days", 0),
-            important_notes=self._format_notes(profile_data.get("important_notes", [])),
-            current_focus=self._format_focus(profile_data.get("current_focus", [])),
-            last_conversation=profile_data.get("last_conversation", "N/A"),
+            important_notes=self._format_notes(self._get_important_notes()),
+            last_conversation=self._get_last_conversation(),
+            **sections,
         )
 
         return content
 
-    def save(self, content: str = None, user_name: str = None):
+    @metrics.timed("profile.save")
+    def save(self, content: str = None, user_name: str = None) -> bool:
         """Save ECHO.md to file
 
+        The write is skipped when the content (ignoring the last-updated
+        timestamp) matches what is already on disk.
+
         Args:
             content: Profile content (if None, will generate)
             user_name: User display name
+
+        Returns:
+            True if the file was written
         """
         if content is None:
             content = self.generate(user_name)
 
+        content_hash = self._content_fingerprint(content)
+        if self._content_hash is None and self.profile_path.exists():
+            self._content_hash = self._content_fingerprint(self.load())
+
+        if content_hash == self._content_hash:
+            logger.debug(f"Profile unchanged for {self.user_id}, skipping write")
+            return False
+
         with open(self.profile_path, "w", encoding="utf-8") as f:
             f.write(content)
+        self._content_hash = content_hash
+
+        return True
 
     def load(self) -> str:
         """Load ECHO.md content
@@ -203,70 +283,121 @@ class UserProfile:
                 return f.read()
         return ""
 
-    def update(self, user_name: str = None):
-        """Update ECHO.md with latest data from NeuroMemory"""
-        self.save(user_name=user_name)
+    def update(self, user_name: str = None) -> bool:
+        """Update ECHO.md with latest data from NeuroMemory
 
-    def _gather_profile_data(self) -> dict:
-        """Gather user data from NeuroMemory"""
-        try:
-            # Get user profile from NeuroMemory
-            profile = self.memory.memory.get_user_profile(self.user_id)
-
-            # Get preferences
-            preferences = self.memory.memory.get_preferences(self.user_id)
-
-            # Get facts (skills, interests)
-            facts = self.memory.memory.get_facts(self.user_id, limit=50)
-
-            # Categorize skills
-            skills_mastered = []
-            skills_learning = []
-            skills_planned = []
-
-            for fact in facts:
-                content = fact.get("content", "")
-                if "擅长" in content or "熟练" in content:
-                    skills_mastered.append(content)
-                elif "学习" in content or "正在学" in content:
-                    skills_learning.append(content)
-                elif "计划" in content or "想学" in content:
-                    skills_planned.append(content)
-
-            # Get interests
-            interests = [f for f in facts if "感兴趣" in f.get("content", "") or "喜欢" in f.get("content", "")]
-
-            return {
-                "preferences": preferences[:5],  # Top 5 preferences
-                "skills_mastered": skills_mastered[:5],
-                "skills_learning": skills_learning[:3],
-                "skills_planned": skills_planned[:3],
-                "interests": interests[:5],
-                "resources_count": profile.get("documents_count", 0),
-                "knowledge_points": len(facts),
-                "learning_days": self._calculate_learning_days(),
-                "important_notes": self._get_important_notes(),
-                "current_focus": self._get_current_focus(),
-                "last_conversation": self._get_last_conversation(),
-                "created_date": self._get_creation_date(),
-            }
+        Returns:
+            True if the file was rewritten
+        """
+        with self._lock:
+            return self.save(user_name=user_name)
+
+    @metrics.timed("profile.fetch")
+    def _refresh_sources(self):
+        """Refetch sources that are invalidated, missing or expired"""
+        fetchers = {
+            "user_profile": lambda: self.memory.memory.get_user_profile(self.user_id),
+            "preferences": lambda: self.memory.memory.get_preferences(self.user_id),
+            "facts": lambda: self.memory.memory.get_facts(self.user_id, limit=50),
+            "episodes": lambda: self.memory.memory.get_episodes(self.user_id, limit=10),
+        }
 
-        except Exception as e:
-            # Return minimal data on error
-            return {
-                "preferences": [],
-                "skills_mastered": [],
-                "skills_learning": [],
-                "skills_planned": [],
-                "interests": [],
-                "resources_count": 0,
-                "knowledge_points": 0,
-                "learning_days": 0,
-                "important_notes": [],
-                "current_focus": [],
-                "last_conversation": "N/A",
-                "created_date": "N/A",
+        now = time.monotonic()
+        with self._dirty_lock:
+            stale = {
+                name for name in fetchers
+                if name in self._dirty
+                or name not in self._fetched_at
+                or now - self._fetched_at[name] >= self.source_ttl
             }
+            # Invalidations arriving while we fetch are kept for next time
+            self._dirty -= stale
+
+        for name in stale:
+            try:
+                data = fetchers[name]()
+            except Exception as e:
+                # Keep the previous data (if any) and retry next time
+                logger.warning(f"Failed to fetch profile source '{name}': {e}")
+                with self._dirty_lock:
+                    self._dirty.add(name)
+                continue
+
+            self._sources[name] = data
+            self._fetched_at[name] = now
+            self._fingerprints[name] = hashlib.sha1(
+                json.dumps(data, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+            ).hexdigest()
+
+    def _render_sections(self) -> dict:
+        """Render template fields, reusing sections whose sources are unchanged"""
+        renderers = {
+            "preferences": self._render_preferences,
+            "skill_tree": self._render_skill_tree,
+            "interests": self._render_interests,
+            "stats": self._render_stats,
+            "current_focus": self._render_current_focus,
+        }
+
+        fields = {}
+        for section, render in renderers.items():
+            key = tuple(self._fingerprints.get(src) for src in SECTION_SOURCES[section])
+            cached = self._sections.get(section)
+            if cached is None or cached[0] != key:
+                cached = (key, render())
+                self._sections[section] = cached
+            fields.update(cached[1])
+
+        return fields
+
+    def _source(self, name: str):
+        return self._sources.get(name) or PROFILE_SOURCES[name]()
+
+    def _render_preferences(self) -> dict:
+        return {"preferences": self._format_preferences(self._source("preferences")[:5])}
+
+    def _render_skill_tree(self) -> dict:
+        # Categorize skills
+        skills_mastered = []
+        skills_learning = []
+        skills_planned = []
+
+        for fact in self._source("facts"):
+            content = fact.get("content", "")
+            if "擅长" in content or "熟练" in content:
+                skills_mastered.append(content)
+            elif "学习" in content or "正在学" in content:
+                skills_learning.append(content)
+            elif "计划" in content or "想学" in content:
+                skills_planned.append(content)
+
+        return {
+            "skills_mastered": self._format_skills(skills_mastered[:5]),
+            "skills_learning": self._format_skills(skills_learning[:3]),
+            "skills_planned": self._format_skills(skills_planned[:3]),
+        }
+
+    def _render_interests(self) -> dict:
+        interests = [
+            f for f in self._source("facts")
+            if "感兴趣" in f.get("content", "") or "喜欢" in f.get("content", "")
+        ]
+        return {"interest_areas": self._format_interests(interests[:5])}
+
+    def _render_stats(self) -> dict:
+        return {
+            "resources_count": self._source("user_profile").get("documents_count", 0),
+            "knowledge_points": len(self._source("facts")),
+            "learning_days": self._calculate_learning_days(),
+        }
+
+    def _render_current_focus(self) -> dict:
+        return {"current_focus": self._format_focus(self._get_current_focus())}
+
+    def _content_fingerprint(self, content: str) -> str:
+        """Hash of profile content, ignoring the last-updated timestamp"""
+        normalized = _LAST_UPDATED_RE.sub("", content)
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
 
     def _format_preferences(self, preferences: list) -> str:
         """Format preferences section"""
@@ -351,19 +482,14 @@ class UserProfile:
         return []
 
     def _get_current_focus(self) -> list:
-        """Get current learning focus"""
-        # TODO: Query recent learning topics
-        try:
-            episodes = self.memory.memory.get_episodes(self.user_id, limit=10)
-            # Extract topics from recent episodes
-            focus = []
-            for ep in episodes[:3]:
-                content = ep.get("content", "")
-                if "学习" in content:
-                    focus.append(content[:50] + "...")
-            return focus
-        except:
-            return []
+        """Get current learning focus from recent episodes"""
+        # Extract topics from recent episodes
+        focus = []
+        for ep in self._source("episodes")[:3]:
+            content = ep.get("content", "")
+            if "学习" in content:
+                focus.append(content[:50] + "...")
+        return focus
 
     def _get_last_conversation(self) -> str:
         """Get last conversation timestamp"""
@@ -377,3 +503,111 @@ class UserProfile:
             timestamp = self.profile_path.stat().st_ctime
             return datetime.datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
         return "N/A"
+
+
+class ProfileRefresher:
+    """Background worker that coalesces ECHO.md regenerations
+
+    Every trigger within ``window`` seconds of the first pending one for the
+    same user collapses into a single regeneration, run on a worker thread
+    so callers never wait for profile I/O.
+
+    Example:
+        >>> refresher = ProfileRefresher(window=5.0)
+        >>> refresher.schedule(profile, user_name="Alice")
+        >>> refresher.close()  # runs anything still pending
+    """
+
+    def __init__(self, window: float = 5.0):
+        self.window = window
+        # user_id -> (due time, profile, user_name, on_done)
+        self._pending: dict[str, tuple] = {}
+        self._running: set[str] = set()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def schedule(
+        self,
+        profile: UserProfile,
+        user_name: str = None,
+        on_done: Optional[Callable[[], None]] = None,
+    ):
+        """Request a profile regeneration
+
+        Args:
+            profile: Profile manager to regenerate
+            user_name: User display name
+            on_done: Called after the regeneration has been written
+        """
+        with self._cond:
+            if self._closed:
+                logger.debug("Profile refresher closed, regenerating inline")
+                self._regenerate(profile, user_name, on_done)
+                return
+
+            pending = self._pending.get(profile.user_id)
+            due = pending[0] if pending else time.monotonic() + self.window
+            self._pending[profile.user_id] = (due, profile, user_name, on_done)
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="echo-profile-refresh", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+
+    def flush(self):
+        """Run all pending regenerations now and wait for them to finish"""
+        with self._cond:
+            self._pending = {
+                user_id: (0.0, *rest) for user_id, (_, *rest) in self._pending.items()
+            }
+            self._cond.notify_all()
+            while self._pending or self._running:
+                if self._thread is None:
+                    break
+                self._cond.wait()
+
+    def close(self):
+        """Flush pending work and stop the worker"""
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed and not self._pending:
+                        return
+                    now = time.monotonic()
+                    due = [uid for uid, item in self._pending.items() if item[0] <= now]
+                    if due:
+                        break
+                    timeout = min((item[0] for item in self._pending.values()), default=None)
+                    self._cond.wait(None if timeout is None else timeout - now)
+
+                batch = [self._pending.pop(uid) for uid in due]
+                self._running.update(due)
+
+            for _, profile, user_name, on_done in batch:
+                self._regenerate(profile, user_name, on_done)
+
+            with self._cond:
+                self._running.difference_update(due)
+                self._cond.notify_all()
+
+    @metrics.timed("profile.refresh")
+    def _regenerate(self, profile: UserProfile, user_name: str, on_done):
+        try:
+            profile.update(user_name=user_name)
+            if on_done is not None:
+                on_done()
+            logger.info(f"Profile refreshed for user: {profile.user_id}")
+        except Exception as e:
+            logger.error(f"Failed to refresh profile for {profile.user_id}: {e}")
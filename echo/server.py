@@ -0,0 +1,230 @@
+"""HTTP server for Echo (`echo serve`, needs the `web` extra)"""
+
+from __future__ import annotations
+
+import inspect
+import json
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Optional
+
+from anthropic import AsyncAnthropic
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from echo.core import ChatResult
+from echo.async_agent import AsyncEchoAgent
+from echo.config import Settings, get_settings
+from echo.pool import AgentPool
+from echo.utils.llm import get_dispatcher
+from echo.utils.llm_cache import ResponseCache, SQLiteResponseCache
+
+logger = logging.getLogger(__name__)
+
+
+class ChatRequest(BaseModel):
+    message: str
+    stream: bool = False
+
+
+class LearnRequest(BaseModel):
+    topic: str
+    level: str = "beginner"
+    use_cache: bool = True
+    refresh: bool = False
+
+
+class ResourceRequest(BaseModel):
+    url: str
+    category: str = "learning"
+    tags: list[str] = []
+
+
+@dataclass
+class SharedClients:
+    """Backend clients shared by every pooled agent
+
+    One connection pool each to Claude and NeuroMemory, instead of one
+    per user.
+    """
+
+    claude: AsyncAnthropic
+    memory: Any
+    async_memory: Any = None
+    llm_cache: Optional[ResponseCache] = None
+
+    @classmethod
+    def connect(cls, settings: Settings) -> SharedClients:
+        from neuromemory_client import NeuroMemoryClient
+
+        from echo.async_agent import AsyncNeuroMemoryClient
+
+        async_memory = None
+        if AsyncNeuroMemoryClient is not None:
+            async_memory = AsyncNeuroMemoryClient(
+                api_key=settings.neuromemory_api_key,
+                base_url=settings.neuromemory_base_url,
+            )
+
+        llm_cache = None
+        if settings.llm_cache_enabled:
+            llm_cache = SQLiteResponseCache(
+                Path(settings.echo_data_dir).expanduser() / "cache" / "llm.sqlite3",
+                max_bytes=settings.llm_cache_max_mb * 1024 * 1024,
+                ttl=settings.llm_cache_ttl or None,
+            )
+
+        return cls(
+            claude=AsyncAnthropic(api_key=settings.anthropic_api_key, max_retries=0),
+            memory=NeuroMemoryClient(
+                api_key=settings.neuromemory_api_key,
+                base_url=settings.neuromemory_base_url,
+            ),
+            async_memory=async_memory,
+            llm_cache=llm_cache,
+        )
+
+    async def close(self):
+        await self.claude.close()
+        if self.async_memory is not None:
+            result = self.async_memory.close()
+            if inspect.isawaitable(result):
+                await result
+        self.memory.close()
+        if self.llm_cache is not None:
+            self.llm_cache.close()
+
+
+def create_app(
+    settings: Optional[Settings] = None,
+    clients: Optional[SharedClients] = None,
+) -> FastAPI:
+    """Build the FastAPI application
+
+    Args:
+        settings: Settings (default from environment)
+        clients: Shared backend clients (default: connect from settings;
+            injected clients are not closed on shutdown)
+
+    Example:
+        >>> uvicorn.run(create_app(), host="127.0.0.1", port=8000)
+    """
+    settings = settings or get_settings()
+    owns_clients = clients is None
+
+    async def create_agent(user_id: str) -> AsyncEchoAgent:
+        return AsyncEchoAgent(
+            user_id=user_id,
+            llm_cache=app.state.clients.llm_cache,
+            neuromemory_client=app.state.clients.memory,
+            async_neuromemory_client=app.state.clients.async_memory,
+            claude_client=app.state.clients.claude,
+        )
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        app.state.clients = clients or SharedClients.connect(settings)
+        app.state.pool = AgentPool(
+            create_agent,
+            max_agents=settings.server_max_agents,
+            idle_timeout=settings.server_idle_timeout,
+        )
+        app.state.pool.start()
+        try:
+            yield
+        finally:
+            await app.state.pool.close()
+            if owns_clients:
+                await app.state.clients.close()
+
+    app = FastAPI(title="Echo", lifespan=lifespan)
+
+    @app.get("/health")
+    async def health() -> dict:
+        return {"status": "ok", "pool": app.state.pool.stats(), "llm": get_dispatcher().stats()}
+
+    @app.post("/users/{user_id}/chat")
+    async def chat(user_id: str, request: ChatRequest):
+        pool: AgentPool = app.state.pool
+
+        if request.stream:
+            return StreamingResponse(
+                _chat_events(pool, user_id, request.message),
+                media_type="text/event-stream",
+            )
+
+        async with pool.lease(user_id, exclusive=True) as agent:
+            result = None
+            async for event in agent.chat_stream(request.message):
+                if isinstance(event, ChatResult):
+                    result = event
+            return _chat_result(result, agent.session_id)
+
+    @app.post("/users/{user_id}/sessions")
+    async def new_session(user_id: str) -> dict:
+        async with app.state.pool.lease(user_id, exclusive=True) as agent:
+            return {"session_id": agent.new_session()}
+
+    @app.post("/users/{user_id}/learn")
+    async def learn(user_id: str, request: LearnRequest) -> dict:
+        async with app.state.pool.lease(user_id) as agent:
+            graph = await agent.build_knowledge_graph(
+                request.topic, use_cache=request.use_cache, refresh=request.refresh
+            )
+            path = await agent.create_learning_path(request.topic, request.level)
+            return {"graph": graph, "path": path}
+
+    @app.post("/users/{user_id}/resources")
+    async def add_resource(user_id: str, request: ResourceRequest) -> dict:
+        async with app.state.pool.lease(user_id) as agent:
+            return await agent.add_resource(request.url, request.category, request.tags)
+
+    @app.get("/users/{user_id}/progress")
+    async def progress(user_id: str) -> dict:
+        async with app.state.pool.lease(user_id) as agent:
+            return await agent.get_learning_progress()
+
+    @app.get("/users/{user_id}/profile")
+    async def profile(user_id: str) -> dict:
+        async with app.state.pool.lease(user_id) as agent:
+            return {"path": agent.get_profile_path(), "content": agent.profile_content}
+
+    @app.post("/users/{user_id}/profile")
+    async def update_profile(user_id: str) -> dict:
+        async with app.state.pool.lease(user_id) as agent:
+            path = await agent.update_profile()
+            return {"path": path, "content": agent.profile_content, "updated": bool(path)}
+
+    return app
+
+
+async def _chat_events(pool: AgentPool, user_id: str, message: str) -> AsyncIterator[str]:
+    """Server-sent events: one ``delta`` per text chunk, then ``done``"""
+    async with pool.lease(user_id, exclusive=True) as agent:
+        async for event in agent.chat_stream(message):
+            if isinstance(event, ChatResult):
+                payload = _chat_result(event, agent.session_id)
+                yield f"event: done\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+            else:
+                yield f"event: delta\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+def _chat_result(result: Optional[ChatResult], session_id: str) -> dict:
+    if result is None:
+        return {
+            "text": "",
+            "usage": {},
+            "error": "no response",
+            "degraded": [],
+            "session_id": session_id,
+        }
+    return {
+        "text": result.text,
+        "usage": result.usage,
+        "error": result.error,
+        "degraded": result.degraded,
+        "session_id": session_id,
+    }
@@ -0,0 +1,178 @@
+"""Multi-turn chat sessions with token-budgeted history"""
+
+from __future__ import annotations
+
+import threading
+import uuid
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Optional
+
+from echo.utils.tokens import estimate_message_tokens, estimate_tokens
+
+# Longest excerpt of a turn kept by the local fallback summary
+_FALLBACK_EXCERPT = 60
+
+
+@dataclass
+class Turn:
+    """One user/assistant exchange"""
+
+    user: str
+    assistant: str
+
+    @cached_property
+    def tokens(self) -> int:
+        return sum(estimate_message_tokens(m) for m in self.messages())
+
+    def messages(self) -> list[dict]:
+        return [
+            {"role": "user", "content": self.user},
+            {"role": "assistant", "content": self.assistant},
+        ]
+
+
+class ChatSession:
+    """Conversation history for one chat session
+
+    Recent turns are kept verbatim; once they outgrow ``history_tokens``
+    the oldest ones are folded into a running summary, which is updated
+    incrementally (old summary + folded turns -> new summary). Requests are
+    assembled from the summary plus as many recent turns as fit the budget,
+    so the prompt size stays flat however long the session runs.
+
+    Folding is split into overflow() and fold() so the summary can be
+    produced by a sync or async LLM call outside the session lock; until a
+    fold lands, messages() simply drops the oldest turns that don't fit.
+
+    Example:
+        >>> session = ChatSession(history_tokens=2000)
+        >>> session.record("什么是所有权？", "所有权是 Rust 的……")
+        >>> session.messages()
+        [{'role': 'user', 'content': '什么是所有权？'}, {'role': 'assistant', ...}]
+    """
+
+    def __init__(
+        self,
+        session_id: Optional[str] = None,
+        history_tokens: int = 3000,
+        summary_tokens: int = 500,
+        keep_turns: int = 2,
+    ):
+        """Initialize a session
+
+        Args:
+            session_id: Session identifier (random if omitted)
+            history_tokens: Token budget for summary plus verbatim turns
+            summary_tokens: Target length of the rolling summary
+            keep_turns: Most recent turns that are never folded
+        """
+        self.session_id = session_id or uuid.uuid4().hex
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.keep_turns = keep_turns
+
+        self.summary = ""
+        self.turns: list[Turn] = []
+        self.folded_turns = 0  # Turns already rolled into the summary
+        self._lock = threading.Lock()
+        self._folding = False
+
+    def record(self, user_message: str, assistant_response: str):
+        """Append a completed turn"""
+        with self._lock:
+            self.turns.append(Turn(user_message, assistant_response))
+
+    def messages(self, budget: Optional[int] = None) -> list[dict]:
+        """Verbatim history that fits the budget, oldest first
+
+        Args:
+            budget: Token budget for the history messages (defaults to
+                ``history_tokens`` minus the summary)
+
+        Returns:
+            Alternating user/assistant messages
+        """
+        with self._lock:
+            if budget is None:
+                budget = self.history_tokens - estimate_tokens(self.summary)
+
+            kept: list[Turn] = []
+            used = 0
+            for turn in reversed(self.turns):
+                used += turn.tokens
+                if used > budget:
+                    break
+                kept.append(turn)
+
+        return [message for turn in reversed(kept) for message in turn.messages()]
+
+    def overflow(self) -> list[Turn]:
+        """Oldest turns that should be folded into the summary
+
+        Folding starts once the verbatim turns exceed the budget and
+        continues down to half of it, so the summary is not rewritten on
+        every turn. Returns [] when nothing needs folding or a fold is
+        already in progress; otherwise the caller must call fold() (or
+        cancel_fold()) with the result.
+        """
+        with self._lock:
+            if self._folding:
+                return []
+
+            budget = self.history_tokens - estimate_tokens(self.summary)
+            sizes = [turn.tokens for turn in self.turns]
+            total = sum(sizes)
+            if total <= budget:
+                return []
+
+            count = 0
+            foldable = len(self.turns) - self.keep_turns
+            while count < foldable and total > budget // 2:
+                total -= sizes[count]
+                count += 1
+
+            if count == 0:
+                return []
+            self._folding = True
+            return self.turns[:count]
+
+    def fold(self, turns: list[Turn], summary: str):
+        """Replace ``turns`` (a prefix returned by overflow()) with a summary"""
+        with self._lock:
+            self._folding = False
+            if any(a is not b for a, b in zip(self.turns, turns)) or len(self.turns) < len(turns):
+                # Session was reset while the summary was being produced
+                return
+            del self.turns[:len(turns)]
+            self.folded_turns += len(turns)
+            self.summary = summary.strip()
+
+    def cancel_fold(self):
+        """Abandon a fold started by overflow()"""
+        with self._lock:
+            self._folding = False
+
+    def fallback_summary(self, turns: list[Turn]) -> str:
+        """Local summary used when the model is unavailable
+
+        Appends a short excerpt of each folded question, trimming the oldest
+        lines to stay within ``summary_tokens``.
+        """
+        lines = self.summary.splitlines() if self.summary else []
+        for turn in turns:
+            question = " ".join(turn.user.split())[:_FALLBACK_EXCERPT]
+            lines.append(f"- 用户问过：{question}")
+
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > self.summary_tokens:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    def reset(self, session_id: Optional[str] = None):
+        """Start a new session, discarding history"""
+        with self._lock:
+            self.session_id = session_id or uuid.uuid4().hex
+            self.summary = ""
+            self.turns = []
+            self.folded_turns = 0
+            self._folding = False
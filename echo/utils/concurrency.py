@@ -0,0 +1,254 @@
+"""Concurrency helpers for Echo agent"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import inspect
+import logging
+import threading
+import time
+from concurrent.futures import Executor
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+def fan_out(
+    executor: Executor,
+    sources: dict[str, tuple[Callable[[], Any], float]],
+    executors: Optional[dict[str, Executor]] = None,
+) -> tuple[dict[str, Any], list[str]]:
+    """Run independent sources concurrently, each bounded by its own deadline
+
+    All sources are submitted at once, so the total wait is the slowest
+    source (capped by its deadline) rather than the sum of all of them.
+
+    Args:
+        executor: Executor to run the sources on
+        sources: Mapping of name -> (callable, timeout in seconds)
+        executors: Per-source executor overrides, e.g. to keep fast local
+            sources off a pool that slow remote ones may saturate
+
+    Returns:
+        (results, missed) where results maps name -> value for every source
+        that finished in time, and missed lists the names that timed out
+        or raised.
+
+    Example:
+        >>> results, missed = fan_out(pool, {
+        ...     "search": (lambda: client.search(q), 2.0),
+        ...     "prefs": (lambda: client.get_preferences(uid), 1.0),
+        ... })
+    """
+    start = time.monotonic()
+    # Run each source in a copy of the caller's context, so metric spans
+    # attribute backend calls made on pool threads to the calling command
+    executors = executors or {}
+    futures = {
+        name: executors.get(name, executor).submit(contextvars.copy_context().run, fn)
+        for name, (fn, _) in sources.items()
+    }
+
+    results: dict[str, Any] = {}
+    missed: list[str] = []
+
+    for name, future in futures.items():
+        deadline = start + sources[name][1]
+        try:
+            results[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            future.cancel()
+            logger.warning(f"Source '{name}' missed its {sources[name][1]:.2f}s deadline")
+            missed.append(name)
+        except Exception as e:
+            logger.warning(f"Source '{name}' failed: {e}")
+            missed.append(name)
+
+    return results, missed
+
+
+async def afan_out(
+    sources: dict[str, tuple[Callable[[], Any], float]],
+) -> tuple[dict[str, Any], list[str]]:
+    """Asyncio counterpart of fan_out
+
+    Each callable may return an awaitable or a plain value; awaitables are
+    awaited concurrently, each under its own timeout.
+
+    Args:
+        sources: Mapping of name -> (callable, timeout in seconds)
+
+    Returns:
+        (results, missed), with the same meaning as fan_out
+    """
+
+    async def run(fn: Callable[[], Any]) -> Any:
+        value = fn()
+        if inspect.isawaitable(value):
+            value = await value
+        return value
+
+    names = list(sources)
+    outcomes = await asyncio.gather(
+        *(asyncio.wait_for(run(sources[name][0]), sources[name][1]) for name in names),
+        return_exceptions=True,
+    )
+
+    results: dict[str, Any] = {}
+    missed: list[str] = []
+
+    for name, outcome in zip(names, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            logger.warning(f"Source '{name}' missed its {sources[name][1]:.2f}s deadline")
+            missed.append(name)
+        elif isinstance(outcome, Exception):
+            logger.warning(f"Source '{name}' failed: {outcome}")
+            missed.append(name)
+        else:
+            results[name] = outcome
+
+    return results, missed
+
+
+class HostLimiter:
+    """Per-host politeness limits for outbound fetches
+
+    Caps concurrent requests to the same host and spaces request starts to
+    that host by at least ``min_interval`` seconds.
+
+    Example:
+        >>> limiter = HostLimiter(per_host=2, min_interval=0.5)
+        >>> with limiter.slot("https://example.com/a"):
+        ...     fetch("https://example.com/a")
+    """
+
+    def __init__(self, per_host: int = 2, min_interval: float = 0.0):
+        self.per_host = per_host
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._semaphores: dict[str, threading.Semaphore] = {}
+        self._next_start: dict[str, float] = {}
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[None]:
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.Semaphore(self.per_host))
+
+        with semaphore:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, now))
+                self._next_start[host] = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+
+class Deadline:
+    """End-to-end time budget for one request, shared out across its stages
+
+    Example:
+        >>> deadline = Deadline(10.0)
+        >>> search_timeout = deadline.budget(3.0, share=0.25)  # <= 2.5s
+        >>> deadline.remaining()
+    """
+
+    def __init__(self, seconds: float):
+        """Initialize deadline (seconds <= 0 means no deadline)"""
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds if seconds > 0 else None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (never negative), or None without a deadline"""
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.monotonic())
+
+    def budget(self, cap: float, share: float = 1.0) -> float:
+        """Time a stage may take: at most ``cap`` and ``share`` of what is left"""
+        remaining = self.remaining()
+        if remaining is None:
+            return cap
+        return min(cap, remaining * share)
+
+
+class CircuitBreaker:
+    """Skip a failing backend for a cool-down period
+
+    Opens after ``failure_threshold`` consecutive failures. While open,
+    allow() is False until ``cooldown`` seconds have passed; then a single
+    trial call is let through (half-open). Its success closes the circuit,
+    its failure opens it for another cool-down.
+
+    Example:
+        >>> breaker = circuit_breaker("neuromemory")
+        >>> if breaker.allow():
+        ...     try:
+        ...         result = client.search(q)
+        ...         breaker.record(True)
+        ...     except Exception:
+        ...         breaker.record(False)
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._trial or time.monotonic() - self._opened_at >= self.cooldown:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may go to the backend now"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            self._trial = True
+            return True
+
+    def record(self, success: bool):
+        """Report the outcome of an allowed call"""
+        with self._lock:
+            if success:
+                if self._opened_at is not None:
+                    logger.info(f"Circuit for {self.name} closed")
+                self._failures = 0
+                self._opened_at = None
+            else:
+                self._failures += 1
+                if self._trial or self._failures >= self.failure_threshold:
+                    if self._opened_at is None or self._trial:
+                        logger.warning(f"Circuit for {self.name} opened for {self.cooldown}s")
+                    self._opened_at = time.monotonic()
+            self._trial = False
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def circuit_breaker(
+    name: str, failure_threshold: int = 5, cooldown: float = 30.0
+) -> CircuitBreaker:
+    """Process-wide breaker for a backend (created on first request)"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, failure_threshold, cooldown)
+        return _breakers[name]
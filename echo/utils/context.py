@@ -0,0 +1,193 @@
+"""Relevance-ranked, token-budgeted context assembly"""
+
+from __future__ import annotations
+
+import math
+import re
+import time
+import unicodedata
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Optional
+
+from echo.utils.tokens import estimate_tokens
+
+# Section order and headings in the rendered prompt
+SECTIONS = {
+    "relevant_memories": "用户的相关背景信息：",
+    "preferences": "用户偏好：",
+    "related_concepts": "知识图谱中的相关概念：",
+}
+
+# How much each kind of memory is worth per unit of relevance
+TYPE_WEIGHTS = {
+    "preference": 1.0,
+    "fact": 1.0,
+    "document": 0.9,
+    "episodic": 0.8,
+    "concept": 0.7,
+}
+
+# Memories lose half their weight every this many days
+RECENCY_HALF_LIFE_DAYS = 30.0
+
+# Search hits below this relevance are dropped outright
+MIN_RELEVANCE = 0.3
+
+# Candidates scoring below this after weighting (e.g. long-stale facts) are dropped
+MIN_SCORE = 0.05
+
+# Character-bigram Jaccard similarity above which two items are duplicates
+DUPLICATE_SIMILARITY = 0.8
+
+_PUNCT_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+
+@dataclass
+class ContextItem:
+    """One candidate line of context"""
+
+    section: str
+    text: str
+    score: float
+    tokens: int = 0
+
+    def __post_init__(self):
+        self.tokens = estimate_tokens(self.text) + 1
+
+
+def assemble_context(context: dict, budget: int, now: Optional[float] = None) -> list[ContextItem]:
+    """Pick the most useful context items that fit a token budget
+
+    Candidates are scored by search relevance, memory type and recency;
+    near-duplicates keep only their best-scoring copy; the rest are packed
+    greedily by score until the budget is spent.
+
+    Args:
+        context: Retrieved context (relevant_memories, preferences,
+            related_concepts)
+        budget: Token budget for the context lines, headings included
+        now: Reference time for recency (defaults to the current time)
+
+    Returns:
+        Selected items, best first
+
+    Example:
+        >>> items = assemble_context({"relevant_memories": hits}, budget=600)
+        >>> [item.text for item in items]
+        ['在用 Python 做数据分析', ...]
+    """
+    now = time.time() if now is None else now
+    candidates = sorted(_candidates(context, now), key=lambda item: item.score, reverse=True)
+
+    selected: list[ContextItem] = []
+    shingles: list[set[str]] = []
+    sections: set[str] = set()
+    remaining = budget
+
+    for item in candidates:
+        if item.score < MIN_SCORE:
+            break
+
+        item_shingles = _shingles(item.text)
+        if any(_jaccard(item_shingles, seen) >= DUPLICATE_SIMILARITY for seen in shingles):
+            continue
+
+        cost = item.tokens
+        if item.section not in sections:
+            cost += estimate_tokens(SECTIONS[item.section]) + 1
+        if cost > remaining:
+            continue
+
+        remaining -= cost
+        selected.append(item)
+        shingles.append(item_shingles)
+        sections.add(item.section)
+
+    return selected
+
+
+def render_context(items: list[ContextItem]) -> str:
+    """Render selected items grouped under their section headings"""
+    parts = []
+    for section, heading in SECTIONS.items():
+        lines = [f"- {item.text}" for item in items if item.section == section]
+        if lines:
+            parts.append("\n".join([heading, *lines]))
+    return "\n\n".join(parts)
+
+
+def _candidates(context: dict, now: float) -> list[ContextItem]:
+    items = []
+
+    memories = context.get("relevant_memories") or []
+    for rank, mem in enumerate(memories):
+        content = mem.get("content") if isinstance(mem, dict) else None
+        if not content:
+            continue
+        relevance = _relevance(mem, rank, len(memories))
+        if relevance < MIN_RELEVANCE:
+            continue
+        weight = TYPE_WEIGHTS.get(mem.get("memory_type"), 0.8)
+        score = relevance * weight * _recency(mem, now)
+        items.append(ContextItem("relevant_memories", content, score))
+
+    for pref in context.get("preferences") or []:
+        if not isinstance(pref, dict) or not pref.get("key"):
+            continue
+        score = TYPE_WEIGHTS["preference"] * 0.6 * _recency(pref, now)
+        items.append(ContextItem("preferences", f"{pref['key']}: {pref.get('value', '')}", score))
+
+    for rank, related in enumerate(context.get("related_concepts") or []):
+        if not isinstance(related, dict) or not related.get("concept"):
+            continue
+        # Concepts are matched by name, so earlier (longer) matches rank higher
+        score = TYPE_WEIGHTS["concept"] * (0.9 - 0.1 * rank)
+        text = f"{related['concept']}: {', '.join(related.get('neighbors') or [])}"
+        items.append(ContextItem("related_concepts", text, score))
+
+    return items
+
+
+def _relevance(mem: dict, rank: int, count: int) -> float:
+    """Search score if the backend reports one, else derived from rank"""
+    for key in ("score", "similarity", "relevance"):
+        value = mem.get(key)
+        if isinstance(value, (int, float)):
+            return float(value)
+    return 1.0 - 0.5 * rank / max(count, 1)
+
+
+def _recency(item: dict, now: float) -> float:
+    """Exponential decay by age; items without a timestamp are not penalized"""
+    timestamp = _timestamp(item.get("updated_at") or item.get("created_at"))
+    if timestamp is None:
+        return 1.0
+    age_days = max(0.0, now - timestamp) / 86400
+    return math.pow(0.5, age_days / RECENCY_HALF_LIFE_DAYS)
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+def _shingles(text: str) -> set[str]:
+    normalized = _PUNCT_RE.sub("", unicodedata.normalize("NFKC", text).casefold())
+    if len(normalized) < 2:
+        return {normalized}
+    return {normalized[i:i + 2] for i in range(len(normalized) - 1)}
+
+
+def _jaccard(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
@@ -0,0 +1,58 @@
+"""Settings lookup for fast paths that must not load pydantic-settings"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Optional
+
+
+def read_setting(name: str, default: str, env_file: str = ".env") -> str:
+    """One plain string setting, resolved the way Settings resolves it
+
+    The environment wins over the env file, and names match
+    case-insensitively (Settings is case_sensitive=False). Only for values
+    that need no validation, e.g. the data dir for `echo profile --path`;
+    everything else goes through echo.config.get_settings().
+
+    Args:
+        name: Setting name (e.g. "echo_data_dir")
+        default: Value when neither source sets it
+        env_file: Env file read after the environment
+
+    Returns:
+        The setting's raw string value
+    """
+    key = name.lower()
+    for env_name, value in os.environ.items():
+        if env_name.lower() == key:
+            return value
+    value = _read_env_file(Path(env_file), key)
+    return default if value is None else value
+
+
+def _read_env_file(path: Path, key: str) -> Optional[str]:
+    """Last assignment of key in a dotenv file (KEY=value, optional quotes)"""
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return None
+
+    found = None
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        name, _, value = line.partition("=")
+        name = name.strip()
+        if name.startswith("export "):
+            name = name[len("export "):].strip()
+        if name.lower() != key:
+            continue
+        value = value.strip()
+        if value[:1] in ("'", '"') and value[-1:] == value[:1] and len(value) > 1:
+            value = value[1:-1]
+        else:
+            value = value.split(" #", 1)[0].rstrip()
+        found = value
+    return found
@@ -0,0 +1,90 @@
+"""Keyword-based learning intent detection"""
+
+from __future__ import annotations
+
+import re
+from typing import Optional
+
+# Keywords that indicate learning intent
+LEARNING_KEYWORDS = ("学习", "想学", "教我", "了解", "掌握", "提升")
+
+# Words between the keyword and the topic ("我想学习一下 Rust")
+_LEADING_FILLERS = ("一下", "一些", "一点", "关于", "有关", "下")
+
+# Particles and filler after the topic ("教我 Rust 吧", "不学 Python 了")
+_TRAILING = "了吧呢吗啊呀的 \t"
+
+_CLAUSE_BREAK = re.compile(r"[，。？！、；：,.?!;:\n]")
+
+# Negation right before the keyword ("不想学习", "不用了解", "没掌握")
+_NEGATION = re.compile(r"(?:不|没|别|无需|不必)(?:想|要|用|需要|必|再|太|有)?\s*$")
+
+# A keyword followed by 了 reports something done ("我了解了"), not a wish
+_PERFECTIVE = "了"
+
+# Openings of clauses that are not topics: pronouns and questions ("你是谁"),
+# degree adverbs before a complaint ("好累", "太难了")
+_NON_TOPIC_PREFIXES = (
+    "你", "我", "他", "她", "它", "谁", "什么", "怎么", "为什么", "哪",
+    "好", "很", "太", "真", "挺", "有点",
+)
+
+# Whole clauses that name no topic
+_STOP_TOPICS = {
+    "这个", "那个", "这些", "那些", "东西", "知识", "更多", "一切", "所有", "新东西", "自己",
+}
+
+# Longer phrases are not topics but whole requests
+MAX_TOPIC_CHARS = 30
+
+
+def extract_learning_topic(message: str) -> Optional[str]:
+    """Topic a learning request is about
+
+    Takes the clause following the first learning keyword, with overlapping
+    keywords merged ("想学" + "学习" in "我想学习") and filler stripped.
+    Negated ("我不想学习 Python 了") and completed ("我了解了") statements
+    have no topic, nor do clauses that are pronouns, questions, complaints
+    or punctuation. Single-letter names such as C and R are topics.
+
+    Returns:
+        The topic, or None when the message has no learning intent or no
+        usable topic
+
+    Example:
+        >>> extract_learning_topic("我想学习一下 Rust 编程语言，有什么建议？")
+        'Rust 编程语言'
+    """
+    matches = sorted(
+        (m.start(), m.end())
+        for kw in LEARNING_KEYWORDS
+        for m in re.finditer(re.escape(kw), message)
+    )
+    if not matches:
+        return None
+
+    start, end = matches[0]
+    for s, e in matches[1:]:
+        if s > end:
+            break
+        end = max(end, e)
+
+    if _NEGATION.search(message[:start]) or message[end:].startswith(_PERFECTIVE):
+        return None
+
+    topic = _CLAUSE_BREAK.split(message[end:], maxsplit=1)[0].strip()
+    stripped = True
+    while stripped:
+        stripped = False
+        for filler in _LEADING_FILLERS:
+            if topic.startswith(filler):
+                topic = topic[len(filler):].lstrip()
+                stripped = True
+    topic = topic.rstrip(_TRAILING)
+
+    # Any letter, digit or CJK character makes a name, so C and R count
+    if not any(ch.isalnum() for ch in topic) or len(topic) > MAX_TOPIC_CHARS:
+        return None
+    if topic in _STOP_TOPICS or topic.startswith(_NON_TOPIC_PREFIXES):
+        return None
+    return topic
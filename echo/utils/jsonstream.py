@@ -0,0 +1,137 @@
+"""Incremental JSON parsing for streamed structured output"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Optional
+
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+class ArrayItemStreamer:
+    """Emit the elements of top-level arrays as soon as each one closes
+
+    Feed it the partial JSON of an object such as
+    ``{"concepts": [{...}, {...}], "relationships": [...]}`` in arbitrary
+    chunks. Every completed element of an array under one of ``keys`` is
+    returned from feed() as ``(key, value, raw)``; ``value`` is None when
+    the element's text is not valid JSON, so the caller can repair just
+    that fragment.
+
+    Example:
+        >>> streamer = ArrayItemStreamer(("concepts",))
+        >>> streamer.feed('{"concepts": [{"name": "所有')
+        []
+        >>> streamer.feed('权"}, {"na')
+        [('concepts', {'name': '所有权'}, '{"name": "所有权"}')]
+    """
+
+    def __init__(self, keys: tuple[str, ...]):
+        self.keys = keys
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string: list[str] = []  # current string literal at depth 1
+        self._last_string: Optional[str] = None
+        self._array_key: Optional[str] = None
+        self._item: Optional[list[str]] = None  # text of the element being captured
+        self._item_is_string = False
+
+    def feed(self, chunk: str) -> list[tuple[str, Any, str]]:
+        """Consume a chunk and return the elements it completed"""
+        done = []
+
+        for c in chunk:
+            if self._item is not None:
+                self._item.append(c)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = "".join(self._string)
+                    elif self._item_is_string and self._depth == 2:
+                        done.append(self._finish_item())
+                elif self._depth == 1:
+                    self._string.append(c)
+                continue
+
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._string = []
+                elif self._depth == 2 and self._array_key and self._item is None:
+                    self._item = [c]
+                    self._item_is_string = True
+            elif c in "{[":
+                if self._depth == 2 and self._array_key and self._item is None:
+                    self._item = [c]
+                    self._item_is_string = False
+                self._depth += 1
+                if c == "[" and self._depth == 2 and self._last_string in self.keys:
+                    self._array_key = self._last_string
+            elif c in "}]":
+                self._depth -= 1
+                if self._item is not None and self._depth == 2:
+                    done.append(self._finish_item())
+                if self._depth == 1:
+                    self._array_key = None
+                    self._item = None
+
+        return done
+
+    def pending(self) -> Optional[tuple[str, str]]:
+        """(key, raw text) of an element that started but never closed"""
+        if self._item is None or self._array_key is None:
+            return None
+        return self._array_key, "".join(self._item)
+
+    def _finish_item(self) -> tuple[str, Any, str]:
+        raw = "".join(self._item)
+        self._item = None
+        return self._array_key, loads_lenient(raw), raw
+
+
+def loads_lenient(text: str) -> Optional[Any]:
+    """Parse JSON, tolerating trailing commas and unclosed brackets
+
+    Returns:
+        Parsed value, or None if the text cannot be repaired locally
+    """
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    repaired = _TRAILING_COMMA_RE.sub(r"\1", text.strip())
+
+    # Close brackets left open by a truncated fragment
+    stack = []
+    in_string = escape = False
+    for c in repaired:
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in "{[":
+            stack.append("}" if c == "{" else "]")
+        elif c in "}]" and stack:
+            stack.pop()
+    if in_string:
+        repaired += '"'
+    repaired = _TRAILING_COMMA_RE.sub(r"\1", repaired + "".join(reversed(stack)))
+
+    try:
+        return json.loads(repaired)
+    except ValueError:
+        return None
@@ -0,0 +1,652 @@
+"""Shared dispatcher for Claude calls: rate limits, priorities, fair queueing"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from echo import metrics
+from echo.utils.tokens import estimate_request_tokens
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, served strictly in this order
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+# Responses worth retrying; 429 and 529 also pause all dispatching, since
+# they describe the account or the API rather than this one request
+RETRYABLE_STATUS = {429, 500, 502, 503, 504, 529}
+PAUSE_STATUS = {429, 529}
+
+# Longest backoff between retries (seconds)
+MAX_BACKOFF = 60.0
+
+# Models per task unless overridden by the llm_models setting. Structured,
+# mechanical tasks go to the small low-latency model; anything not listed
+# (including chat) uses llm_default_model.
+SMALL_MODEL = "claude-haiku-4-5"
+DEFAULT_MODELS = {
+    "knowledge_graph": SMALL_MODEL,
+    "graph_repair": SMALL_MODEL,
+    "session_summary": SMALL_MODEL,
+    "intent": SMALL_MODEL,
+    "review_questions": SMALL_MODEL,
+    "resource_summary": SMALL_MODEL,
+}
+
+
+class LLMBusyError(RuntimeError):
+    """The dispatcher's queue is full, or a call waited too long for admission"""
+
+
+class TokenBucket:
+    """Per-minute budget refilled continuously
+
+    The level may go negative when actual usage exceeds what was reserved;
+    admission then waits until the debt is repaid.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` is available (0 if it is now)"""
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= amount
+
+
+class _Waiter:
+    """A queued call; doubles as the admission ticket once granted"""
+
+    __slots__ = ("user_id", "priority", "cost", "granted", "queued_at", "event", "loop", "future")
+
+    def __init__(self, user_id: str, priority: int, cost: int, loop=None):
+        self.user_id = user_id
+        self.priority = priority
+        self.cost = cost
+        self.granted = False
+        self.queued_at = time.monotonic()
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+
+    def grant(self):
+        self.granted = True
+        if self.future is not None:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+        else:
+            self.event.set()
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class _TrackedStream:
+    """Stream proxy that remembers the final message"""
+
+    def __init__(self, stream: Any):
+        self._stream = stream
+        self.message = None
+
+    @property
+    def usage(self) -> Any:
+        """Usage of the final message, or of the snapshot so far
+
+        A stream closed before get_final_message() still reports the input
+        tokens from ``message_start`` and the output streamed until then;
+        None if no event arrived.
+        """
+        message = self.message
+        if message is None:
+            try:
+                message = self._stream.current_message_snapshot
+            except (AssertionError, AttributeError):  # no event yet
+                return None
+        return getattr(message, "usage", None)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+    def __iter__(self):
+        return iter(self._stream)
+
+    def get_final_message(self):
+        self.message = self._stream.get_final_message()
+        return self.message
+
+
+class _AsyncTrackedStream(_TrackedStream):
+    def __aiter__(self):
+        return self._stream.__aiter__()
+
+    async def get_final_message(self):
+        self.message = await self._stream.get_final_message()
+        return self.message
+
+
+class LLMDispatcher:
+    """Admission control shared by every Claude call in the process
+
+    Calls are queued per priority class and, within a class, per user;
+    users take turns, so one user's bulk work cannot starve another's.
+    Interactive calls are always admitted before background ones, and
+    background calls leave ``background_reserve`` of each rate limit free
+    so a chat turn arriving during a graph build does not wait for refill.
+
+    Limits are token buckets over requests, input tokens (estimated before
+    the call, corrected from the reported usage afterwards) and output
+    tokens (charged after the call). 429/5xx responses are retried with
+    the server's retry-after; 429 and 529 pause all dispatching for that
+    long. Create SDK clients with ``max_retries=0`` so retries happen here.
+
+    Each call runs in an ``llm.<task>`` metrics span tagged with the model,
+    which also receives the call's token usage.
+
+    Example:
+        >>> llm = get_dispatcher()
+        >>> response = llm.create(claude, request, user_id="alice", task="session_summary")
+        >>> with llm.stream(claude, request, "alice", INTERACTIVE, task="chat") as stream:
+        ...     for text in stream.text_stream:
+        ...         print(text, end="")
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = 0,
+        input_tokens_per_minute: int = 0,
+        output_tokens_per_minute: int = 0,
+        max_concurrency: int = 16,
+        max_queue: int = 256,
+        background_reserve: float = 0.2,
+        max_retries: int = 3,
+        interactive_timeout: Optional[float] = 30.0,
+        background_timeout: Optional[float] = 300.0,
+    ):
+        """Initialize dispatcher
+
+        Args:
+            requests_per_minute: Request limit (0 = unlimited)
+            input_tokens_per_minute: Input token limit (0 = unlimited)
+            output_tokens_per_minute: Output token limit (0 = unlimited)
+            max_concurrency: Calls in flight at once
+            max_queue: Queued calls per priority class before new ones are
+                rejected with LLMBusyError
+            background_reserve: Share of each limit background calls
+                leave for interactive ones
+            max_retries: Retries of retryable failures
+            interactive_timeout: Max seconds an interactive call waits for
+                admission (None = forever)
+            background_timeout: Same for background calls
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.background_reserve = background_reserve
+        self.max_retries = max_retries
+        self.timeouts = {INTERACTIVE: interactive_timeout, BACKGROUND: background_timeout}
+
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._input = TokenBucket(input_tokens_per_minute) if input_tokens_per_minute else None
+        self._output = TokenBucket(output_tokens_per_minute) if output_tokens_per_minute else None
+
+        self._cond = threading.Condition()
+        # priority -> user_id -> waiters; dict order is the round-robin order
+        self._queues: dict[int, OrderedDict[str, deque[_Waiter]]] = {
+            priority: OrderedDict() for priority in PRIORITY_NAMES
+        }
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._granted = {priority: 0 for priority in PRIORITY_NAMES}
+        self._rejected = 0
+        self._thread: Optional[threading.Thread] = None
+
+    # ========== Calls ==========
+
+    def create(
+        self,
+        client: Any,
+        request: dict,
+        user_id: str,
+        priority: int = BACKGROUND,
+        timeout: Optional[float] = None,
+        task: str = "",
+    ) -> Any:
+        """``client.messages.create(**request)`` under admission control"""
+        cost = estimate_request_tokens(request)
+        give_up = self._give_up_at(priority, timeout)
+        with _task_span(task, request):
+            for attempt in range(self.max_retries + 1):
+                ticket = self.acquire(user_id, priority, cost, _remaining(give_up))
+                try:
+                    response = client.messages.create(**request)
+                except Exception as e:
+                    self.release(ticket)
+                    delay = self._retry_delay(e, attempt, give_up)
+                    if delay is None:
+                        raise
+                    if delay:
+                        time.sleep(delay)
+                    continue
+                except BaseException:
+                    self.release(ticket)
+                    raise
+                self.release(ticket, getattr(response, "usage", None))
+                metrics.record_usage(response, task)
+                return response
+
+    @contextmanager
+    def stream(
+        self,
+        client: Any,
+        request: dict,
+        user_id: str,
+        priority: int = BACKGROUND,
+        timeout: Optional[float] = None,
+        task: str = "",
+    ) -> Iterator[Any]:
+        """``client.messages.stream(**request)`` under admission control
+
+        The admission slot is held until the stream is closed. Only
+        failures to open the stream are retried. Once the stream is open
+        the request counts as spent, even if it is abandoned before the
+        final message.
+        """
+        cost = estimate_request_tokens(request)
+        give_up = self._give_up_at(priority, timeout)
+        with _task_span(task, request):
+            for attempt in range(self.max_retries + 1):
+                ticket = self.acquire(user_id, priority, cost, _remaining(give_up))
+                try:
+                    manager = client.messages.stream(**request)
+                    stream = _TrackedStream(manager.__enter__())
+                    break
+                except Exception as e:
+                    self.release(ticket)
+                    delay = self._retry_delay(e, attempt, give_up)
+                    if delay is None:
+                        raise
+                    if delay:
+                        time.sleep(delay)
+                except BaseException:
+                    self.release(ticket)
+                    raise
+
+            try:
+                yield stream
+            finally:
+                manager.__exit__(None, None, None)
+                self.release(ticket, stream.usage, spent=True)
+                if stream.message is not None:
+                    metrics.record_usage(stream.message, task)
+
+    async def acreate(
+        self,
+        client: Any,
+        request: dict,
+        user_id: str,
+        priority: int = BACKGROUND,
+        timeout: Optional[float] = None,
+        task: str = "",
+    ) -> Any:
+        """Async create() for AsyncAnthropic clients"""
+        cost = estimate_request_tokens(request)
+        give_up = self._give_up_at(priority, timeout)
+        with _task_span(task, request):
+            for attempt in range(self.max_retries + 1):
+                ticket = await self.aacquire(user_id, priority, cost, _remaining(give_up))
+                try:
+                    response = await client.messages.create(**request)
+                except Exception as e:
+                    self.release(ticket)
+                    delay = self._retry_delay(e, attempt, give_up)
+                    if delay is None:
+                        raise
+                    if delay:
+                        await asyncio.sleep(delay)
+                    continue
+                except BaseException:  # cancelled while the call ran
+                    self.release(ticket)
+                    raise
+                self.release(ticket, getattr(response, "usage", None))
+                metrics.record_usage(response, task)
+                return response
+
+    @asynccontextmanager
+    async def astream(
+        self,
+        client: Any,
+        request: dict,
+        user_id: str,
+        priority: int = BACKGROUND,
+        timeout: Optional[float] = None,
+        task: str = "",
+    ) -> AsyncIterator[Any]:
+        """Async stream() for AsyncAnthropic clients"""
+        cost = estimate_request_tokens(request)
+        give_up = self._give_up_at(priority, timeout)
+        with _task_span(task, request):
+            for attempt in range(self.max_retries + 1):
+                ticket = await self.aacquire(user_id, priority, cost, _remaining(give_up))
+                try:
+                    manager = client.messages.stream(**request)
+                    stream = _AsyncTrackedStream(await manager.__aenter__())
+                    break
+                except Exception as e:
+                    self.release(ticket)
+                    delay = self._retry_delay(e, attempt, give_up)
+                    if delay is None:
+                        raise
+                    if delay:
+                        await asyncio.sleep(delay)
+                except BaseException:  # cancelled while opening
+                    self.release(ticket)
+                    raise
+
+            try:
+                yield stream
+            finally:
+                await manager.__aexit__(None, None, None)
+                self.release(ticket, stream.usage, spent=True)
+                if stream.message is not None:
+                    metrics.record_usage(stream.message, task)
+
+    # ========== Admission ==========
+
+    def acquire(
+        self,
+        user_id: str,
+        priority: int = BACKGROUND,
+        cost: int = 0,
+        timeout: Optional[float] = None,
+    ) -> _Waiter:
+        """Wait for admission; pair with release()
+
+        Args:
+            user_id: User the call is made for (fair-queueing key)
+            priority: INTERACTIVE or BACKGROUND
+            cost: Estimated input tokens
+            timeout: Max wait, overriding the priority class default
+
+        Raises:
+            LLMBusyError: Queue full or admission timed out
+        """
+        timeout = self.timeouts[priority] if timeout is None else timeout
+        waiter = self._enqueue(_Waiter(user_id, priority, cost))
+        if not waiter.event.wait(timeout):
+            with self._cond:
+                if not waiter.granted:
+                    self._remove(waiter)
+                    raise LLMBusyError(f"LLM call waited over {timeout:.1f}s for admission")
+        self._record_wait(waiter)
+        return waiter
+
+    async def aacquire(
+        self,
+        user_id: str,
+        priority: int = BACKGROUND,
+        cost: int = 0,
+        timeout: Optional[float] = None,
+    ) -> _Waiter:
+        """Async acquire(); cancelling the caller leaves the queue cleanly"""
+        timeout = self.timeouts[priority] if timeout is None else timeout
+        waiter = self._enqueue(_Waiter(user_id, priority, cost, loop=asyncio.get_running_loop()))
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except asyncio.TimeoutError:
+            with self._cond:
+                if not waiter.granted:
+                    self._remove(waiter)
+                    raise LLMBusyError(f"LLM call waited over {timeout:.1f}s for admission")
+        except asyncio.CancelledError:
+            with self._cond:
+                granted = waiter.granted
+                if not granted:
+                    self._remove(waiter)
+            if granted:
+                self.release(waiter)
+            raise
+        self._record_wait(waiter)
+        return waiter
+
+    def release(self, ticket: _Waiter, usage: Any = None, spent: bool = False):
+        """Return an admission slot and settle the token budgets
+
+        Args:
+            ticket: Value returned by acquire()
+            usage: Usage of the response, possibly partial (None if unknown)
+            spent: The request reached the API; without usage the reserved
+                input tokens stay charged instead of being refunded
+        """
+        with self._cond:
+            self._in_flight -= 1
+            if usage is None:
+                actual_input, output = (ticket.cost if spent else 0), 0
+            else:
+                actual_input = (getattr(usage, "input_tokens", 0) or 0) \
+                    + (getattr(usage, "cache_creation_input_tokens", 0) or 0)
+                output = getattr(usage, "output_tokens", 0) or 0
+            if self._input is not None:
+                self._input.take(actual_input - ticket.cost)
+            if self._output is not None:
+                self._output.take(output)
+            self._wake()
+
+    def pause(self, seconds: float):
+        """Admit nothing for ``seconds`` (e.g. after a 429)"""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "in_flight": self._in_flight,
+                "queued": {
+                    name: sum(len(q) for q in self._queues[priority].values())
+                    for priority, name in PRIORITY_NAMES.items()
+                },
+                "granted": {name: self._granted[p] for p, name in PRIORITY_NAMES.items()},
+                "rejected": self._rejected,
+                "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 3),
+            }
+
+    # ========== Internals ==========
+
+    def _enqueue(self, waiter: _Waiter) -> _Waiter:
+        with self._cond:
+            users = self._queues[waiter.priority]
+            if sum(len(q) for q in users.values()) >= self.max_queue:
+                self._rejected += 1
+                raise LLMBusyError(
+                    f"{PRIORITY_NAMES[waiter.priority]} LLM queue is full ({self.max_queue})"
+                )
+            users.setdefault(waiter.user_id, deque()).append(waiter)
+            self._wake()
+        return waiter
+
+    def _remove(self, waiter: _Waiter):
+        users = self._queues[waiter.priority]
+        queue = users.get(waiter.user_id)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del users[waiter.user_id]
+
+    def _wake(self):
+        """Grant what can be granted now; the worker handles timed waits (under the lock)"""
+        self._dispatch()
+        if any(self._queues.values()):
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="echo-llm", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _run(self):
+        with self._cond:
+            while True:
+                delay = self._dispatch()
+                if not any(self._queues.values()):
+                    # Idle: exit, _wake() restarts the worker when needed
+                    self._thread = None
+                    return
+                self._cond.wait(delay)
+
+    def _dispatch(self) -> Optional[float]:
+        """Grant queued calls in priority, then round-robin user order
+
+        Returns:
+            Seconds until the next call could be admitted, or None when
+            waiting on a release
+        """
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+
+        for bucket in (self._requests, self._input, self._output):
+            if bucket is not None:
+                bucket.refill(now)
+
+        for priority in sorted(self._queues):
+            users = self._queues[priority]
+            while users:
+                if self._in_flight >= self.max_concurrency:
+                    return None
+
+                user_id, queue = next(iter(users.items()))
+                waiter = queue[0]
+                wait = self._admission_wait(waiter)
+                if wait > 0:
+                    # Strict priority: lower classes don't overtake a waiting head
+                    return wait
+
+                queue.popleft()
+                del users[user_id]
+                if queue:
+                    users[user_id] = queue  # back of the round-robin
+
+                if self._requests is not None:
+                    self._requests.take(1)
+                if self._input is not None:
+                    self._input.take(min(waiter.cost, self._input.capacity))
+                self._in_flight += 1
+                self._granted[priority] += 1
+                waiter.grant()
+
+        return None
+
+    def _admission_wait(self, waiter: _Waiter) -> float:
+        reserve = self.background_reserve if waiter.priority != INTERACTIVE else 0.0
+        wait = 0.0
+        for bucket, amount in (
+            (self._requests, 1),
+            (self._input, waiter.cost),
+            (self._output, 0),
+        ):
+            if bucket is not None:
+                # Oversized requests only need a full bucket, or they'd never run
+                needed = min(amount, bucket.capacity) + reserve * bucket.capacity
+                wait = max(wait, bucket.wait_time(min(needed, bucket.capacity)))
+        return wait
+
+    def _give_up_at(self, priority: int, timeout: Optional[float]) -> Optional[float]:
+        """Monotonic time a call stops waiting for admission, across retries"""
+        timeout = self.timeouts[priority] if timeout is None else timeout
+        return None if timeout is None else time.monotonic() + timeout
+
+    def _record_wait(self, waiter: _Waiter):
+        metrics.count("llm.wait_ms", round((time.monotonic() - waiter.queued_at) * 1000, 1))
+
+    def _retry_delay(
+        self, error: Exception, attempt: int, give_up: Optional[float] = None
+    ) -> Optional[float]:
+        """Seconds to wait before retrying ``error``, or None to give up
+
+        Account-wide throttling (429/529) pauses the whole dispatcher and
+        returns 0, since re-admission already waits for the pause. Gives up
+        when the wait would outlast the call's admission budget (give_up),
+        so the caller sees the error rather than a late LLMBusyError.
+        """
+        status = getattr(error, "status_code", None)
+        connection_error = any(
+            cls.__name__ == "APIConnectionError" for cls in type(error).__mro__
+        )
+        if attempt >= self.max_retries or (status not in RETRYABLE_STATUS and not connection_error):
+            return None
+
+        delay = min(MAX_BACKOFF, 2.0 ** attempt)
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+            try:
+                delay = min(MAX_BACKOFF, float(headers[header]) * scale)
+                break
+            except (KeyError, TypeError, ValueError):
+                continue
+
+        if status in PAUSE_STATUS:
+            self.pause(delay)
+        if give_up is not None and time.monotonic() + delay >= give_up:
+            return None
+
+        metrics.count("llm.retries")
+        reason = status or type(error).__name__
+        logger.warning(f"Claude call failed ({reason}), retrying in {delay:.1f}s")
+        return 0.0 if status in PAUSE_STATUS else delay
+
+
+def _remaining(give_up: Optional[float]) -> Optional[float]:
+    return None if give_up is None else max(0.0, give_up - time.monotonic())
+
+
+def model_for(settings: Any, task: str) -> str:
+    """Model routed to a task: llm_models setting, then DEFAULT_MODELS, then llm_default_model"""
+    return {**DEFAULT_MODELS, **settings.llm_models}.get(task, settings.llm_default_model)
+
+
+def _task_span(task: str, request: dict):
+    return metrics.span(f"llm.{task or 'call'}", model=request.get("model"))
+
+
+_dispatcher: Optional[LLMDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> LLMDispatcher:
+    """Process-wide dispatcher configured from settings"""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                from echo.config import get_settings
+
+                settings = get_settings()
+                _dispatcher = LLMDispatcher(
+                    requests_per_minute=settings.llm_requests_per_minute,
+                    input_tokens_per_minute=settings.llm_input_tokens_per_minute,
+                    output_tokens_per_minute=settings.llm_output_tokens_per_minute,
+                    max_concurrency=settings.llm_max_concurrency,
+                    max_queue=settings.llm_max_queue,
+                    background_reserve=settings.llm_background_reserve,
+                    max_retries=settings.llm_max_retries,
+                    interactive_timeout=settings.llm_interactive_timeout or None,
+                    background_timeout=settings.llm_background_timeout or None,
+                )
+    return _dispatcher
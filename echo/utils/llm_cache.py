@@ -0,0 +1,157 @@
+"""Persistent content-addressed cache for LLM generations"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(model: str, template_version: str, **inputs: Any) -> str:
+    """Content address of a generation
+
+    Args:
+        model: Model name
+        template_version: Version of the prompt template used
+        inputs: Template inputs; strings are normalized (Unicode NFKC,
+            whitespace collapsed, case-folded) so trivially different
+            spellings share an entry
+
+    Returns:
+        Hex SHA-256 key
+    """
+    payload = {
+        "model": model,
+        "template": template_version,
+        "inputs": {name: _normalize(value) for name, value in inputs.items()},
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(unicodedata.normalize("NFKC", value).split()).casefold()
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    return value
+
+
+class ResponseCache(ABC):
+    """Interface for LLM response caches
+
+    Implementations store JSON-serializable generation results under keys
+    produced by cache_key().
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None on a miss"""
+
+    @abstractmethod
+    def put(self, key: str, value: Any):
+        """Store a value"""
+
+    def close(self):
+        """Release resources"""
+
+
+class SQLiteResponseCache(ResponseCache):
+    """Response cache in a local SQLite file
+
+    Entries are evicted least-recently-used once the stored payloads exceed
+    ``max_bytes``, and treated as misses once older than ``ttl`` seconds
+    (if set).
+
+    Example:
+        >>> cache = SQLiteResponseCache(Path("~/.echo/cache/llm.sqlite3").expanduser())
+        >>> key = cache_key("claude-sonnet-4", "1", topic="Rust")
+        >>> cache.put(key, {"concepts": []})
+        >>> cache.get(key)
+        {'concepts': []}
+    """
+
+    def __init__(self, path: Path, max_bytes: int = 64 * 1024 * 1024, ttl: Optional[float] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            now = time.time()
+            if self.ttl and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+                return None
+
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any):
+        encoded = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, len(encoded), now, now),
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall():
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)"
+            )
+        return self._conn
@@ -1,5 +1,13 @@
 """Prompt templates for Echo agent"""
 
+from __future__ import annotations
+
+import json
+from typing import Optional
+
+from echo.utils.context import assemble_context, render_context
+from echo.utils.tokens import estimate_tokens
+
 SYSTEM_PROMPT = """你是 Echo，一个 AI 个人学习助理。你的职责是：
 
 1. 帮助用户梳理知识体系，构建知识图谱
@@ -20,69 +28,224 @@ SYSTEM_PROMPT = """你是 Echo，一个 AI 个人学习助理。你的职责是
 """
 
 
-def build_context_prompt(message: str, context: dict) -> str:
+# ECHO.md sections carried into the profile digest
+PROFILE_DIGEST_SECTIONS = ("学习偏好", "技能树", "兴趣领域", "当前学习重点")
+
+# Placeholder lines the profile uses for empty sections
+_EMPTY_MARKERS = ("（暂无",)
+
+
+def build_profile_digest(profile_content: str) -> str:
+    """Condense ECHO.md into a compact digest for the system prompt
+
+    Keeps only the list items of the sections in PROFILE_DIGEST_SECTIONS
+    and drops empty placeholders, the query guide and timestamps, so the
+    digest only changes when the profile's substance does.
+
+    Args:
+        profile_content: ECHO.md content
+
+    Returns:
+        Digest text, or an empty string if nothing worth sending
+    """
+    lines = []
+    section = None
+    subsection = None
+
+    for line in profile_content.splitlines():
+        line = line.strip()
+        if line.startswith("## "):
+            title = line[3:]
+            section = next((s for s in PROFILE_DIGEST_SECTIONS if s in title), None)
+            subsection = None
+            if section:
+                lines.append(f"{section}：")
+        elif section and line.startswith("### "):
+            subsection = line[4:].split(" ")[0]
+        elif section and line.startswith("- ") and not any(m in line for m in _EMPTY_MARKERS):
+            item = line[2:].replace("**", "")
+            lines.append(f"- {subsection}：{item}" if subsection else f"- {item}")
+
+    # Drop headings with no items under them
+    digest = [
+        line for i, line in enumerate(lines)
+        if line.startswith("- ") or (i + 1 < len(lines) and lines[i + 1].startswith("- "))
+    ]
+    if not digest:
+        return ""
+
+    return "用户档案摘要（来自 ECHO.md）：\n" + "\n".join(digest)
+
+
+# Shortest prefix the API will cache, by model prefix; a cache_control
+# marker on a shorter prefix is silently ignored
+_MIN_CACHEABLE_TOKENS = (
+    ("claude-haiku-4-5", 4096),
+    ("claude-opus-4-5", 4096),
+    ("claude-3-5-haiku", 2048),
+    ("claude-3-haiku", 2048),
+)
+DEFAULT_MIN_CACHEABLE_TOKENS = 1024
+
+
+def min_cacheable_tokens(model: str) -> int:
+    """Minimum prefix length, in tokens, that the model caches"""
+    for prefix, tokens in _MIN_CACHEABLE_TOKENS:
+        if model.startswith(prefix):
+            return tokens
+    return DEFAULT_MIN_CACHEABLE_TOKENS
+
+
+def build_system_prompt(
+    profile_digest: str = "", model: str = "", tools: Optional[list[dict]] = None
+) -> list[dict]:
+    """Build the static system prefix, marked for prompt caching when long enough
+
+    The prefix (tool definitions, persona and profile digest) only changes
+    when the profile is regenerated; per-turn context goes in the uncached
+    user message. The API only caches a prefix of at least
+    min_cacheable_tokens(model), so the cache_control marker is added only
+    when the estimated prefix reaches that length. The persona alone is far
+    shorter, so most prefixes are sent uncached until the digest grows.
+
+    Args:
+        profile_digest: Output of build_profile_digest
+        model: Model the request is sent to
+        tools: Tool definitions sent with the request, which precede the
+            system prompt in the cached prefix
+
+    Returns:
+        System content blocks for messages.create
+    """
+    blocks = [{"type": "text", "text": SYSTEM_PROMPT}]
+    if profile_digest:
+        blocks.append({"type": "text", "text": profile_digest})
+
+    prefix = sum(estimate_tokens(block["text"]) for block in blocks)
+    if tools:
+        prefix += estimate_tokens(json.dumps(tools, ensure_ascii=False))
+    if prefix >= min_cacheable_tokens(model):
+        blocks[-1]["cache_control"] = {"type": "ephemeral"}
+    return blocks
+
+
+def build_session_summary_block(summary: str) -> dict:
+    """System block carrying the rolling session summary
+
+    Goes after the cached prefix, since it changes as the session grows.
+    """
+    return {"type": "text", "text": f"本次对话的早期内容摘要：\n{summary}"}
+
+
+SESSION_SUMMARY_PROMPT = """请更新一段学习对话的摘要。
+
+已有摘要：
+{summary}
+
+需要并入摘要的新对话：
+{turns}
+
+输出更新后的摘要，不超过 {max_chars} 字。
+用简洁的要点保留：用户的学习目标和背景、已讨论的概念与结论、用户仍未解决的问题。只输出摘要本身。
+"""
+
+
+def build_context_prompt(message: str, context: dict, budget: int = 600) -> str:
     """Build prompt with user context
 
+    Context items are ranked, deduplicated and packed into ``budget``
+    tokens by assemble_context, so the prompt carries the most useful
+    context rather than the first few hits of each source.
+
     Args:
         message: User message
         context: Retrieved context from memory
+        budget: Token budget for the context section
 
     Returns:
         Complete prompt with context
     """
-    context_str = ""
-
-    # Add relevant memories
-    if context.get("relevant_memories"):
-        context_str += "用户的相关背景信息：\n"
-        for mem in context["relevant_memories"][:3]:
-            context_str += f"- {mem['content']}\n"
-        context_str += "\n"
-
-    # Add preferences
-    if context.get("preferences"):
-        context_str += "用户偏好：\n"
-        for pref in context["preferences"][:5]:
-            context_str += f"- {pref['key']}: {pref['value']}\n"
-        context_str += "\n"
+    context_str = render_context(assemble_context(context, budget))
+    if context_str:
+        context_str += "\n\n"
 
-    prompt = f"""{context_str}用户问题：{message}
+    return f"""{context_str}用户问题：{message}
 
 请基于用户的背景信息回答问题。"""
 
-    return prompt
 
+# Bump a template's version whenever its wording changes, so cached
+# generations from the old wording are not reused
+KNOWLEDGE_GRAPH_PROMPT_VERSION = "2"
 
-KNOWLEDGE_GRAPH_PROMPT = """为主题 "{topic}" 构建知识图谱。
+KNOWLEDGE_GRAPH_PROMPT = """为主题 "{topic}" 构建知识图谱，并通过 record_knowledge_graph 工具返回。
 
 请生成：
-1. 核心概念列表（5-10个关键概念）
-2. 概念之间的关系和依赖
-3. 推荐的学习顺序
-4. 每个概念的难度级别（初级/中级/高级）
-5. 每个概念的重要性评分（1-5）
+1. 核心概念列表（5-10个关键概念），先列出所有概念
+2. 每个概念的难度级别（beginner/intermediate/advanced）、重要性评分（1-5）、简短描述和前置概念
+3. 概念之间的关系和依赖（prerequisite/related/part_of）
+4. 推荐的学习顺序
+"""
 
-返回格式（JSON）：
-{{
-  "topic": "{topic}",
-  "concepts": [
-    {{
-      "name": "概念名称",
-      "level": "beginner|intermediate|advanced",
-      "importance": 1-5,
-      "description": "概念描述",
-      "prerequisites": ["前置概念1", "前置概念2"]
-    }}
-  ],
-  "relationships": [
-    {{
-      "from": "概念A",
-      "to": "概念B",
-      "type": "prerequisite|related|part_of"
-    }}
-  ],
-  "learning_path": ["概念1", "概念2", "概念3", ...]
-}}
+_CONCEPT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "level": {"type": "string", "enum": ["beginner", "intermediate", "advanced"]},
+        "importance": {"type": "integer", "minimum": 1, "maximum": 5},
+        "description": {"type": "string"},
+        "prerequisites": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["name", "level"],
+}
+
+_RELATIONSHIP_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "from": {"type": "string"},
+        "to": {"type": "string"},
+        "type": {"type": "string", "enum": ["prerequisite", "related", "part_of"]},
+    },
+    "required": ["from", "to", "type"],
+}
+
+# Tool the model must call for graph generation. Concepts come first in the
+# schema so they stream (and are persisted) before the relationships.
+KNOWLEDGE_GRAPH_TOOL = {
+    "name": "record_knowledge_graph",
+    "description": "记录一个学习主题的知识图谱",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "concepts": {"type": "array", "items": _CONCEPT_SCHEMA},
+            "relationships": {"type": "array", "items": _RELATIONSHIP_SCHEMA},
+            "learning_path": {"type": "array", "items": {"type": "string"}},
+        },
+        "required": ["concepts", "relationships"],
+    },
+}
+
+# Single-item tools used to regenerate one failing fragment
+GRAPH_ITEM_TOOLS = {
+    "concepts": {
+        "name": "record_concept",
+        "description": "记录一个知识概念",
+        "input_schema": _CONCEPT_SCHEMA,
+    },
+    "relationships": {
+        "name": "record_relationship",
+        "description": "记录两个概念之间的关系",
+        "input_schema": _RELATIONSHIP_SCHEMA,
+    },
+}
+
+GRAPH_FRAGMENT_REPAIR_PROMPT = """以下是主题 "{topic}" 知识图谱中的一个片段，它不完整或格式有误：
+
+{fragment}
+
+问题：{errors}
+
+请修正这个片段，并通过 {tool_name} 工具返回。
 """
 
 
@@ -0,0 +1,56 @@
+"""Local token estimation"""
+
+from __future__ import annotations
+
+import json
+import math
+import re
+
+# CJK ideographs, kana and hangul: roughly one token per character
+_CJK_RE = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿＀-￯]")
+
+# Framing overhead of one chat message (role, separators)
+MESSAGE_OVERHEAD = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a piece of text without a tokenizer
+
+    Counts CJK characters as one token each and everything else at about
+    four characters per token. Errs slightly high, which is the safe side
+    for budgeting.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated token count
+
+    Example:
+        >>> estimate_tokens("我想学习 Rust")
+        6
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def estimate_message_tokens(message: dict) -> int:
+    """Estimate the tokens of a chat message dict (str or text-block content)"""
+    content = message.get("content", "")
+    if isinstance(content, list):
+        content = "".join(block.get("text", "") for block in content if isinstance(block, dict))
+    return estimate_tokens(content) + MESSAGE_OVERHEAD
+
+
+def estimate_request_tokens(request: dict) -> int:
+    """Estimate the input tokens of a Messages API request (system, messages, tools)"""
+    system = request.get("system", "")
+    if isinstance(system, list):
+        system = "".join(block.get("text", "") for block in system if isinstance(block, dict))
+    tokens = estimate_tokens(system)
+    tokens += sum(estimate_message_tokens(m) for m in request.get("messages", []))
+    if request.get("tools"):
+        tokens += estimate_tokens(json.dumps(request["tools"], ensure_ascii=False))
+    return tokens
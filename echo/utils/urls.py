@@ -0,0 +1,34 @@
+"""URL extraction for bulk resource import"""
+
+import re
+
+# Matches http(s) URLs in plain text, Markdown and HTML bookmark exports
+_URL_RE = re.compile(r"""https?://[^\s"'<>`]+""")
+
+# Characters that usually close the surrounding text rather than the URL
+_TRAILING = ".,;:!?)]}>"
+
+
+def extract_urls(text: str) -> list[str]:
+    """Extract unique URLs from free-form text, in order of appearance
+
+    Works on one-URL-per-line reading lists, Markdown link lists and
+    Netscape bookmark HTML exports.
+
+    Args:
+        text: Text to scan
+
+    Returns:
+        Deduplicated list of URLs
+    """
+    seen = set()
+    urls = []
+    for match in _URL_RE.finditer(text):
+        url = match.group(0).rstrip(_TRAILING)
+        # Keep a closing parenthesis that belongs to the URL itself
+        if url.count("(") > url.count(")") and match.group(0)[len(url):].startswith(")"):
+            url += ")"
+        if url not in seen:
+            seen.add(url)
+            urls.append(url)
+    return urls
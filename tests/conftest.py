@@ -0,0 +1,44 @@
+"""Shared fixtures: settings from a temporary data dir and fake backends"""
+
+from __future__ import annotations
+
+import pytest
+
+from benchmarks.fakes import DataVolume, FakeAnthropic, FakeNeuroMemoryClient, Latency
+from echo.config import get_settings
+
+
+@pytest.fixture
+def settings(tmp_path, monkeypatch):
+    """Settings with dummy credentials and all local state under tmp_path"""
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    monkeypatch.setenv("NEUROMEMORY_API_KEY", "test")
+    monkeypatch.setenv("ECHO_DATA_DIR", str(tmp_path / "echo"))
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    monkeypatch.setenv("METRICS_ENABLED", "false")
+    get_settings.cache_clear()
+    yield get_settings()
+    get_settings.cache_clear()
+
+
+@pytest.fixture
+def memory_client():
+    return FakeNeuroMemoryClient(DataVolume(facts=50), Latency().scaled(0))
+
+
+@pytest.fixture
+def claude_client():
+    return FakeAnthropic(Latency().scaled(0))
+
+
+@pytest.fixture
+def agent(settings, memory_client, claude_client):
+    from echo.agent import EchoAgent
+
+    agent = EchoAgent(
+        user_id="tester",
+        neuromemory_client=memory_client,
+        claude_client=claude_client,
+    )
+    yield agent
+    agent.close()
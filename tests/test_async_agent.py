@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import FakeAsyncAnthropic, Latency
+
+
+@pytest.fixture
+def async_claude():
+    return FakeAsyncAnthropic(Latency().scaled(0))
+
+
+def _run(settings, memory_client, claude, scenario):
+    from echo.async_agent import AsyncEchoAgent
+
+    async def main():
+        async with AsyncEchoAgent(
+            "tester", neuromemory_client=memory_client, claude_client=claude
+        ) as agent:
+            return await scenario(agent)
+
+    return asyncio.run(main())
+
+
+def test_async_agent_does_not_wrap_a_sync_agent(settings, memory_client, async_claude):
+    from echo.agent import EchoAgent
+
+    async def scenario(agent):
+        assert not isinstance(agent, EchoAgent)
+        assert not any(isinstance(v, EchoAgent) for v in vars(agent).values())
+        return await agent.chat("你好")
+
+    answer = _run(settings, memory_client, async_claude, scenario)
+    assert answer == async_claude.answer
+    assert async_claude.calls.counts == {"messages.stream": 1}
+
+
+def test_async_chat_builds_the_same_request_as_sync(settings, memory_client, async_claude):
+    captured = []
+    stream = async_claude.messages.stream
+
+    def capture(**request):
+        captured.append(request)
+        return stream(**request)
+
+    async_claude.messages.stream = capture
+
+    async def scenario(agent):
+        await agent.chat("你好")
+        return agent._chat_request("你好", {})
+
+    rebuilt = _run(settings, memory_client, async_claude, scenario)
+    assert captured[0]["model"] == rebuilt["model"]
+    assert captured[0]["system"] == rebuilt["system"]
+
+
+def test_learning_intent_job_runs_on_the_event_loop(settings, memory_client, async_claude):
+    async def scenario(agent):
+        await agent.chat("我想学习 Rust")
+        for _ in range(200):
+            if agent.knowledge_graph.store.has_topic("Rust"):
+                break
+            await asyncio.sleep(0.02)
+        return agent.knowledge_graph.store.has_topic("Rust")
+
+    assert _run(settings, memory_client, async_claude, scenario)
+    assert async_claude.calls.counts.get("messages.stream") == 2  # chat, then the graph
+
+
+def test_async_progress_reports_counts(settings, memory_client, async_claude):
+    async def scenario(agent):
+        return await agent.get_learning_progress()
+
+    progress = _run(settings, memory_client, async_claude, scenario)
+    assert progress["knowledge_points"] == 50
+    assert progress["degraded"] == []
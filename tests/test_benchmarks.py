@@ -0,0 +1,21 @@
+from benchmarks.run import Result, compare
+
+BASELINE = {"chat": {"wall_ms": 50.0, "calls": 2.6, "peak_kib": 40.0}}
+
+
+def test_shared_baseline_gates_only_call_counts():
+    slower = Result("chat", 10, wall_ms=500.0, calls=2.6, peak_kib=400.0)
+    assert compare([slower], BASELINE, threshold=0.25) == []
+
+    more_calls = Result("chat", 10, wall_ms=50.0, calls=3.6, peak_kib=40.0)
+    assert compare([more_calls], BASELINE, threshold=0.25) == [
+        "chat: backend calls 2.6 -> 3.6"
+    ]
+
+
+def test_local_baseline_also_gates_wall_time_and_allocations():
+    slower = Result("chat", 10, wall_ms=500.0, calls=2.6, peak_kib=400.0)
+    assert compare([slower], BASELINE, threshold=0.25, local=True) == [
+        "chat: wall 50.0 -> 500.0 ms",
+        "chat: peak alloc 40.0 -> 400.0 KiB",
+    ]
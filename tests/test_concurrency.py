@@ -0,0 +1,42 @@
+import time
+
+import pytest
+
+from echo.utils.concurrency import CircuitBreaker, Deadline
+
+
+def test_deadline_shares_out_what_is_left():
+    assert Deadline(0).remaining() is None
+    assert Deadline(0).budget(3.0, share=0.25) == 3.0
+
+    deadline = Deadline(2.0)
+    assert deadline.budget(3.0, share=0.5) == pytest.approx(1.0, abs=0.05)
+    assert deadline.budget(0.5) == 0.5
+
+
+def test_expired_deadline_leaves_no_budget():
+    deadline = Deadline(0.01)
+    time.sleep(0.02)
+    assert deadline.remaining() == 0.0
+    assert deadline.budget(3.0) == 0.0
+
+
+def test_breaker_opens_after_threshold_and_lets_one_trial_through():
+    breaker = CircuitBreaker("backend", failure_threshold=2, cooldown=0.05)
+    breaker.record(False)
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()  # the trial call
+    assert not breaker.allow()  # only one at a time
+    breaker.record(False)
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == "closed"
+    assert breaker.allow()
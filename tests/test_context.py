@@ -0,0 +1,52 @@
+from echo.utils.context import assemble_context, render_context
+from echo.utils.tokens import estimate_tokens
+
+NOW = 1_800_000_000.0
+DAY = 86400
+
+
+def _texts(items):
+    return [item.text for item in items]
+
+
+def test_items_are_ranked_by_relevance_type_and_recency():
+    context = {
+        "relevant_memories": [
+            {"content": "旧事实", "score": 0.9, "memory_type": "fact",
+             "created_at": NOW - 120 * DAY},
+            {"content": "新事实", "score": 0.8, "memory_type": "fact", "created_at": NOW},
+            {"content": "一段对话", "score": 0.8, "memory_type": "episodic", "created_at": NOW},
+            {"content": "无关内容", "score": 0.1, "memory_type": "fact"},
+        ],
+    }
+    items = assemble_context(context, budget=600, now=NOW)
+    assert _texts(items) == ["新事实", "一段对话", "旧事实"]
+
+
+def test_near_duplicates_keep_their_best_copy():
+    context = {
+        "relevant_memories": [
+            {"content": "用户在用 Python 做数据分析", "score": 0.9},
+            {"content": "用户在用Python做数据分析。", "score": 0.7},
+        ],
+        "preferences": [{"key": "风格", "value": "简洁"}],
+    }
+    assert _texts(assemble_context(context, budget=600, now=NOW)) == [
+        "用户在用 Python 做数据分析", "风格: 简洁",
+    ]
+
+
+def test_selection_fits_the_budget_including_headings():
+    memories = [{"content": f"第{i}条很长的背景信息" * 5, "score": 0.9} for i in range(20)]
+    items = assemble_context({"relevant_memories": memories}, budget=200, now=NOW)
+    assert 0 < len(items) < 20
+    assert estimate_tokens(render_context(items)) <= 200
+
+
+def test_render_groups_items_under_section_headings():
+    context = {
+        "related_concepts": [{"concept": "所有权", "neighbors": ["借用"]}],
+        "relevant_memories": [{"content": "会写 C++", "score": 0.9}],
+    }
+    rendered = render_context(assemble_context(context, budget=600, now=NOW))
+    assert rendered == "用户的相关背景信息：\n- 会写 C++\n\n知识图谱中的相关概念：\n- 所有权: 借用"
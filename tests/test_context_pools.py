@@ -0,0 +1,30 @@
+import threading
+
+from echo.utils import concurrency
+from echo.utils.concurrency import Deadline
+
+
+def test_stuck_remote_sources_do_not_starve_local_ones(agent, memory_client, monkeypatch):
+    monkeypatch.setattr(concurrency, "_breakers", {})  # breakers are process-wide
+    release = threading.Event()
+    memory_client.memory.search = lambda *args, **kwargs: release.wait(5) and []
+    memory_client.memory.get_preferences = lambda *args, **kwargs: release.wait(5) and []
+    agent.knowledge_graph.related_to_text = lambda text, limit=5: [{"name": "Rust"}]
+    agent.settings.context_search_timeout = 0.05
+    agent.settings.context_preferences_timeout = 0.05
+    agent.settings.circuit_failure_threshold = 1000
+
+    try:
+        # More turns than remote workers, each leaving its calls stuck
+        for _ in range(agent.settings.context_remote_workers + 2):
+            context, degraded = agent._get_context("我想学习 Rust", Deadline(0))
+            assert context["related_concepts"] == [{"name": "Rust"}]
+            assert "related_concepts" not in degraded
+            assert "relevant_memories" in degraded
+
+        # Background work still runs while the remote pool is saturated
+        ran = threading.Event()
+        agent._background.submit(ran.set)
+        assert ran.wait(1)
+    finally:
+        release.set()
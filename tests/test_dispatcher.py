@@ -0,0 +1,172 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from echo.utils.llm import BACKGROUND, LLMBusyError, LLMDispatcher
+from echo.utils.tokens import estimate_request_tokens
+
+REQUEST = {"model": "m", "max_tokens": 10, "messages": [{"role": "user", "content": "hi"}]}
+
+
+class APIStatusError(Exception):
+    def __init__(self, status_code: int, retry_after: float = None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        headers = {} if retry_after is None else {"retry-after": str(retry_after)}
+        self.response = SimpleNamespace(headers=headers)
+
+
+class FailingMessages:
+    """messages namespace whose calls raise the queued errors in turn"""
+
+    def __init__(self, *errors: Exception):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def _next(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return SimpleNamespace(usage=None)
+
+    def create(self, **request):
+        return self._next()
+
+    def stream(self, **request):
+        return self._next()
+
+
+def _client(*errors: Exception) -> SimpleNamespace:
+    return SimpleNamespace(messages=FailingMessages(*errors))
+
+
+def test_stream_releases_slot_when_opening_raises():
+    llm = LLMDispatcher(max_concurrency=1)
+    client = _client(ValueError("bad request"))
+    with pytest.raises(ValueError):
+        with llm.stream(client, REQUEST, "alice"):
+            pass
+    assert llm.stats()["in_flight"] == 0
+
+
+def test_astream_releases_slot_when_opening_raises():
+    llm = LLMDispatcher(max_concurrency=1)
+    client = _client(ValueError("bad request"))
+
+    async def run():
+        async with llm.astream(client, REQUEST, "alice"):
+            pass
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+    assert llm.stats()["in_flight"] == 0
+
+
+def test_acreate_releases_slot_when_cancelled():
+    llm = LLMDispatcher(max_concurrency=1)
+
+    class Hanging:
+        async def create(self, **request):
+            await asyncio.sleep(10)
+
+    async def run():
+        task = asyncio.create_task(llm.acreate(SimpleNamespace(messages=Hanging()), REQUEST, "a"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert llm.stats()["in_flight"] == 0
+
+
+def test_retries_share_one_admission_budget():
+    llm = LLMDispatcher(max_retries=3)
+    timeouts = []
+    acquire = llm.acquire
+
+    def recording_acquire(user_id, priority=BACKGROUND, cost=0, timeout=None):
+        timeouts.append(timeout)
+        return acquire(user_id, priority, cost, timeout)
+
+    llm.acquire = recording_acquire
+    client = _client(APIStatusError(503, retry_after=0.05), APIStatusError(503, retry_after=0.05))
+    llm.create(client, REQUEST, "alice", timeout=5.0)
+
+    assert client.messages.calls == 3
+    assert timeouts[0] == pytest.approx(5.0, abs=0.01)
+    assert timeouts[0] > timeouts[1] > timeouts[2]
+    assert timeouts[2] <= 5.0 - 0.1
+
+
+def test_retry_that_outlasts_the_budget_raises_the_error():
+    llm = LLMDispatcher(max_retries=3)
+    client = _client(APIStatusError(503, retry_after=30))
+    start = time.monotonic()
+    with pytest.raises(APIStatusError):
+        llm.create(client, REQUEST, "alice", timeout=0.5)
+    assert time.monotonic() - start < 0.5
+    assert client.messages.calls == 1
+
+
+def test_admission_timeout_raises_busy():
+    llm = LLMDispatcher(max_concurrency=1)
+    ticket = llm.acquire("alice")
+    with pytest.raises(LLMBusyError):
+        llm.create(_client(), REQUEST, "bob", timeout=0.05)
+    llm.release(ticket)
+    assert llm.stats()["in_flight"] == 0
+
+
+class AbortedStream:
+    """Stream that opens, then is abandoned before its final message"""
+
+    def __init__(self, snapshot=None):
+        self.snapshot = snapshot
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    @property
+    def current_message_snapshot(self):
+        assert self.snapshot is not None
+        return self.snapshot
+
+
+def _stream_client(stream) -> SimpleNamespace:
+    return SimpleNamespace(messages=SimpleNamespace(stream=lambda **request: stream))
+
+
+def test_aborted_stream_keeps_its_reservation():
+    llm = LLMDispatcher(input_tokens_per_minute=6000, output_tokens_per_minute=6000)
+    with pytest.raises(KeyboardInterrupt):
+        with llm.stream(_stream_client(AbortedStream()), REQUEST, "alice"):
+            raise KeyboardInterrupt
+
+    assert llm._input.level == pytest.approx(6000 - estimate_request_tokens(REQUEST), abs=1)
+    assert llm.stats()["in_flight"] == 0
+
+
+def test_aborted_stream_is_charged_its_reported_usage():
+    llm = LLMDispatcher(input_tokens_per_minute=6000, output_tokens_per_minute=6000)
+    usage = SimpleNamespace(input_tokens=400, output_tokens=25)
+    client = _stream_client(AbortedStream(SimpleNamespace(usage=usage)))
+    with pytest.raises(ConnectionError):
+        with llm.stream(client, REQUEST, "alice"):
+            raise ConnectionError("client disconnected")
+
+    assert llm._input.level == pytest.approx(6000 - 400, abs=1)
+    assert llm._output.level == pytest.approx(6000 - 25, abs=1)
+
+
+def test_stream_that_fails_to_open_is_refunded():
+    llm = LLMDispatcher(input_tokens_per_minute=6000, max_retries=0)
+    with pytest.raises(ValueError):
+        with llm.stream(_client(ValueError("bad request")), REQUEST, "alice"):
+            pass
+    assert llm._input.level == pytest.approx(6000, abs=1)
@@ -0,0 +1,61 @@
+import json
+from types import SimpleNamespace
+
+from benchmarks.fakes import GRAPH_PAYLOAD
+
+
+class BrokenStream:
+    """Tool-call stream that fails after the first part of the graph"""
+
+    def __init__(self):
+        text = json.dumps(GRAPH_PAYLOAD, ensure_ascii=False)
+        self.chunks = [text[i:i + 64] for i in range(0, len(text) // 2, 64)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            yield SimpleNamespace(
+                type="content_block_delta",
+                delta=SimpleNamespace(type="input_json_delta", partial_json=chunk),
+            )
+        raise ConnectionError("stream dropped")
+
+
+def test_stream_failing_partway_leaves_no_partial_topic(agent, claude_client):
+    claude_client.messages.stream = lambda **request: BrokenStream()
+
+    result = agent.build_knowledge_graph("Rust")
+
+    assert "error" in result
+    store = agent.knowledge_graph.store
+    assert not store.has_topic("Rust")
+    assert store.concepts() == []
+    store.save()
+    assert json.loads(store.path.read_text(encoding="utf-8"))["nodes"] == []
+
+
+def test_refresh_replaces_the_topic_graph(agent):
+    store = agent.knowledge_graph.store
+    agent.knowledge_graph.build_from_data("Rust", {
+        "concepts": [
+            {"name": "旧概念", "level": "beginner"},
+            {"name": "概念1", "level": "advanced", "prerequisites": ["旧概念"]},
+        ],
+    })
+    store.add_concept("Go", "并发")
+    store.add_edge("旧概念", "并发", "related")
+    store.mark_mastered(["概念1"])
+
+    graph = agent.build_knowledge_graph("Rust", refresh=True)
+
+    assert "error" not in graph
+    assert set(store.concepts("Rust")) == {c["name"] for c in GRAPH_PAYLOAD["concepts"]}
+    assert store.concept("旧概念") is None
+    assert store.concepts("Go") == ["并发"]
+    assert store.prerequisites("概念1") == {"概念0"}
+    assert store.concept("概念1")["mastered"]
@@ -0,0 +1,55 @@
+import pytest
+
+from echo.knowledge.store import GraphStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = GraphStore(tmp_path / "graph.json")
+    store.load_graph("Rust", {
+        "concepts": [
+            {"name": "变量", "level": "beginner"},
+            {"name": "所有权", "level": "beginner", "prerequisites": ["变量"]},
+            {"name": "借用", "level": "intermediate", "prerequisites": ["所有权"]},
+            {"name": "生命周期", "level": "intermediate", "importance": 5,
+             "prerequisites": ["借用"]},
+            {"name": "宏", "level": "advanced"},
+        ],
+        "relationships": [{"from": "生命周期", "to": "宏", "type": "related"}],
+    })
+    return store
+
+
+def test_prerequisites_are_transitive_and_follow_new_edges(store):
+    assert store.prerequisites("生命周期") == {"变量", "所有权", "借用"}
+
+    store.add_concept("Rust", "类型", level="beginner")
+    store.add_edge("类型", "变量", "prerequisite")
+    assert store.prerequisites("生命周期") == {"类型", "变量", "所有权", "借用"}
+
+
+def test_topological_order_puts_prerequisites_first(store):
+    order = store.topological_order("Rust")
+    for name in store.concepts("Rust"):
+        assert all(order.index(p) < order.index(name) for p in store.prerequisites(name))
+
+
+def test_learning_sequence_skips_known_concepts_with_their_prerequisites(store):
+    assert store.learning_sequence("Rust", known=["借用"]) == ["生命周期", "宏"]
+
+    store.mark_mastered(["所有权"])
+    assert store.learning_sequence("Rust") == ["借用", "生命周期", "宏"]
+
+
+def test_learning_chain_is_the_shortest_prerequisite_path(store):
+    assert store.learning_chain("所有权", "生命周期") == ["所有权", "借用", "生命周期"]
+    assert store.learning_chain("宏", "变量") == []
+
+
+def test_store_round_trips_through_save(store):
+    store.mark_mastered(["变量"])
+    store.save()
+
+    reloaded = GraphStore(store.path)
+    assert reloaded.edges("Rust") == store.edges("Rust")
+    assert reloaded.learning_sequence("Rust") == store.learning_sequence("Rust")
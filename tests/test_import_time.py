@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+import time
+
+# Start-up Echo may add on top of its CLI framework (typer + rich), which
+# alone costs most of a fresh interpreter's budget
+ECHO_STARTUP_BUDGET_MS = float(os.environ.get("ECHO_STARTUP_BUDGET_MS", "40"))
+
+HEAVY_MODULES = ("echo.agent", "pydantic_settings", "anthropic", "neuromemory_client")
+
+
+def _run(*args: str, env: dict = None) -> str:
+    return subprocess.run(
+        [sys.executable, *args], check=True, capture_output=True, text=True, env=env
+    ).stdout
+
+
+def _elapsed_ms(*args: str) -> float:
+    start = time.perf_counter()
+    _run(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def test_cli_import_skips_agent_and_settings():
+    loaded = _run(
+        "-c",
+        "import sys, echo.cli; "
+        f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))",
+    )
+    assert loaded.strip() == ""
+
+
+def test_profile_path_needs_no_credentials(tmp_path):
+    env = {"PATH": os.environ.get("PATH", ""), "ECHO_DATA_DIR": str(tmp_path)}
+    out = _run("-m", "echo.cli", "profile", "--path", "--user-id", "bob", env=env)
+    assert str(tmp_path / "profiles" / "bob_ECHO.md") in out.replace("\n", "")
+
+
+def test_profile_path_startup_budget():
+    _run("-m", "echo.cli", "profile", "--path")  # warm the bytecode cache
+    # Interleaved best-of-n, so load on a shared machine hits both alike
+    framework, startup = [], []
+    for _ in range(7):
+        framework.append(_elapsed_ms("-c", "import typer, rich.console, rich.panel"))
+        startup.append(_elapsed_ms("-m", "echo.cli", "profile", "--path"))
+    framework, startup = min(framework), min(startup)
+    assert startup - framework < ECHO_STARTUP_BUDGET_MS, (
+        f"profile --path took {startup:.0f} ms, {framework:.0f} ms of it typer and rich"
+    )
@@ -0,0 +1,54 @@
+import pytest
+
+from echo.utils.intent import extract_learning_topic
+
+
+@pytest.mark.parametrize(
+    "message, topic",
+    [
+        ("我想学习一下 Rust 编程语言，有什么建议？", "Rust 编程语言"),
+        ("教我机器学习吧", "机器学习"),
+        ("我想了解量子计算", "量子计算"),
+        ("如何提升英语口语？", "英语口语"),
+        ("想学下Kubernetes呢", "Kubernetes"),
+        ("我在学习Rust", "Rust"),
+        ("我想学习C", "C"),
+        ("教我 R 吧", "R"),
+    ],
+)
+def test_extracts_topic(message, topic):
+    assert extract_learning_topic(message) == topic
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "我了解了，谢谢",
+        "我已经掌握了",
+        "学习好累啊",
+        "我想了解你是谁",
+        "我不想学习Python了",
+        "不用学习这个",
+        "我不要了解这些",
+        "我想学习",
+        "今天天气不错",
+        "我想学习……",
+    ],
+)
+def test_rejects_non_topics(message):
+    assert extract_learning_topic(message) is None
+
+
+@pytest.mark.parametrize("message", ["我了解了，谢谢", "我不想学习Python了", "学习好累啊"])
+def test_chat_without_topic_queues_nothing(agent, message):
+    agent._process_learning_intent(message, "好的")
+    assert agent.jobs.recent(agent.user_id) == []
+
+
+def test_chat_with_topic_queues_graph_then_path(agent, monkeypatch):
+    monkeypatch.setattr(agent._job_worker, "wake", lambda: None)
+    agent._process_learning_intent("我想学习 Rust", "好的")
+    jobs = {job.kind: job for job in agent.jobs.recent(agent.user_id)}
+    assert set(jobs) == {"knowledge_graph", "learning_path"}
+    assert jobs["learning_path"].depends_on == jobs["knowledge_graph"].id
+    assert jobs["knowledge_graph"].payload["topic"] == "Rust"
@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+from echo.jobs import DONE, FAILED, QUEUED, JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3", max_attempts=3, retry_delay=10.0)
+    yield queue
+    queue.close()
+
+
+def test_enqueue_dedupes_pending_and_recently_done_jobs(queue):
+    first = queue.enqueue("knowledge_graph", "alice", "rust", {"topic": "Rust"})
+    assert queue.enqueue("knowledge_graph", "alice", "rust", {"topic": "Rust"}) == first
+    assert queue.enqueue("knowledge_graph", "bob", "rust", {"topic": "Rust"}) != first
+
+    queue.complete(queue.claim("alice"))
+    assert queue.enqueue("knowledge_graph", "alice", "rust", {"topic": "Rust"}) == first
+
+
+def test_dependent_job_waits_for_and_fails_with_its_dependency(queue):
+    graph = queue.enqueue("knowledge_graph", "alice", "rust", {})
+    path = queue.enqueue("learning_path", "alice", "rust", {}, depends_on=graph)
+
+    job = queue.claim("alice")
+    assert job.id == graph
+    assert queue.claim("alice") is None  # path waits for the graph
+
+    queue.fail(job, "boom", retry=False)
+    statuses = {j.id: (j.status, j.last_error) for j in queue.recent("alice")}
+    assert statuses[graph] == (FAILED, "boom")
+    assert statuses[path] == (FAILED, f"dependency #{graph} failed")
+
+    assert queue.retry(graph)
+    assert queue.counts("alice")[QUEUED] == 2
+
+
+def test_failed_attempts_back_off_exponentially(queue):
+    queue.enqueue("knowledge_graph", "alice", "rust", {})
+
+    job = queue.claim("alice")
+    before = time.time()
+    queue.fail(job, "timeout")
+    assert queue.claim("alice") is None  # not due yet
+    assert queue.next_run_at("alice") == pytest.approx(before + 10.0, abs=1.0)
+
+
+def test_retries_stop_at_max_attempts(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3", max_attempts=2, retry_delay=0.0)
+    try:
+        queue.enqueue("knowledge_graph", "alice", "rust", {})
+        for _ in range(2):
+            queue.fail(queue.claim("alice"), "timeout")
+        assert queue.claim("alice") is None
+        assert queue.counts("alice")[FAILED] == 1
+    finally:
+        queue.close()
+
+
+def test_expired_lease_is_claimed_again(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3", lease=0.0)
+    try:
+        queue.enqueue("knowledge_graph", "alice", "rust", {})
+        first = queue.claim("alice")  # the worker holding it dies
+        time.sleep(0.01)
+        second = queue.claim("alice")
+        assert second.id == first.id
+        assert second.attempts == 2
+
+        queue.complete(first)  # the stale attempt no longer owns the job
+        assert queue.counts("alice")[DONE] == 0
+        queue.complete(second)
+        assert queue.counts("alice")[DONE] == 1
+    finally:
+        queue.close()
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from benchmarks.fakes import GRAPH_PAYLOAD
+from echo.utils.jsonstream import ArrayItemStreamer, loads_lenient
+
+
+@pytest.mark.parametrize("size", [1, 7, 64, 10_000])
+def test_elements_are_emitted_whole_at_any_chunk_size(size):
+    text = json.dumps(GRAPH_PAYLOAD, ensure_ascii=False)
+    streamer = ArrayItemStreamer(("concepts", "relationships", "learning_path"))
+    items = []
+    for i in range(0, len(text), size):
+        items.extend(streamer.feed(text[i:i + size]))
+
+    for key in ("concepts", "relationships", "learning_path"):
+        assert [value for k, value, _ in items if k == key] == GRAPH_PAYLOAD[key]
+    assert streamer.pending() is None
+
+
+def test_strings_with_brackets_and_escapes_do_not_split_elements():
+    streamer = ArrayItemStreamer(("concepts",))
+    items = streamer.feed('{"note": "[{", "concepts": [{"name": "a\\"}]"}, "b]"]}')
+    assert [value for _, value, _ in items] == [{"name": 'a"}]'}, "b]"]
+
+
+def test_invalid_element_is_reported_with_its_raw_text():
+    streamer = ArrayItemStreamer(("concepts",))
+    items = streamer.feed('{"concepts": [{"name": 所有权}, {"name": "借用"}]}')
+    assert items[0] == ("concepts", None, '{"name": 所有权}')
+    assert items[1][1] == {"name": "借用"}
+
+
+def test_cut_off_element_is_left_pending():
+    streamer = ArrayItemStreamer(("concepts",))
+    streamer.feed('{"concepts": [{"name": "所有权"}, {"name": "借')
+    assert streamer.pending() == ("concepts", '{"name": "借')
+
+
+@pytest.mark.parametrize(
+    "text, value",
+    [
+        ('{"a": 1}', {"a": 1}),
+        ('{"a": [1, 2,], }', {"a": [1, 2]}),
+        ('{"name": "借用", "prerequisites": ["所有', {"name": "借用", "prerequisites": ["所有"]}),
+        ('{"a": {"b": [1', {"a": {"b": [1]}}),
+        ('{"name": 所有权}', None),
+    ],
+)
+def test_loads_lenient_repairs_local_damage(text, value):
+    assert loads_lenient(text) == value
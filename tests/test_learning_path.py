@@ -0,0 +1,81 @@
+import pytest
+
+from echo.knowledge.path import LearningPath
+from echo.knowledge.store import GraphStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = GraphStore(tmp_path / "graph.json")
+    store.add_concept("Rust", "变量", level="beginner")
+    store.add_concept("Rust", "所有权", level="beginner")
+    store.add_concept("Rust", "生命周期", level="intermediate")
+    store.add_concept("Rust", "宏", level="advanced")
+    store.add_edge("变量", "所有权", "prerequisite")
+    store.add_edge("所有权", "生命周期", "prerequisite")
+    store.add_edge("生命周期", "宏", "prerequisite")
+    return store
+
+
+def test_plan_keeps_unmastered_prerequisites_below_the_users_level(store, memory_client):
+    path = LearningPath(memory_client, "tester", store=store)
+    plan = path.plan("Rust", "intermediate", {"skills": []})
+
+    topics = [name for stage in plan["stages"] for name in stage["topics"]]
+    assert topics == ["变量", "所有权", "生命周期", "宏"]
+    assert plan["skipped"] == 0
+
+
+def test_plan_skips_mastered_concepts_and_their_prerequisites(store, memory_client):
+    store.mark_mastered(["所有权"])
+    path = LearningPath(memory_client, "tester", store=store)
+    plan = path.plan("Rust", "beginner", {"skills": []})
+
+    topics = [name for stage in plan["stages"] for name in stage["topics"]]
+    assert topics == ["生命周期", "宏"]
+    assert plan["skipped"] == 2
+
+
+def test_progress_is_logged_without_rewriting_the_graph(store, memory_client):
+    store.save()
+    saved = store.path.read_text(encoding="utf-8")
+    path = LearningPath(memory_client, "tester", store=store)
+    path.update_progress("Rust", "所有权")
+    path.update_progress("Rust", "所有权")
+
+    assert store.path.read_text(encoding="utf-8") == saved
+    assert store.mastery_path.read_text(encoding="utf-8") == '"所有权"\n'
+
+    reloaded = GraphStore(store.path)
+    assert reloaded.learning_sequence("Rust") == ["生命周期", "宏"]
+
+    reloaded.save()
+    assert not reloaded.mastery_path.exists()
+    assert GraphStore(store.path).learning_sequence("Rust") == ["生命周期", "宏"]
+
+
+def test_next_step_follows_progress(store, memory_client):
+    path = LearningPath(memory_client, "tester", store=store)
+    assert path.get_next_step("Rust")["concept"] == "变量"
+
+    path.update_progress("Rust", "所有权")
+    step = path.get_next_step("Rust")
+    assert step["concept"] == "生命周期"
+    assert step["level"] == "intermediate"
+    assert step["prerequisites"] == ["所有权"]
+    assert step["remaining"] == 2
+
+    path.update_progress("Rust", "宏")
+    assert path.get_next_step("Rust") == {}
+    assert path.get_next_step("Go") == {}
+
+
+@pytest.mark.parametrize("name", ["LEARNING_HOURS_PER_WEEK", "LEARNING_STAGE_WEEKS"])
+def test_zero_pacing_is_rejected_by_settings(settings, monkeypatch, name):
+    from pydantic import ValidationError
+
+    from echo.config import Settings
+
+    monkeypatch.setenv(name, "0")
+    with pytest.raises(ValidationError):
+        Settings()
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+from echo.utils.llm_cache import ResponseCache, SQLiteResponseCache, cache_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SQLiteResponseCache(tmp_path / "llm.sqlite3")
+    yield cache
+    cache.close()
+
+
+def test_cache_key_normalizes_trivial_spelling_differences():
+    key = cache_key("claude-haiku-4-5", "1", topic="Machine Learning")
+    assert cache_key("claude-haiku-4-5", "1", topic="  machine　LEARNING ") == key
+    assert cache_key("claude-haiku-4-5", "2", topic="Machine Learning") != key
+    assert cache_key("claude-sonnet-4-5", "1", topic="Machine Learning") != key
+    assert cache_key("claude-haiku-4-5", "1", topic="Machine Learning 2") != key
+
+
+def test_values_round_trip_and_survive_reopening(cache):
+    cache.put("k", {"concepts": [{"name": "所有权"}]})
+    assert cache.get("k") == {"concepts": [{"name": "所有权"}]}
+    assert cache.get("missing") is None
+
+    cache.close()
+    reopened = SQLiteResponseCache(cache.path)
+    assert reopened.get("k") == {"concepts": [{"name": "所有权"}]}
+    reopened.close()
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = SQLiteResponseCache(tmp_path / "llm.sqlite3", ttl=0.01)
+    cache.put("k", "v")
+    time.sleep(0.02)
+    assert cache.get("k") is None
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted_over_the_size_limit(tmp_path):
+    cache = SQLiteResponseCache(tmp_path / "llm.sqlite3", max_bytes=25)
+    cache.put("a", "x" * 10)
+    cache.put("b", "x" * 10)
+    assert cache.get("a") is not None  # b is now the least recently used
+    cache.put("c", "x" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    cache.close()
+
+
+def test_incomplete_cache_fails_when_created():
+    class NoPut(ResponseCache):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        NoPut()
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+from echo.memory.cache import CachedMemoryClient
+
+
+class CountingMemory:
+    def __init__(self):
+        self.calls = 0
+
+    def get_preferences(self, user_id):
+        self.calls += 1
+        return [{"key": "style", "value": f"v{self.calls}"}]
+
+    def search(self, user_id, query, limit=5):
+        self.calls += 1
+        return []
+
+
+def _cache(**kwargs):
+    memory = CountingMemory()
+    client = SimpleNamespace(
+        memory=memory,
+        add_memory=lambda **kwargs: None,
+        conversations=SimpleNamespace(add_messages=lambda user_id, messages: None),
+    )
+    return CachedMemoryClient(client, **kwargs), memory
+
+
+def test_reads_are_cached_per_user_and_arguments():
+    cache, memory = _cache()
+    assert cache.memory.get_preferences("alice") == cache.memory.get_preferences("alice")
+    cache.memory.get_preferences("bob")
+    cache.memory.search("alice", "rust")
+    cache.memory.search("alice", "go")
+    assert memory.calls == 4
+    assert cache.stats()["hits"] == 1
+
+
+def test_writes_invalidate_only_the_reads_they_affect():
+    cache, memory = _cache()
+    cache.memory.get_preferences("alice")
+    cache.memory.search("alice", "rust")
+    cache.memory.get_preferences("bob")
+
+    cache.conversations.add_messages(user_id="alice", messages=[])
+    cache.memory.get_preferences("alice")  # hit: messages don't change preferences
+    cache.memory.search("alice", "rust")  # miss
+    assert memory.calls == 4
+
+    cache.add_memory(user_id="alice", content="x", memory_type="fact")
+    assert cache.memory.get_preferences("alice")[0]["value"] == "v5"
+    cache.memory.get_preferences("bob")  # other users keep their entries
+    assert memory.calls == 5
+
+
+def test_expired_and_evicted_entries_are_fetched_again():
+    cache, memory = _cache(ttls={"get_preferences": 0})
+    cache.memory.get_preferences("alice")
+    cache.memory.get_preferences("alice")
+    assert memory.calls == 2
+
+    cache, memory = _cache(max_entries=1)
+    cache.memory.search("alice", "rust")
+    cache.memory.search("alice", "go")
+    cache.memory.search("alice", "rust")
+    assert memory.calls == 3
@@ -0,0 +1,28 @@
+import json
+
+import pytest
+
+from echo.metrics import JSONLSink, Sink, Span
+
+
+def test_sink_without_emit_fails_when_created():
+    class NoEmit(Sink):
+        pass
+
+    with pytest.raises(TypeError):
+        NoEmit()
+
+
+def test_jsonl_sink_writes_one_line_per_span(tmp_path):
+    sink = JSONLSink(tmp_path / "spans.jsonl")
+    root = Span("chat")
+    child = Span("memory.search", parent=root)
+    child.count("backend_calls")
+    sink.emit(child)
+    sink.emit(root)
+    sink.close()
+
+    lines = [json.loads(line) for line in sink.path.read_text(encoding="utf-8").splitlines()]
+    assert [line["name"] for line in lines] == ["memory.search", "chat"]
+    assert lines[0]["root"] == "chat"
+    assert lines[1]["counters"] == {"backend_calls": 1}
@@ -0,0 +1,28 @@
+import json
+
+from echo.utils.llm import SMALL_MODEL, model_for
+
+
+def test_mechanical_tasks_use_the_small_model_and_chat_the_default(settings):
+    assert model_for(settings, "knowledge_graph") == SMALL_MODEL
+    assert model_for(settings, "session_summary") == SMALL_MODEL
+    assert model_for(settings, "chat") == settings.llm_default_model
+    assert model_for(settings, "unknown_task") == settings.llm_default_model
+
+
+def test_llm_models_setting_overrides_the_routing(settings, monkeypatch):
+    monkeypatch.setenv("LLM_MODELS", json.dumps({"knowledge_graph": "claude-opus-4", "chat": "x"}))
+    monkeypatch.setenv("LLM_DEFAULT_MODEL", "claude-sonnet-4-5")
+    from echo.config import get_settings
+
+    get_settings.cache_clear()
+    settings = get_settings()
+    assert model_for(settings, "knowledge_graph") == "claude-opus-4"
+    assert model_for(settings, "chat") == "x"
+    assert model_for(settings, "graph_repair") == SMALL_MODEL
+    assert model_for(settings, "review") == "claude-sonnet-4-5"
+
+
+def test_requests_carry_their_routed_model(agent):
+    assert agent._chat_request("你好", {})["model"] == model_for(agent.settings, "chat")
+    assert agent._knowledge_graph_request("Rust")["model"] == SMALL_MODEL
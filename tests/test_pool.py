@@ -0,0 +1,110 @@
+import asyncio
+
+from echo.pool import AgentPool
+
+
+class StubAgent:
+    def __init__(self, user_id, log):
+        self.user_id = user_id
+        self.log = log
+        self.closed = False
+
+    async def close(self):
+        await asyncio.sleep(0.01)  # drains its buffers
+        self.closed = True
+        self.log.append(("closed", self.user_id))
+
+
+def _pool(log, **kwargs):
+    async def factory(user_id):
+        log.append(("created", user_id))
+        return StubAgent(user_id, log)
+
+    return AgentPool(factory, **kwargs)
+
+
+def test_least_recently_used_idle_agent_is_evicted():
+    log = []
+
+    async def main():
+        pool = _pool(log, max_agents=2)
+        for user_id in ("alice", "bob", "alice", "carol"):
+            async with pool.lease(user_id):
+                pass
+        await asyncio.sleep(0.05)
+        stats = pool.stats()
+        await pool.close()
+        return stats
+
+    stats = asyncio.run(main())
+    assert log[:4] == [("created", "alice"), ("created", "bob"), ("created", "carol"),
+                       ("closed", "bob")]
+    assert stats["agents"] == 2
+    assert stats["evicted"] == 1
+
+
+def test_agents_in_use_are_not_evicted():
+    log = []
+
+    async def main():
+        pool = _pool(log, max_agents=1)
+        async with pool.lease("alice") as alice:
+            async with pool.lease("bob"):
+                pass
+            await asyncio.sleep(0.05)
+            assert not alice.closed
+        await pool.close()
+
+    asyncio.run(main())
+    assert ("closed", "bob") in log
+
+
+def test_new_agent_waits_for_the_previous_one_to_drain():
+    log = []
+
+    async def main():
+        pool = _pool(log, max_agents=1)
+        async with pool.lease("alice"):
+            pass
+        async with pool.lease("bob"):  # evicts alice
+            pass
+        async with pool.lease("alice"):
+            pass
+        await pool.close()
+
+    asyncio.run(main())
+    assert log.index(("closed", "alice")) < log.index(("created", "alice"), 1)
+
+
+def test_exclusive_leases_of_one_user_do_not_interleave():
+    log = []
+    order = []
+
+    async def turn(pool, name):
+        async with pool.lease("alice", exclusive=True):
+            order.append(f"{name} start")
+            await asyncio.sleep(0.01)
+            order.append(f"{name} end")
+
+    async def main():
+        pool = _pool(log)
+        await asyncio.gather(turn(pool, "a"), turn(pool, "b"))
+        await pool.close()
+
+    asyncio.run(main())
+    assert order == ["a start", "a end", "b start", "b end"]
+    assert log.count(("created", "alice")) == 1
+
+
+def test_close_drains_every_agent():
+    log = []
+
+    async def main():
+        pool = _pool(log)
+        for user_id in ("alice", "bob"):
+            async with pool.lease(user_id):
+                pass
+        await pool.close()
+
+    asyncio.run(main())
+    assert sorted(e for e in log if e[0] == "closed") == [("closed", "alice"), ("closed", "bob")]
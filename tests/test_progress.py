@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+from benchmarks.fakes import DataVolume, FakeNeuroMemoryClient, Latency
+from echo.memory.counts import count_facts
+
+
+@pytest.mark.parametrize("facts", [0, 99, 100, 1234, 1200])
+def test_paged_count_is_exact(facts):
+    client = FakeNeuroMemoryClient(DataVolume(facts=facts), Latency().scaled(0))
+    assert count_facts(client.memory, "u", page_size=100, page_workers=4) == facts
+
+
+def test_paged_count_fetches_pages_concurrently():
+    client = FakeNeuroMemoryClient(DataVolume(facts=1000), Latency().scaled(0))
+    active, peak = 0, 0
+    lock = threading.Lock()
+    barrier = threading.Barrier(4, timeout=5)
+    get_facts = client.memory.get_facts
+
+    def tracked(user_id, limit=100, offset=0, category=None):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        barrier.wait()  # only passes if four pages are in flight together
+        with lock:
+            active -= 1
+        return get_facts(user_id, limit=limit, offset=offset)
+
+    client.memory.get_facts = tracked
+    assert count_facts(client.memory, "u", page_size=100, page_workers=4) == 1000
+    assert peak == 4
+
+
+def test_progress_reports_unknown_count_on_timeout(agent):
+    release = threading.Event()
+    agent.settings.progress_timeout = 0.05
+    agent._count_knowledge_points = lambda: release.wait(5) and 42
+    try:
+        progress = agent.get_learning_progress()
+    finally:
+        release.set()
+
+    assert progress["knowledge_points"] is None
+    assert progress["degraded"] == ["knowledge_points"]
+    assert progress["resources_added"] == 50
+
+
+def test_progress_counts_when_sources_answer(agent):
+    progress = agent.get_learning_progress()
+    assert progress["knowledge_points"] == 50
+    assert progress["degraded"] == []
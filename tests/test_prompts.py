@@ -0,0 +1,37 @@
+from echo.core import ChatResult
+from echo.utils.prompts import build_system_prompt, min_cacheable_tokens
+
+
+def _chat_usage(agent, message):
+    events = list(agent.chat_stream(message))
+    assert isinstance(events[-1], ChatResult)
+    return events[-1].usage
+
+
+def test_short_prefix_is_not_marked_for_caching():
+    assert min_cacheable_tokens("claude-sonnet-4") == 1024
+    assert min_cacheable_tokens("claude-haiku-4-5") == 4096
+
+    blocks = build_system_prompt("用户档案摘要（来自 ECHO.md）：\n- Python", "claude-sonnet-4")
+    assert not any("cache_control" in block for block in blocks)
+
+
+def test_short_prefix_reads_nothing_from_the_cache(agent):
+    first = _chat_usage(agent, "怎么学 Rust？")
+    second = _chat_usage(agent, "所有权是什么？")
+
+    assert first["cache_creation_input_tokens"] == 0
+    assert second["cache_read_input_tokens"] == 0
+
+
+def test_long_prefix_is_read_from_the_cache_on_later_turns(agent):
+    agent.profile_digest = "用户档案摘要（来自 ECHO.md）：\n" + "- 技能：熟悉系统编程与并发\n" * 120
+    blocks = build_system_prompt(agent.profile_digest, "claude-sonnet-4")
+    assert blocks[-1]["cache_control"] == {"type": "ephemeral"}
+
+    first = _chat_usage(agent, "怎么学 Rust？")
+    second = _chat_usage(agent, "所有权是什么？")
+
+    assert first["cache_creation_input_tokens"] > 0
+    assert first["cache_read_input_tokens"] == 0
+    assert second["cache_read_input_tokens"] == first["cache_creation_input_tokens"]
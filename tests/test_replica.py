@@ -0,0 +1,48 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from echo.memory.replica import QUERY_CACHE_SIZE, MemoryReplica  # noqa: E402
+
+RECORDS = [
+    {"id": i, "content": f"记忆{i}", "memory_type": "fact", "embedding": [1.0, float(i)]}
+    for i in range(8)
+]
+
+
+def _fetch(user_id, since, offset, limit):
+    return RECORDS[offset:offset + limit]
+
+
+def test_queries_embed_outside_the_lock_and_share_a_bounded_cache(tmp_path):
+    embedded = []
+
+    def embed(texts):
+        # Another thread must be able to take the lock while this call is out
+        def take_lock():
+            with replica._lock:
+                pass
+
+        holder = threading.Thread(target=take_lock)
+        holder.start()
+        holder.join(timeout=1)
+        assert not holder.is_alive()
+        embedded.append(texts[0])
+        return [[1.0, 0.5]]
+
+    replica = MemoryReplica(tmp_path / "replica", "tester", _fetch, embed)
+    replica.sync()
+
+    queries = [f"问题{i % (QUERY_CACHE_SIZE + 40)}" for i in range(2 * QUERY_CACHE_SIZE)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda q: replica.search(q, limit=3), queries))
+
+    assert all(len(result) == 3 for result in results)
+    assert len(replica._query_cache) == QUERY_CACHE_SIZE
+
+    embedded.clear()
+    replica.search(queries[-1])
+    assert embedded == []
@@ -0,0 +1,61 @@
+from echo.session import ChatSession
+from echo.utils.tokens import estimate_message_tokens
+
+QUESTION = "什么是所有权？" * 10  # about 80 tokens per turn with the answer
+
+
+def _session(**kwargs):
+    session = ChatSession(**{"history_tokens": 400, "summary_tokens": 50, **kwargs})
+    for i in range(8):
+        session.record(f"{QUESTION}{i}", f"回答{i}")
+    return session
+
+
+def test_messages_keep_the_newest_turns_that_fit():
+    session = _session()
+    messages = session.messages()
+    assert messages[-2]["content"] == f"{QUESTION}7"
+    assert messages[-1]["content"] == "回答7"
+    assert sum(estimate_message_tokens(m) for m in messages) <= 400
+    assert len(messages) < 16
+
+
+def test_overflow_folds_down_to_half_the_budget_keeping_recent_turns():
+    session = _session(keep_turns=2)
+    turns = session.overflow()
+    assert turns and turns[0] is session.turns[0]
+    assert len(session.turns) - len(turns) >= 2
+    assert session.overflow() == []  # a fold is in progress
+
+    session.fold(turns, "用户在学习 Rust 所有权")
+    assert session.summary == "用户在学习 Rust 所有权"
+    assert session.folded_turns == len(turns)
+    assert sum(turn.tokens for turn in session.turns) <= 400 // 2
+    assert session.overflow() == []
+
+
+def test_fold_after_reset_is_discarded():
+    session = _session()
+    turns = session.overflow()
+    session.reset()
+    session.record("新问题", "新回答")
+    session.fold(turns, "旧摘要")
+
+    assert session.summary == ""
+    assert [turn.user for turn in session.turns] == ["新问题"]
+
+
+def test_cancel_fold_allows_the_next_fold():
+    session = _session()
+    turns = session.overflow()
+    session.cancel_fold()
+    assert session.overflow() == turns
+
+
+def test_fallback_summary_stays_within_its_budget():
+    session = _session(summary_tokens=30)
+    summary = session.fallback_summary(session.turns)
+    lines = summary.splitlines()
+    assert lines and all(line.startswith("- 用户问过：") for line in lines)
+    assert lines[-1].endswith(f"{QUESTION}7"[:60])
+    assert len(lines) < 8
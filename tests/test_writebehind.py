@@ -0,0 +1,82 @@
+import json
+import threading
+
+from echo.memory.writebehind import WriteBehindBuffer
+
+
+class Backend:
+    """write() recording delivered turns; fails while ``failures`` remain"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.messages = []
+
+    def __call__(self, user_id, session_id, messages):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("backend down")
+        self.messages.extend(m["content"] for m in messages)
+
+
+def _turn(text, at=0.0):
+    return {"user_id": "alice", "session_id": "s1", "at": at,
+            "messages": [{"role": "user", "content": text}]}
+
+
+def test_crashed_spool_is_replayed_skipping_a_torn_line(tmp_path):
+    spool = tmp_path / "123-dead.jsonl"
+    spool.write_text(
+        json.dumps(_turn("one", 1.0)) + "\n" + json.dumps(_turn("two", 2.0)) + "\n" + '{"user',
+        encoding="utf-8",
+    )
+    backend = Backend()
+    buffer = WriteBehindBuffer(backend, tmp_path)
+    assert buffer.flush(timeout=2)
+    buffer.close()
+
+    assert backend.messages == ["one", "two"]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_open_buffer_keeps_its_spool_from_other_buffers(tmp_path):
+    first_backend, second_backend = Backend(), Backend()
+    first = WriteBehindBuffer(first_backend, tmp_path, batch_turns=100, interval=60)
+    first.append("alice", "s1", [{"role": "user", "content": "one"}])
+
+    # e.g. `echo chat` starting while `echo serve` holds unsent turns
+    second = WriteBehindBuffer(second_backend, tmp_path)
+    assert second.pending == 0
+    second.close()
+    assert first.spool_path.exists()
+
+    first.close()
+    assert first_backend.messages == ["one"]
+    assert second_backend.messages == []
+
+
+def test_undrained_buffer_is_claimed_by_the_next_one(tmp_path):
+    first = WriteBehindBuffer(Backend(failures=100), tmp_path)
+    first.append("alice", "s1", [{"role": "user", "content": "one"}])
+    first.close(timeout=0.2)
+
+    backend = Backend()
+    second = WriteBehindBuffer(backend, tmp_path)
+    second.close()
+    assert backend.messages == ["one"]
+
+
+def test_failed_write_stays_spooled_and_is_retried(tmp_path):
+    backend = Backend(failures=1)
+    flushed = threading.Event()
+    buffer = WriteBehindBuffer(backend, tmp_path, on_flushed=lambda n: flushed.set())
+    buffer.append("alice", "s1", [{"role": "user", "content": "one"}])
+
+    assert not buffer.flush(timeout=0.3)
+    assert buffer.pending == 1
+    assert "one" in buffer.spool_path.read_text(encoding="utf-8")
+
+    assert buffer.flush(timeout=2)  # flush() skips the backoff
+    assert flushed.is_set()
+    assert backend.messages == ["one"]
+    assert not buffer.spool_path.exists()
+    buffer.close()